@@ -0,0 +1,135 @@
+"""
+Seen sets for duplicate suppression.
+
+All backends answer `key in seen` and `seen.add(key)`, so they can be swapped
+with DEDUP_MODE:
+
+- 'exact': a Python set, memory grows with the number of keys
+- 'bloom': a fixed-size Bloom filter, memory is set by DEDUP_CAPACITY and
+  DEDUP_ERROR_RATE; a false positive makes a new key look seen
+- 'disk': a SQLite table, for catalogs that do not fit in memory
+"""
+import math
+import os
+import sqlite3
+from hashlib import blake2b
+
+DEDUP_MODES = ['exact', 'bloom', 'disk']
+
+
+class ExactSeenSet:
+    def __init__(self):
+        self.keys = set()
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key):
+        """Add a key; returns False if it was already there"""
+        if key in self.keys:
+            return False
+        self.keys.add(key)
+        return True
+
+    def close(self):
+        pass
+
+
+class BloomSeenSet:
+    """
+    Bloom filter sized for `capacity` keys at `error_rate` false positives.
+    One blake2b digest per key gives the two hashes for double hashing.
+    """
+
+    def __init__(self, capacity=1_000_000, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def __len__(self):
+        return self.count
+
+    def add(self, key):
+        """Add a key; returns False if it (probably) was already there"""
+        new = False
+        for pos in self._positions(key):
+            mask = 1 << (pos & 7)
+            if not self.bits[pos >> 3] & mask:
+                self.bits[pos >> 3] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def close(self):
+        pass
+
+
+class DiskSeenSet:
+    """
+    Keys in a SQLite table. The table is emptied when the set is opened,
+    unless `resume` is set: a crawl resumed from its JOBDIR keeps the keys
+    of its earlier parts.
+    """
+
+    def __init__(self, path, commit_every=1000, resume=False):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=OFF')
+        self.db.execute('CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY) WITHOUT ROWID')
+        if resume:
+            self.count = self.db.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+        else:
+            self.db.execute('DELETE FROM seen')
+            self.count = 0
+        self.commit_every = commit_every
+        self.pending = 0
+
+    def __contains__(self, key):
+        return self.db.execute('SELECT 1 FROM seen WHERE key = ?', (key,)).fetchone() is not None
+
+    def __len__(self):
+        return self.count
+
+    def add(self, key):
+        """Add a key; returns False if it was already there"""
+        new = self.db.execute('INSERT OR IGNORE INTO seen VALUES (?)', (key,)).rowcount == 1
+        if new:
+            self.count += 1
+            self.pending += 1
+            if self.pending >= self.commit_every:
+                self.db.commit()
+                self.pending = 0
+        return new
+
+    def close(self):
+        if self.db is not None:
+            self.db.commit()
+            self.db.close()
+            self.db = None
+
+
+def build_seen_set(mode='exact', capacity=1_000_000, error_rate=0.001, path=None, resume=False):
+    if mode == 'exact':
+        return ExactSeenSet()
+    if mode == 'bloom':
+        return BloomSeenSet(capacity, error_rate)
+    if mode == 'disk':
+        return DiskSeenSet(path, resume=resume)
+    raise ValueError(f'Unknown dedup mode {mode!r}, expected one of {DEDUP_MODES}')
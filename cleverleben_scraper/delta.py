@@ -0,0 +1,125 @@
+"""
+Change detection between crawls.
+
+The DeltaIndex keeps, per unique_id, a content hash and the last version of
+every product, and the crawl (run) that last saw it. Tracking an item
+against it tells whether the product is new, changed or unchanged since the
+previous crawl; what the current run did not see once it has finished was
+removed. DeltaPipeline writes those records to the delta feed, so
+downstream loads only handle what changed:
+
+    {"op": "added", "unique_id": "27399", "item": {...}}
+    {"op": "changed", "unique_id": "27399", "product_url": "...", "changes": {"price": ["0.35", "0.39"]}}
+    {"op": "removed", "unique_id": "27399", "product_url": "..."}
+
+A run that did not finish (killed, or closed early) stays open; a crawl
+resumed from its JOBDIR continues it, any other crawl starts a new run.
+"""
+import json
+import sqlite3
+from hashlib import blake2b
+from time import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    unique_id TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    item TEXT NOT NULL,
+    run INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS products_run ON products (run);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    finished REAL
+);
+"""
+
+
+# Fields that describe the crawl rather than the product: the image download
+# results say 'downloaded' or 'uptodate' depending on the run
+UNTRACKED_FIELDS = frozenset(['image_files'])
+
+
+def content_hash(data):
+    """Hash of the product fields of an item, independent of their order"""
+    fields = {field: value for field, value in data.items() if field not in UNTRACKED_FIELDS}
+    encoded = json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    return blake2b(encoded, digest_size=16).hexdigest()
+
+
+def field_changes(old, new):
+    """{field: [old value, new value]} of the product fields that differ"""
+    return {
+        field: [old.get(field), new.get(field)]
+        for field in sorted((old.keys() | new.keys()) - UNTRACKED_FIELDS)
+        if old.get(field) != new.get(field)
+    }
+
+
+class DeltaIndex:
+    def __init__(self, path, resume=False, commit_every=50):
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript(SCHEMA)
+        self.commit_every = commit_every
+        self.pending = 0
+
+        last = self.db.execute('SELECT id, finished FROM runs ORDER BY id DESC LIMIT 1').fetchone()
+        self.resumed = bool(resume and last and last[1] is None)
+        if self.resumed:
+            self.run = last[0]
+        else:
+            self.run = self.db.execute('INSERT INTO runs (started) VALUES (?)', (time(),)).lastrowid
+        self.db.commit()
+
+    def track(self, key, data):
+        """
+        Record the current version of a product; returns its delta record,
+        or None if it is unchanged since the last run
+        """
+        digest = content_hash(data)
+        row = self.db.execute('SELECT hash, item FROM products WHERE unique_id = ?', (key,)).fetchone()
+        if row is not None and row[0] == digest:
+            self.db.execute('UPDATE products SET run = ? WHERE unique_id = ?', (self.run, key))
+            record = None
+        else:
+            self.db.execute(
+                'INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?)',
+                (key, digest, json.dumps(data, ensure_ascii=False, default=str), self.run),
+            )
+            if row is None:
+                record = {'op': 'added', 'unique_id': key, 'item': data}
+            else:
+                record = {
+                    'op': 'changed',
+                    'unique_id': key,
+                    'product_url': data.get('product_url'),
+                    'changes': field_changes(json.loads(row[1]), data),
+                }
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.commit()
+        return record
+
+    def finish(self):
+        """
+        Close the run: the products it did not see are removed from the
+        index and returned as delta records
+        """
+        rows = self.db.execute('SELECT unique_id, item FROM products WHERE run < ?', (self.run,)).fetchall()
+        self.db.execute('DELETE FROM products WHERE run < ?', (self.run,))
+        self.db.execute('UPDATE runs SET finished = ? WHERE id = ?', (time(), self.run))
+        self.commit()
+        return [
+            {'op': 'removed', 'unique_id': key, 'product_url': json.loads(item).get('product_url')}
+            for key, item in rows
+        ]
+
+    def commit(self):
+        self.db.commit()
+        self.pending = 0
+
+    def close(self):
+        self.commit()
+        self.db.close()
@@ -0,0 +1,148 @@
+"""
+Feed exporters that Scrapy does not ship.
+
+ParquetItemExporter writes items into a Parquet file while the crawl runs,
+one row group per batch, so memory stays bounded by the batch size instead
+of the catalog size. It is registered as the 'parquet' feed format in
+FEED_EXPORTERS and needs pyarrow, which is an optional dependency:
+
+    FEEDS = {'output_data.parquet': {'format': 'parquet'}}
+
+FeedWriter writes items to several feed files at once outside a crawl, for
+jobs that produce the outputs themselves (sharded crawls, re-extraction).
+"""
+from itemadapter import ItemAdapter
+from scrapy.exporters import BaseItemExporter, CsvItemExporter, JsonLinesItemExporter
+
+from cleverleben_scraper.items import CleverlebenItem
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Fields that hold a list of strings, everything else is stored as a string column
+LIST_FIELDS = ('image',)
+
+# Filled by ProductImagesPipeline only
+IMAGE_FILES_FIELD = 'image_files'
+
+
+def parquet_available():
+    return pa is not None
+
+
+def feed_fields(images=False):
+    """
+    The item fields of the feeds, in declaration order. CSV and Parquet
+    write a column for every field, so image_files is only included when
+    the images pipeline fills it.
+    """
+    return [name for name in CleverlebenItem.fields if images or name != IMAGE_FILES_FIELD]
+
+
+class ParquetItemExporter(BaseItemExporter):
+    def __init__(self, file, batch_size=500, list_fields=LIST_FIELDS, compression='snappy', **kwargs):
+        if pa is None:
+            raise RuntimeError('The parquet feed format requires pyarrow (pip install pyarrow)')
+        super().__init__(dont_fail=True, **kwargs)
+        self.file = file
+        self.batch_size = batch_size
+        self.list_fields = set(list_fields)
+        self.compression = compression
+        self.rows = []
+        self.schema = None
+        self.writer = None
+
+    def _build_schema(self, item):
+        if not self.fields_to_export:
+            self.fields_to_export = list(ItemAdapter(item).field_names())
+        return pa.schema([
+            (name, pa.list_(pa.string()) if name in self.list_fields else pa.string())
+            for name in self.fields_to_export
+        ])
+
+    def _convert(self, name, value):
+        if value is None:
+            return None
+        if name in self.list_fields:
+            if isinstance(value, (list, tuple)):
+                return [str(v) for v in value]
+            return [str(value)]
+        if isinstance(value, (list, tuple)):
+            return ', '.join(str(v) for v in value)
+        return str(value)
+
+    def export_item(self, item):
+        if self.schema is None:
+            self.schema = self._build_schema(item)
+        adapter = ItemAdapter(item)
+        self.rows.append({
+            name: self._convert(name, adapter.get(name)) for name in self.schema.names
+        })
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.file, self.schema, compression=self.compression)
+        self.writer.write_table(pa.Table.from_pylist(self.rows, schema=self.schema))
+        self.rows = []
+
+    def finish_exporting(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+
+
+EXPORTERS = {
+    'jsonlines': JsonLinesItemExporter,
+    'csv': CsvItemExporter,
+    'parquet': ParquetItemExporter,
+}
+
+
+class FeedWriter:
+    """Exports every item to all `outputs` ({path: feed format}); use it as a context manager"""
+
+    def __init__(self, outputs, batch_size=500, fields=None):
+        self.files = []
+        self.exporters = []
+        fields = fields or feed_fields()
+        try:
+            for path, feed_format in outputs.items():
+                kwargs = {'batch_size': batch_size} if feed_format == 'parquet' else {}
+                self.files.append(open(path, 'wb'))
+                exporter = EXPORTERS[feed_format](self.files[-1], encoding='utf-8', fields_to_export=fields, **kwargs)
+                exporter.start_exporting()
+                self.exporters.append(exporter)
+        except Exception:
+            self.close()
+            raise
+        self.count = 0
+
+    def export_item(self, item):
+        for exporter in self.exporters:
+            exporter.export_item(item)
+        self.count += 1
+
+    def finish(self):
+        for exporter in self.exporters:
+            exporter.finish_exporting()
+
+    def close(self):
+        for f in self.files:
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.finish()
+        finally:
+            self.close()
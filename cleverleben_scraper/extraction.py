@@ -0,0 +1,313 @@
+"""
+Single-pass field extraction.
+
+Instead of evaluating one XPath expression per fallback selector, an Extractor
+groups all selectors of all fields by tag name and walks the lxml tree once,
+testing each element only against the selectors registered for its tag.
+
+Selectors mirror the XPath shapes used by the spiders:
+
+    Text(Match('h1', attrs={'itemprop': 'name'}))      //h1[@itemprop="name"]/text()
+    AllText(Match('div', class_contains='price'))      //div[contains(@class, "price")]//text()
+    Attr(Match('meta', attrs={'property': 'og:image'}), 'content')
+    Attr(Match('img', inside=Match('div', class_contains='product-image')), 'src')
+    SiblingText(Match('td', text_contains='Zutaten'), 'td')
+                                                       //td[contains(text(), "Zutaten")]/following-sibling::td//text()
+
+A Field lists its selectors in fallback priority order, and its mode decides
+how they are combined:
+
+    'first'  the first result of each selector, first selector whose result passes `accept` wins (.get())
+    'scan'   the first result of each selector that passes `accept`, first selector with one wins
+    'all'    every result of every selector, in selector order (.getall())
+
+iter_jsonld/find_jsonld read the application/ld+json blocks for the
+structured-data fast path.
+
+Every selector describes itself with the XPath it stands for, which is the
+name used in the selector hit/miss stats (see Extractor.extract(report=...)).
+"""
+import json
+from collections import defaultdict
+
+
+class Match:
+    """Element test: tag name plus optional attribute, class, text and ancestor conditions"""
+
+    def __init__(self, tag, attrs=None, class_contains=None, text_contains=None, inside=None):
+        self.tag = tag
+        self.attrs = attrs or {}
+        self.class_contains = class_contains
+        self.text_contains = text_contains
+        self.inside = inside
+        self.matches = self._compile()
+
+    def _compile(self):
+        # Build the test once as a chain of small closures, cheapest condition first
+        tests = []
+        for name, value in self.attrs.items():
+            tests.append(lambda el, name=name, value=value: el.get(name) == value)
+        if self.class_contains is not None:
+            needle = self.class_contains
+            tests.append(lambda el: needle in (el.get('class') or ''))
+        if self.text_contains is not None:
+            needle = self.text_contains
+            tests.append(lambda el: needle in first_text(el))
+        if self.inside is not None:
+            inside = self.inside
+            tests.append(lambda el: any(inside.matches(a) for a in el.iterancestors(inside.tag)))
+
+        if not tests:
+            return lambda el: True
+        if len(tests) == 1:
+            return tests[0]
+        return lambda el: all(test(el) for test in tests)
+
+    def describe(self):
+        conditions = [f'@{name}="{value}"' for name, value in self.attrs.items()]
+        if self.class_contains is not None:
+            conditions.append(f'contains(@class, "{self.class_contains}")')
+        if self.text_contains is not None:
+            conditions.append(f'contains(text(), "{self.text_contains}")')
+        path = f'//{self.tag}' + ''.join(f'[{condition}]' for condition in conditions)
+        if self.inside is not None:
+            path = self.inside.describe() + path
+        return path
+
+
+def first_text(el):
+    """The first text node child of an element, which is what XPath contains(text(), ...) looks at"""
+    if el.text is not None:
+        return el.text
+    for child in el:
+        if child.tail is not None:
+            return child.tail
+    return ''
+
+
+def direct_text(el):
+    """Text node children of an element, like XPath text()"""
+    if el.text is not None:
+        yield el.text
+    for child in el:
+        if child.tail is not None:
+            yield child.tail
+
+
+class Text:
+    """Direct text nodes of matching elements"""
+    nested = False
+
+    def __init__(self, match):
+        self.match = match
+
+    def values(self, el):
+        return direct_text(el)
+
+    def describe(self):
+        return f'{self.match.describe()}/text()'
+
+
+class AllText:
+    """All descendant text nodes of matching elements"""
+    # Text inside a nested match was already produced by the outer one
+    nested = True
+
+    def __init__(self, match):
+        self.match = match
+
+    def values(self, el):
+        return el.itertext()
+
+    def describe(self):
+        return f'{self.match.describe()}//text()'
+
+
+class Attr:
+    """An attribute of matching elements"""
+    nested = False
+
+    def __init__(self, match, name):
+        self.match = match
+        self.name = name
+
+    def values(self, el):
+        value = el.get(self.name)
+        return [value] if value is not None else []
+
+    def describe(self):
+        return f'{self.match.describe()}/@{self.name}'
+
+
+class SiblingText:
+    """All descendant text nodes of the following siblings (with a given tag) of matching elements"""
+    nested = False
+
+    def __init__(self, match, sibling_tag):
+        self.match = match
+        self.sibling_tag = sibling_tag
+
+    def values(self, el):
+        for sibling in el.itersiblings(self.sibling_tag):
+            yield from sibling.itertext()
+
+    def describe(self):
+        return f'{self.match.describe()}/following-sibling::{self.sibling_tag}//text()'
+
+
+class Field:
+    def __init__(self, name, selectors, mode='first', accept=None):
+        if mode not in ('first', 'scan', 'all'):
+            raise ValueError(f"Unknown field mode: {mode}")
+        self.name = name
+        self.selectors = selectors
+        self.mode = mode
+        self.accept = accept or bool
+
+
+class _FieldState:
+    """Per-document progress of one field"""
+
+    def __init__(self, field):
+        self.field = field
+        count = len(field.selectors)
+        self.candidates = [None] * count
+        self.resolved = [False] * count
+        self.results = [[] for _ in range(count)] if field.mode == 'all' else None
+        self.matched = [set() for _ in range(count)]
+        self.done = False
+
+    def feed(self, index, el):
+        selector = self.field.selectors[index]
+        if selector.nested:
+            if any(a in self.matched[index] for a in el.iterancestors(selector.match.tag)):
+                return
+            self.matched[index].add(el)
+
+        if self.field.mode == 'all':
+            self.results[index].extend(selector.values(el))
+            return
+
+        accept = self.field.accept
+        for value in selector.values(el):
+            if self.field.mode == 'first':
+                self.candidates[index] = value
+                self.resolved[index] = True
+                break
+            if accept(value):
+                self.candidates[index] = value
+                self.resolved[index] = True
+                break
+        self._check_done()
+
+    def _check_done(self):
+        # Final once the best accepted candidate can no longer be beaten by a higher-priority selector
+        for index, resolved in enumerate(self.resolved):
+            if not resolved:
+                return
+            if self.field.accept(self.candidates[index]):
+                self.done = True
+                return
+
+    def outcomes(self):
+        """
+        Yield (selector index, hit) for the selectors that decided the value:
+        the winning selector is a hit, the higher-priority selectors that found
+        nothing usable are misses. Lower-priority selectors were not needed and
+        are not reported. In 'all' mode every selector with results is a hit.
+        """
+        if self.field.mode == 'all':
+            for index, results in enumerate(self.results):
+                yield index, bool(results)
+            return
+        for index, candidate in enumerate(self.candidates):
+            hit = candidate is not None and self.field.accept(candidate)
+            yield index, hit
+            if hit:
+                return
+
+    def value(self):
+        if self.field.mode == 'all':
+            return [value for values in self.results for value in values]
+        for candidate in self.candidates:
+            if candidate is not None and self.field.accept(candidate):
+                return candidate
+        return None
+
+
+class Extractor:
+    """A compiled set of fields that is evaluated in a single walk over the document"""
+
+    def __init__(self, fields):
+        self.fields = fields
+        self._dispatch = defaultdict(list)
+        self.labels = [[selector.describe() for selector in field.selectors] for field in fields]
+        for field_index, field in enumerate(fields):
+            for selector_index, selector in enumerate(field.selectors):
+                self._dispatch[selector.match.tag].append((field_index, selector_index, selector.match))
+
+    def extract(self, root, only=None, report=None):
+        """
+        Walk `root` (an lxml element, e.g. response.selector.root) once and
+        return {field name: value}. `only` restricts the walk to some field names.
+        `report(field name, selector description, hit)` is called for the
+        selectors that decided each field, see _FieldState.outcomes.
+        """
+        states = [
+            _FieldState(field) if only is None or field.name in only else None
+            for field in self.fields
+        ]
+        dispatch = {}
+        for tag, entries in self._dispatch.items():
+            entries = [entry for entry in entries if states[entry[0]] is not None]
+            if entries:
+                dispatch[tag] = entries
+
+        if dispatch:
+            for el in root.iter(*dispatch):
+                for field_index, selector_index, match in dispatch[el.tag]:
+                    state = states[field_index]
+                    if state.done or state.resolved[selector_index]:
+                        continue
+                    if match.matches(el):
+                        state.feed(selector_index, el)
+
+        if report is not None:
+            for field, state, labels in zip(self.fields, states, self.labels):
+                if state is not None:
+                    for index, hit in state.outcomes():
+                        report(field.name, labels[index], hit)
+
+        return {
+            field.name: state.value()
+            for field, state in zip(self.fields, states)
+            if state is not None
+        }
+
+
+def iter_jsonld(root):
+    """Yield every JSON-LD object embedded in the document, flattening lists and @graph"""
+    for script in root.iter('script'):
+        if script.get('type') != 'application/ld+json' or not script.text:
+            continue
+        try:
+            data = json.loads(script.text)
+        except ValueError:
+            continue
+        stack = data if isinstance(data, list) else [data]
+        for obj in stack:
+            if not isinstance(obj, dict):
+                continue
+            if '@graph' in obj:
+                yield from (node for node in obj['@graph'] if isinstance(node, dict))
+            else:
+                yield obj
+
+
+def find_jsonld(root, type_name):
+    """The first JSON-LD object of the given @type, or None"""
+    for obj in iter_jsonld(root):
+        types = obj.get('@type')
+        if types == type_name or (isinstance(types, list) and type_name in types):
+            return obj
+    return None
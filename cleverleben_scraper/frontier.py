@@ -0,0 +1,103 @@
+"""
+Frontier shared by the processes of a sharded crawl (see sharding.py).
+
+One SQLite file holds:
+
+- claims: every link that some shard decided to request. A link is claimed
+  with a single INSERT OR IGNORE, so exactly one shard gets to follow it.
+- slots: the next free request time per host. Each shard reserves its
+  request slots here, so DOWNLOAD_DELAY applies to the whole crawl and not
+  to every process separately.
+
+No server is involved; all shards just open the same file.
+"""
+import sqlite3
+import zlib
+from time import time
+from weakref import WeakKeyDictionary
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS claims (
+    url TEXT PRIMARY KEY,
+    shard INTEGER NOT NULL,
+    claimed REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS slots (
+    host TEXT PRIMARY KEY,
+    next_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+_frontiers = WeakKeyDictionary()
+
+
+def shard_of(url, shard_count):
+    """The shard that owns a URL, stable across processes and runs"""
+    return zlib.crc32(url.encode('utf-8')) % shard_count
+
+
+class SharedFrontier:
+    def __init__(self, path, shard=0):
+        # Autocommit: every claim is visible to the other shards immediately
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(SCHEMA)
+        self.shard = shard
+
+    @classmethod
+    def for_crawler(cls, crawler):
+        """The frontier of one crawler, shared by the spider and FrontierThrottleMiddleware"""
+        if crawler not in _frontiers:
+            settings = crawler.settings
+            _frontiers[crawler] = cls(settings.get('SHARD_FRONTIER'), settings.getint('SHARD_INDEX'))
+        return _frontiers[crawler]
+
+    def claim(self, url):
+        """Claim a URL for this shard; returns False if a shard already claimed it"""
+        cursor = self.db.execute(
+            'INSERT OR IGNORE INTO claims VALUES (?, ?, ?)', (url, self.shard, time())
+        )
+        return cursor.rowcount == 1
+
+    def reserve(self, host, interval):
+        """Reserve the next request slot for a host; returns the seconds to wait for it"""
+        now = time()
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            row = self.db.execute('SELECT next_at FROM slots WHERE host = ?', (host,)).fetchone()
+            slot = max(now, row[0]) if row else now
+            self.db.execute('INSERT OR REPLACE INTO slots VALUES (?, ?)', (host, slot + interval))
+            self.db.execute('COMMIT')
+        except Exception:
+            self.db.execute('ROLLBACK')
+            raise
+        return slot - now
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+class FrontierSeenSet:
+    """A LinkHarvester seen set whose add() claims the link in the shared frontier"""
+
+    def __init__(self, frontier):
+        self.frontier = frontier
+        self.local = set()
+
+    def __contains__(self, url):
+        return url in self.local
+
+    def __len__(self):
+        return len(self.local)
+
+    def add(self, url):
+        if url in self.local:
+            return False
+        self.local.add(url)
+        return self.frontier.claim(url)
+
+    def close(self):
+        pass
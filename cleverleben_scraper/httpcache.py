@@ -0,0 +1,223 @@
+"""
+Single-file HTTP cache storage.
+
+Scrapy's FilesystemCacheStorage writes six files into a hashed directory for
+every response. SqliteCacheStorage keeps all responses of a spider in one
+SQLite database (HTTPCACHE_DIR/<spider name>.sqlite), indexed by request
+fingerprint, with zlib-compressed headers and bodies. Reads go through
+SQLite's memory-mapped I/O (HTTPCACHE_SQLITE_MMAP_SIZE), so a warm replay
+does not open or stat any per-response files.
+
+Enable it with:
+
+    HTTPCACHE_STORAGE = 'cleverleben_scraper.httpcache.SqliteCacheStorage'
+
+A filesystem cache of the spider (HTTPCACHE_DIR/<spider name>) is migrated
+when the database does not exist yet, so an existing cache keeps being used;
+migrate_httpcache.py does the same by hand.
+"""
+import logging
+import os
+import pickle
+import sqlite3
+import zlib
+from time import time
+
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+from w3lib.http import headers_dict_to_raw, headers_raw_to_dict
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    fingerprint TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    method TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    response_url TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    headers BLOB NOT NULL,
+    body BLOB NOT NULL,
+    request_headers BLOB NOT NULL
+)
+"""
+
+# Commit after this many stored responses, instead of once per response
+# (HTTPCACHE_SQLITE_COMMIT_EVERY; the sharded runner commits every response)
+COMMIT_EVERY = 50
+
+
+def open_cache_db(path, mmap_size=256 * 1024 * 1024):
+    """Open (and create if needed) a cache database"""
+    # Shards of a sharded crawl write to the same database
+    db = sqlite3.connect(path, timeout=30)
+    db.execute('PRAGMA journal_mode=WAL')
+    db.execute('PRAGMA synchronous=NORMAL')
+    db.execute(f'PRAGMA mmap_size={int(mmap_size)}')
+    db.execute(SCHEMA)
+    return db
+
+
+def build_response(row):
+    """Turn a (response_url, status, headers, body) row back into a Response"""
+    url, status, headers, body = row
+    headers = Headers(headers_raw_to_dict(zlib.decompress(headers)))
+    body = zlib.decompress(body)
+    respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+    return respcls(url=url, status=status, headers=headers, body=body)
+
+
+class SqliteCacheStorage:
+    def __init__(self, settings):
+        self.cachedir = data_path(settings['HTTPCACHE_DIR'], createdir=True)
+        self.expiration_secs = settings.getint('HTTPCACHE_EXPIRATION_SECS')
+        self.compression_level = settings.getint('HTTPCACHE_SQLITE_COMPRESSION', 6)
+        self.mmap_size = settings.getint('HTTPCACHE_SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+        self.commit_every = settings.getint('HTTPCACHE_SQLITE_COMMIT_EVERY', COMMIT_EVERY)
+        self.db = None
+        self.pending = 0
+
+    def open_spider(self, spider):
+        dbpath = os.path.join(self.cachedir, f'{spider.name}.sqlite')
+        filesystem_cache = os.path.join(self.cachedir, spider.name)
+        if os.path.isdir(filesystem_cache) and not os.path.exists(dbpath):
+            count = migrate_once(filesystem_cache, dbpath, self.compression_level)
+            if count is not None:
+                logger.info(
+                    "Migrated %(count)d filesystem cache entries from %(source)s to %(target)s",
+                    {'count': count, 'source': filesystem_cache, 'target': dbpath}, extra={'spider': spider},
+                )
+        self.db = open_cache_db(dbpath, self.mmap_size)
+        self._fingerprinter = spider.crawler.request_fingerprinter
+        logger.debug("Using SQLite cache storage in %(cachepath)s", {'cachepath': dbpath}, extra={'spider': spider})
+
+    def close_spider(self, spider):
+        self.db.commit()
+        self.db.close()
+
+    def retrieve_response(self, spider, request):
+        """Return response if present in cache, or None otherwise."""
+        key = self._fingerprinter.fingerprint(request).hex()
+        row = self.db.execute(
+            'SELECT timestamp, response_url, status, headers, body FROM responses WHERE fingerprint = ?',
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None  # not cached
+        timestamp = row[0]
+        if 0 < self.expiration_secs < time() - timestamp:
+            return None  # expired
+        request.meta['cache_timestamp'] = timestamp
+        return build_response(row[1:])
+
+    def store_response(self, spider, request, response):
+        """Store the given response in the cache."""
+        key = self._fingerprinter.fingerprint(request).hex()
+        self.db.execute(
+            'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                key,
+                request.url,
+                request.method,
+                response.status,
+                response.url,
+                time(),
+                zlib.compress(headers_dict_to_raw(response.headers), self.compression_level),
+                zlib.compress(response.body, self.compression_level),
+                zlib.compress(headers_dict_to_raw(request.headers), self.compression_level),
+            )
+        )
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.db.commit()
+            self.pending = 0
+
+
+def iter_cache_db(path):
+    """Yield (meta, response) for every entry of a cache database, like replay.iter_cached_responses"""
+    db = open_cache_db(path)
+    try:
+        rows = db.execute(
+            'SELECT url, method, status, response_url, timestamp, headers, body '
+            'FROM responses ORDER BY fingerprint'
+        )
+        for url, method, status, response_url, timestamp, headers, body in rows:
+            meta = {
+                'url': url,
+                'method': method,
+                'status': status,
+                'response_url': response_url,
+                'timestamp': timestamp,
+            }
+            yield meta, build_response((response_url, status, headers, body))
+    finally:
+        db.close()
+
+
+def migrate_filesystem_cache(cache_dir, db_path, compression_level=6):
+    """
+    Copy a FilesystemCacheStorage tree for one spider (e.g. .scrapy/httpcache/clever_spider)
+    into a cache database. The directory names are the request fingerprints, so
+    migrated entries are found by SqliteCacheStorage as is. Returns the number of entries.
+    """
+    db = open_cache_db(db_path)
+    count = 0
+    for bucket in sorted(os.listdir(cache_dir)):
+        bucket_path = os.path.join(cache_dir, bucket)
+        if not os.path.isdir(bucket_path):
+            continue
+        for key in sorted(os.listdir(bucket_path)):
+            entry_path = os.path.join(bucket_path, key)
+            meta_path = os.path.join(entry_path, 'pickled_meta')
+            if not os.path.exists(meta_path):
+                continue
+            with open(meta_path, 'rb') as f:
+                meta = pickle.load(f)
+            parts = {}
+            for name in ['response_headers', 'response_body', 'request_headers']:
+                path = os.path.join(entry_path, name)
+                if os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        parts[name] = f.read()
+                else:
+                    parts[name] = b''
+            db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    key,
+                    meta['url'],
+                    meta.get('method', 'GET'),
+                    meta['status'],
+                    meta['response_url'],
+                    # FilesystemCacheStorage expires entries by the age of this file
+                    os.path.getmtime(meta_path),
+                    zlib.compress(parts['response_headers'], compression_level),
+                    zlib.compress(parts['response_body'], compression_level),
+                    zlib.compress(parts['request_headers'], compression_level),
+                )
+            )
+            count += 1
+    db.commit()
+    db.close()
+    return count
+
+
+def migrate_once(cache_dir, db_path, compression_level=6):
+    """
+    Migrate a filesystem cache into a database that does not exist yet.
+    Shards opening the cache together race for it: each migrates into a file
+    of its own, the first to link it in place wins. Returns the number of
+    entries, or None if another process created the database first.
+    """
+    partial = f'{db_path}.{os.getpid()}.migrating'
+    try:
+        count = migrate_filesystem_cache(cache_dir, partial, compression_level)
+        os.link(partial, db_path)
+    except FileExistsError:
+        return None
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return count
@@ -0,0 +1,100 @@
+"""
+Product images.
+
+Product pages link the same commercetools asset in several sizes
+('...-EoB5R2-medium.png' next to '...-EoB5R2.png'), and some image selectors
+pick up the site's own branding (/tenant/logo.svg). canonical_images maps
+every variant to the full-size asset, drops branding assets and
+duplicates; it runs as the 'image' field transform of the Normalizer.
+
+ImageIndex records, for ProductImagesPipeline, which content hash every
+downloaded image URL had. Images are stored under that hash, so an image
+shared by several products, or served under several URLs, is stored once,
+and a URL that is already in the index is not downloaded again.
+"""
+import re
+import sqlite3
+from time import time
+from urllib.parse import urlparse, urlunparse
+
+from cleverleben_scraper.urls import SITE_HOSTS
+
+# commercetools size variants, the full-size asset has no suffix
+VARIANT_RE = re.compile(r'-(thumb|small|medium|large|zoom)(\.\w+)$')
+VARIANT_HOST_SUFFIX = '.commercetools.com'
+
+BRANDING_PATHS = ['/tenant/']
+BRANDING_NAME_RE = re.compile(r'(^|[-_/])(logo|favicon|icon|sprite|placeholder)([-_.]|$)', re.I)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    url TEXT PRIMARY KEY,
+    checksum TEXT NOT NULL,
+    path TEXT NOT NULL,
+    downloaded REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS images_checksum ON images (checksum);
+"""
+
+
+def canonical_image_url(url):
+    """The full-size asset of a commercetools size variant, any other URL as it is"""
+    parts = urlparse(url)
+    if not (parts.hostname or '').endswith(VARIANT_HOST_SUFFIX):
+        return url
+    path = VARIANT_RE.sub(r'\2', parts.path)
+    return url if path == parts.path else urlunparse(parts._replace(path=path))
+
+
+def is_branding(url):
+    """Site logos, icons and other tenant assets, which are not product images"""
+    parts = urlparse(url)
+    if parts.hostname in SITE_HOSTS and any(parts.path.startswith(path) for path in BRANDING_PATHS):
+        return True
+    return bool(BRANDING_NAME_RE.search(parts.path.rsplit('/', 1)[-1]))
+
+
+def canonical_images(urls):
+    """Canonical product image URLs, without branding and duplicates, in their first order"""
+    if hasattr(urls, 'tolist'):
+        # Parquet list columns come back as arrays
+        urls = urls.tolist()
+    if not isinstance(urls, (list, tuple)):
+        # e.g. the joined URLs of a CSV feed
+        return urls
+    images = {}
+    for url in urls:
+        if isinstance(url, str) and url and not is_branding(url):
+            images.setdefault(canonical_image_url(url), None)
+    return list(images)
+
+
+class ImageIndex:
+    def __init__(self, path, commit_every=50):
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript(SCHEMA)
+        self.commit_every = commit_every
+        self.pending = 0
+
+    def lookup(self, url):
+        """(path, checksum) of a downloaded URL, or None"""
+        return self.db.execute('SELECT path, checksum FROM images WHERE url = ?', (url,)).fetchone()
+
+    def has_content(self, checksum):
+        """Whether an image with this content hash is stored already"""
+        return self.db.execute('SELECT 1 FROM images WHERE checksum = ? LIMIT 1', (checksum,)).fetchone() is not None
+
+    def add(self, url, checksum, path):
+        self.db.execute('INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?)', (url, checksum, path, time()))
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        self.db.commit()
+        self.pending = 0
+
+    def close(self):
+        self.commit()
+        self.db.close()
@@ -0,0 +1,74 @@
+"""
+Validator store for incremental recrawls.
+
+For every product URL that was scraped from a response carrying an ETag or
+Last-Modified header, the store keeps those validators together with the
+item that was extracted. On the next crawl ConditionalGetMiddleware sends
+If-None-Match / If-Modified-Since, and a 304 answer is turned back into the
+stored item without parsing the page again.
+"""
+import json
+import sqlite3
+from time import time
+from weakref import WeakKeyDictionary
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS validators (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    item TEXT NOT NULL,
+    updated REAL NOT NULL
+)
+"""
+
+_stores = WeakKeyDictionary()
+
+
+class ValidatorStore:
+    def __init__(self, path, commit_every=50):
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute(SCHEMA)
+        self.commit_every = commit_every
+        self.pending = 0
+
+    @classmethod
+    def for_crawler(cls, crawler):
+        """The store shared by the downloader and spider middlewares of one crawler"""
+        if crawler not in _stores:
+            settings = crawler.settings
+            _stores[crawler] = cls(settings.get('INCREMENTAL_STORE'), settings.getint('INCREMENTAL_COMMIT_EVERY', 50))
+        return _stores[crawler]
+
+    def lookup(self, url):
+        """Return (etag, last_modified, item dict) for a URL, or None"""
+        row = self.db.execute(
+            'SELECT etag, last_modified, item FROM validators WHERE url = ?', (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def save(self, url, etag, last_modified, item):
+        self.db.execute(
+            'INSERT OR REPLACE INTO validators VALUES (?, ?, ?, ?, ?)',
+            (url, etag, last_modified, json.dumps(item, ensure_ascii=False), time())
+        )
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.commit()
+
+    def touch(self, url):
+        self.db.execute('UPDATE validators SET updated = ? WHERE url = ?', (time(), url))
+
+    def commit(self):
+        self.db.commit()
+        self.pending = 0
+
+    def close(self):
+        # Both middlewares close the shared store
+        if self.db is not None:
+            self.db.commit()
+            self.db.close()
+            self.db = None
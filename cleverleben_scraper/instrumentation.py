@@ -0,0 +1,132 @@
+"""
+Crawl instrumentation that is cheap enough to leave on in production.
+
+- Timings: per-crawler duration samples for spider callbacks (recorded by
+  InstrumentationMiddleware) and pipeline stages (recorded by @timed_stage).
+  Counts and totals go into the stats as they happen; p50/p95/max over the
+  most recent samples are written to the stats on every snapshot.
+- StatsSnapshots: an extension that appends the full stats, as one JSON
+  object per line, to INSTRUMENTATION_SNAPSHOT_FILE every
+  INSTRUMENTATION_SNAPSHOT_INTERVAL seconds and once more at the end.
+
+Selector hit/miss counts come from Extractor.extract(report=...), see
+CleverSpider.record_selector.
+"""
+import json
+import math
+import os
+from collections import defaultdict, deque
+from datetime import datetime
+from functools import wraps
+from time import perf_counter, time
+from weakref import WeakKeyDictionary
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+try:
+    from scrapy.utils.asyncio import create_looping_call
+except ImportError:  # Scrapy < 2.13
+    from twisted.internet.task import LoopingCall as create_looping_call
+
+# Duration samples kept per timer for the percentiles
+SAMPLES = 10_000
+
+_timings = WeakKeyDictionary()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Timings:
+    def __init__(self, stats):
+        self.stats = stats
+        self.samples = defaultdict(lambda: deque(maxlen=SAMPLES))
+        self.totals = defaultdict(float)
+
+    @classmethod
+    def for_crawler(cls, crawler):
+        """The timings of one crawler, shared by the middleware, the pipelines and the extension"""
+        if crawler not in _timings:
+            _timings[crawler] = cls(crawler.stats)
+        return _timings[crawler]
+
+    def record(self, name, seconds):
+        self.samples[name].append(seconds)
+        self.stats.inc_value(f'timing/{name}/count')
+        self.totals[name] += seconds
+        self.stats.set_value(f'timing/{name}/total_ms', round(self.totals[name] * 1000, 3))
+
+    def publish(self):
+        """Write the percentiles of the recent samples into the stats"""
+        for name, samples in self.samples.items():
+            values = list(samples)
+            self.stats.set_value(f'timing/{name}/p50_ms', round(percentile(values, 50) * 1000, 3))
+            self.stats.set_value(f'timing/{name}/p95_ms', round(percentile(values, 95) * 1000, 3))
+            self.stats.set_value(f'timing/{name}/max_ms', round(max(values) * 1000, 3))
+
+
+def timed_stage(process_item):
+    """
+    Time a pipeline's process_item as the stage pipeline/<class name>.
+    Does nothing unless INSTRUMENTATION_ENABLED is set.
+    """
+    @wraps(process_item)
+    def wrapper(self, item, spider):
+        crawler = getattr(spider, 'crawler', None)
+        if crawler is None or crawler.stats is None or not crawler.settings.getbool('INSTRUMENTATION_ENABLED'):
+            return process_item(self, item, spider)
+        start = perf_counter()
+        try:
+            return process_item(self, item, spider)
+        finally:
+            Timings.for_crawler(crawler).record(f'pipeline/{type(self).__name__}', perf_counter() - start)
+    return wrapper
+
+
+class StatsSnapshots:
+    def __init__(self, crawler, path, interval):
+        self.crawler = crawler
+        self.path = path
+        self.interval = interval
+        self.task = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        path = settings.get('INSTRUMENTATION_SNAPSHOT_FILE')
+        if not settings.getbool('INSTRUMENTATION_ENABLED') or not path:
+            raise NotConfigured
+        ext = cls(crawler, path, settings.getfloat('INSTRUMENTATION_SNAPSHOT_INTERVAL', 60.0))
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def spider_opened(self, spider):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.task = create_looping_call(self.snapshot)
+        self.task.start(self.interval, now=False)
+
+    def spider_closed(self, spider, reason):
+        if self.task and self.task.running:
+            self.task.stop()
+        self.snapshot(reason)
+
+    def snapshot(self, reason=None):
+        Timings.for_crawler(self.crawler).publish()
+        stats = self.crawler.stats.get_stats()
+        record = {'time': time(), 'final': reason is not None, 'reason': reason}
+        record['stats'] = {
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in stats.items()
+        }
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
@@ -11,4 +11,6 @@ class CleverlebenItem(scrapy.Item):
     ingredients = scrapy.Field()
     details = scrapy.Field()
     currency = scrapy.Field()
-    product_id = scrapy.Field()
\ No newline at end of file
+    product_id = scrapy.Field()
+    # Stored product images, set by ProductImagesPipeline
+    image_files = scrapy.Field()
\ No newline at end of file
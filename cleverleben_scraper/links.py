@@ -0,0 +1,76 @@
+from functools import lru_cache
+from urllib.parse import urljoin
+
+from w3lib.url import canonicalize_url
+
+from cleverleben_scraper.dedup import ExactSeenSet
+
+# Upper bound for the crawl-wide canonicalization and classification caches
+CACHE_SIZE = 100_000
+
+
+class LinkHarvester:
+    """
+    Collects the followable links of a page in a single pass over its anchors.
+
+    Each distinct href on a page is canonicalized and classified once, and a
+    crawl-wide seen set drops links that were already handed out, so no
+    Request is built for them in the first place. The seen set can be any
+    set from dedup.py, or a SharedFrontier claim set when several processes
+    crawl together; its add() decides whether a link is new.
+    """
+
+    def __init__(self, classifier, inc_stat=None, seen=None):
+        self.classifier = classifier
+        self.inc_stat = inc_stat or (lambda key, count=1: None)
+        self.seen = ExactSeenSet() if seen is None else seen
+        self._canonicalize = lru_cache(maxsize=CACHE_SIZE)(canonicalize_url)
+        self._classify = lru_cache(maxsize=CACHE_SIZE)(classifier.classify)
+
+    def harvest(self, response, follow, also=(), where=None, listed=None):
+        """
+        Return [(url, url_class)] for new links whose class is in `follow`, in
+        document order. Links whose class is in `also` are returned on every
+        page without touching the seen set, for callers that do their own
+        bookkeeping (pagination). Links for which `where(url)` is false are
+        skipped before they reach the seen set. `listed`, if given, is a
+        {url_class: [url]} dict that receives every link of those classes on
+        the page, whether it was seen before or not.
+        """
+        links = []
+        hrefs = set()
+        duplicates = 0
+        for anchor in response.selector.root.iter('a'):
+            href = anchor.get('href')
+            if not href:
+                continue
+            href = href.strip()
+            if not href or href in hrefs:
+                continue
+            hrefs.add(href)
+
+            try:
+                url = self._canonicalize(urljoin(response.url, href))
+            except ValueError:
+                continue
+            if also and self._classify(url) in also:
+                links.append((url, self._classify(url)))
+                continue
+            if listed is not None and self._classify(url) in listed:
+                listed[self._classify(url)].append(url)
+            if url in self.seen:
+                duplicates += 1
+                continue
+            url_class = self._classify(url)
+            if url_class not in follow:
+                continue
+            if where is not None and not where(url):
+                continue
+            if not self.seen.add(url):
+                duplicates += 1
+                continue
+            links.append((url, url_class))
+
+        self.inc_stat('links/new', len(links))
+        self.inc_stat('links/duplicate', duplicates)
+        return links
@@ -3,7 +3,21 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import asyncio
+from collections import defaultdict
+from time import perf_counter
+
 from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured, StopDownload
+from scrapy.http import HtmlResponse, TextResponse
+from scrapy.utils.httpobj import urlparse_cached
+
+from cleverleben_scraper.frontier import SharedFrontier
+from cleverleben_scraper.incremental import ValidatorStore
+from cleverleben_scraper.instrumentation import Timings
+from cleverleben_scraper.slimming import can_slim, slim_body
+from cleverleben_scraper.throttle import EndpointThrottle, endpoint_of, retry_after
+from cleverleben_scraper.urls import ASSET, UrlClassifier
 
 # useful for handling different item types with a single interface
 from itemadapter import ItemAdapter
@@ -98,3 +112,460 @@ class CleverlebenScraperDownloaderMiddleware:
 
     def spider_opened(self, spider):
         spider.logger.info("Spider opened: %s" % spider.name)
+
+
+class ResponseSlimmingMiddleware:
+    """
+    Removes scripts (except JSON-LD), styles, inline SVG and comments from
+    HTML responses before the spider builds a selector tree from them, see
+    slimming.py. Runs after the HTTP cache, which keeps the full pages.
+    Pages still larger than the limit for their URL class in SLIMMING_MAXSIZE
+    are dropped.
+    """
+
+    def __init__(self, stats, maxsize):
+        self.stats = stats
+        self.maxsize = maxsize
+        self.classifier = UrlClassifier()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('SLIMMING_ENABLED'):
+            raise NotConfigured
+        return cls(crawler.stats, crawler.settings.getdict('SLIMMING_MAXSIZE'))
+
+    def process_response(self, request, response, spider):
+        if response.status != 200 or not isinstance(response, HtmlResponse) or not can_slim(response.encoding):
+            return response
+        body = slim_body(response.body)
+        self.stats.inc_value('slimming/responses')
+        self.stats.inc_value('slimming/bytes_removed', len(response.body) - len(body))
+
+        url_class = self.classifier.classify(request.url)
+        maxsize = self.maxsize.get(url_class)
+        if maxsize and len(body) > maxsize:
+            self.stats.inc_value(f'slimming/dropped/{url_class}')
+            raise IgnoreRequest(f"Larger than {maxsize} bytes for a {url_class} page: {response.url}")
+        if len(body) == len(response.body):
+            return response
+        return response.replace(body=body)
+
+
+class DownloadGuardMiddleware:
+    """
+    Keeps non-HTML and oversized responses out of the crawl.
+
+    Requests for URLs classified as assets are dropped before they are sent.
+    For everything else the body download is stopped as soon as the headers
+    show a Content-Type outside DOWNLOAD_GUARD_ALLOWED_TYPES or a
+    Content-Length above DOWNLOAD_GUARD_MAXSIZE, and the truncated response is
+    dropped. Cached responses are checked the same way.
+    """
+
+    def __init__(self, stats, allowed_types, maxsize):
+        self.stats = stats
+        self.allowed_types = [t.lower() for t in allowed_types]
+        self.maxsize = maxsize
+        self.classifier = UrlClassifier()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        s = cls(
+            crawler.stats,
+            crawler.settings.getlist('DOWNLOAD_GUARD_ALLOWED_TYPES', ['text/html']),
+            crawler.settings.getint('DOWNLOAD_GUARD_MAXSIZE', 0),
+        )
+        crawler.signals.connect(s.headers_received, signal=signals.headers_received)
+        return s
+
+    def process_request(self, request, spider):
+        if self.is_exempt(request):
+            return None
+        if self.classifier.classify(request.url) == ASSET:
+            self.stats.inc_value('download_guard/ignored/asset_url')
+            raise IgnoreRequest(f"Asset URL: {request.url}")
+        return None
+
+    def headers_received(self, headers, body_length, request, spider):
+        if self.is_exempt(request):
+            return
+        reason = self.rejection_reason(headers, body_length)
+        if reason:
+            request.meta['download_guard'] = reason
+            raise StopDownload(fail=False)
+
+    def process_response(self, request, response, spider):
+        if self.is_exempt(request):
+            return response
+        reason = request.meta.get('download_guard') or self.rejection_reason(response.headers, len(response.body))
+        if reason:
+            self.stats.inc_value(f'download_guard/ignored/{reason}')
+            raise IgnoreRequest(f"Rejected by {reason}: {response.url}")
+        return response
+
+    def is_exempt(self, request):
+        # robots.txt is fetched through the downloader middlewares too, and
+        # media pipelines download assets on purpose
+        return request.url.endswith('/robots.txt') or request.meta.get('download_guard_exempt', False)
+
+    def rejection_reason(self, headers, body_length):
+        content_type = headers.get('Content-Type')
+        if content_type:
+            content_type = content_type.decode('latin1').split(';')[0].strip().lower()
+            if content_type not in self.allowed_types:
+                return 'content_type'
+        if self.maxsize:
+            content_length = headers.get('Content-Length')
+            length = int(content_length) if content_length and content_length.isdigit() else body_length
+            if length and length > self.maxsize:
+                return 'content_length'
+        return None
+
+
+class ConditionalGetMiddleware:
+    """
+    Incremental recrawls: sends the validators stored for a URL
+    (If-None-Match / If-Modified-Since) and, when the server answers
+    304 Not Modified, hands the stored item to the spider in
+    request.meta['incremental_item'] so the page is not parsed again.
+    Enabled with INCREMENTAL_ENABLED.
+    """
+
+    def __init__(self, store, stats):
+        self.store = store
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('INCREMENTAL_ENABLED'):
+            raise NotConfigured
+        s = cls(ValidatorStore.for_crawler(crawler), crawler.stats)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def process_request(self, request, spider):
+        if request.meta.get('incremental_skip'):
+            return None
+        stored = self.store.lookup(request.url)
+        if stored is None:
+            return None
+        etag, last_modified, item = stored
+        if etag:
+            request.headers['If-None-Match'] = etag
+        if last_modified:
+            request.headers['If-Modified-Since'] = last_modified
+        request.meta['incremental_item'] = item
+        # Let the 304 through HttpErrorMiddleware to the callback
+        request.meta['handle_httpstatus_list'] = request.meta.get('handle_httpstatus_list', []) + [304]
+        self.stats.inc_value('incremental/conditional_requests')
+        return None
+
+    def process_response(self, request, response, spider):
+        if 'incremental_item' not in request.meta or 'cached' in response.flags:
+            return response
+        if response.status == 304:
+            self.stats.inc_value('incremental/not_modified')
+            self.store.touch(request.url)
+            return response
+        self.stats.inc_value('incremental/modified')
+        return response
+
+    def spider_closed(self, spider):
+        self.store.close()
+
+
+class IncrementalItemMiddleware:
+    """
+    Spider-side half of the incremental mode: stores each item scraped from
+    a response that has an ETag or Last-Modified header, with those
+    validators, for ConditionalGetMiddleware to use on the next crawl.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('INCREMENTAL_ENABLED'):
+            raise NotConfigured
+        s = cls(ValidatorStore.for_crawler(crawler))
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def process_spider_output(self, response, result, spider):
+        for i in result:
+            self.record(response, i)
+            yield i
+
+    async def process_spider_output_async(self, response, result, spider):
+        async for i in result:
+            self.record(response, i)
+            yield i
+
+    def record(self, response, i):
+        if response.status != 200 or not ItemAdapter.is_item(i):
+            return
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not (etag or last_modified):
+            return
+        url = response.request.url if response.request is not None else response.url
+        self.store.save(
+            url,
+            etag.decode('latin1') if etag else None,
+            last_modified.decode('latin1') if last_modified else None,
+            ItemAdapter(i).asdict(),
+        )
+
+    def spider_closed(self, spider):
+        self.store.close()
+
+
+class InstrumentationMiddleware:
+    """
+    Times every spider callback (time spent producing its output, without the
+    other middlewares) and records response body sizes per callback, as
+    timing/callback/<name>/* and response_bytes/<name>/* stats.
+    """
+
+    def __init__(self, stats, timings):
+        self.stats = stats
+        self.timings = timings
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('INSTRUMENTATION_ENABLED'):
+            raise NotConfigured
+        s = cls(crawler.stats, Timings.for_crawler(crawler))
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def callback_name(self, response):
+        callback = response.request.callback if response.request is not None else None
+        return getattr(callback, '__name__', 'parse')
+
+    def process_spider_input(self, response, spider):
+        name = self.callback_name(response)
+        size = len(response.body)
+        self.stats.inc_value(f'response_bytes/{name}/total', size)
+        self.stats.max_value(f'response_bytes/{name}/max', size)
+        return None
+
+    def process_spider_output(self, response, result, spider):
+        elapsed = 0.0
+        iterator = iter(result)
+        try:
+            while True:
+                start = perf_counter()
+                try:
+                    i = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed += perf_counter() - start
+                yield i
+        finally:
+            self.timings.record(f'callback/{self.callback_name(response)}', elapsed)
+
+    async def process_spider_output_async(self, response, result, spider):
+        elapsed = 0.0
+        iterator = result.__aiter__()
+        try:
+            while True:
+                start = perf_counter()
+                try:
+                    i = await iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    elapsed += perf_counter() - start
+                yield i
+        finally:
+            self.timings.record(f'callback/{self.callback_name(response)}', elapsed)
+
+    def spider_closed(self, spider):
+        self.timings.publish()
+
+
+class FrontierThrottleMiddleware:
+    """
+    Crawl-wide politeness for sharded crawls: before it is downloaded, every
+    request waits for a slot of its host in the shared frontier, so requests
+    of all shards together are SHARD_DOWNLOAD_DELAY apart. Runs after the
+    HTTP cache, cached responses are not delayed.
+    """
+
+    def __init__(self, frontier, delay, stats):
+        self.frontier = frontier
+        self.delay = delay
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.get('SHARD_FRONTIER'):
+            raise NotConfigured
+        return cls(
+            SharedFrontier.for_crawler(crawler),
+            crawler.settings.getfloat('SHARD_DOWNLOAD_DELAY'),
+            crawler.stats,
+        )
+
+    async def process_request(self, request, spider):
+        wait = self.frontier.reserve(urlparse_cached(request).hostname, self.delay)
+        if wait > 0:
+            self.stats.inc_value('frontier/throttled')
+            await asyncio.sleep(wait)
+        return None
+
+
+class AdaptiveThrottleMiddleware:
+    """
+    Lets an EndpointThrottle per host and endpoint (listing, product, asset)
+    follow the responses of that endpoint, see throttle.py. All endpoints of
+    a host share its download slot, which is crawled at the pace of its most
+    constrained endpoint: the lowest concurrency, never above
+    CONCURRENT_REQUESTS_PER_DOMAIN, and the longest delay. Cached responses
+    and requests dropped by other middlewares are not counted.
+    """
+
+    def __init__(self, crawler, endpoints, target_latency, window, error_rate, max_concurrency):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.endpoints = endpoints
+        self.target_latency = target_latency
+        self.window = window
+        self.error_rate = error_rate
+        self.max_concurrency = max_concurrency
+        self.classifier = UrlClassifier()
+        self.throttles = {}
+        # Download slot -> the keys of the endpoint throttles that share it
+        self.slot_throttles = defaultdict(set)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('ADAPTIVE_THROTTLE_ENABLED'):
+            raise NotConfigured
+        s = cls(
+            crawler,
+            settings.getdict('ADAPTIVE_THROTTLE_ENDPOINTS'),
+            settings.getfloat('ADAPTIVE_THROTTLE_TARGET_LATENCY', 1.0),
+            settings.getint('ADAPTIVE_THROTTLE_WINDOW', 20),
+            settings.getfloat('ADAPTIVE_THROTTLE_ERROR_RATE', 0.1),
+            settings.getint('CONCURRENT_REQUESTS_PER_DOMAIN', 8),
+        )
+        crawler.signals.connect(s.request_reached_downloader, signal=signals.request_reached_downloader)
+        return s
+
+    def process_request(self, request, spider):
+        host = urlparse_cached(request).hostname
+        # Requests that chose their own slot keep it, all others share the host's slot
+        slot = request.meta.setdefault('download_slot', host)
+        endpoint = endpoint_of(self.classifier.classify(request.url))
+        key = f'{host}|{endpoint}'
+        request.meta['throttle_slot'] = key
+        if key not in self.throttles:
+            self.throttles[key] = EndpointThrottle(
+                self.endpoints.get(endpoint, {}), self.target_latency, self.window, self.error_rate,
+            )
+        self.slot_throttles[slot].add(key)
+        return None
+
+    def request_reached_downloader(self, request, spider):
+        # The downloader creates slots with the global defaults, and drops idle ones. The
+        # slot exists once the request reached the downloader and before it is sent, so
+        # the limits are applied here, to the first request of a slot too.
+        if 'throttle_slot' in request.meta:
+            self.apply(request.meta['download_slot'])
+
+    def process_response(self, request, response, spider):
+        throttle = self.throttles.get(request.meta.get('throttle_slot'))
+        if throttle is None or 'cached' in response.flags:
+            return response
+        wait = retry_after(response.headers.get('Retry-After')) if response.status == 429 else None
+        change = throttle.record(request.meta.get('download_latency'), response.status, wait=wait)
+        self.changed(request, spider, throttle, change)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        throttle = self.throttles.get(request.meta.get('throttle_slot'))
+        if throttle is None or isinstance(exception, IgnoreRequest):
+            return None
+        self.changed(request, spider, throttle, throttle.record(error=True))
+        return None
+
+    def changed(self, request, spider, throttle, change):
+        if change is None:
+            return
+        key = request.meta['throttle_slot']
+        self.stats.inc_value(f'throttle/{key}/{change}')
+        self.stats.set_value(f'throttle/{key}/concurrency', throttle.concurrency)
+        self.stats.set_value(f'throttle/{key}/delay', round(throttle.delay, 3))
+        spider.logger.debug(
+            f"Throttle {change} for {key}: concurrency {throttle.concurrency}, delay {throttle.delay:.2f}s"
+        )
+        self.apply(request.meta['download_slot'])
+
+    def limits(self, slot):
+        """(concurrency, delay) of a download slot, from the throttles of its endpoints"""
+        throttles = [self.throttles[key] for key in self.slot_throttles[slot]]
+        concurrency = min(self.max_concurrency, *(throttle.concurrency for throttle in throttles))
+        return max(1, concurrency), max(throttle.delay for throttle in throttles)
+
+    def apply(self, slot):
+        downloader_slot = self.crawler.engine.downloader.slots.get(slot)
+        if downloader_slot is not None:
+            downloader_slot.concurrency, downloader_slot.delay = self.limits(slot)
+
+
+class ReleaseResponseMiddleware:
+    """
+    Drops the selector tree and the decoded text of a response as soon as
+    the callback has produced all its output, instead of when the last of
+    its items has left the pipelines.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('SLIMMING_ENABLED'):
+            raise NotConfigured
+        return cls()
+
+    def process_spider_output(self, response, result, spider):
+        try:
+            yield from result
+        finally:
+            self.release(response)
+
+    async def process_spider_output_async(self, response, result, spider):
+        try:
+            async for i in result:
+                yield i
+        finally:
+            self.release(response)
+
+    def release(self, response):
+        if isinstance(response, TextResponse):
+            response._cached_selector = None
+            response._cached_ubody = None
+
+
+class MockSiteMiddleware:
+    """
+    Load tests only: sends every request to the mock site at MOCKSITE_URL
+    (mocksite.py) as an HTTP proxy, so URLs keep their real hosts.
+    """
+
+    def __init__(self, proxy):
+        self.proxy = proxy
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        proxy = crawler.settings.get('MOCKSITE_URL')
+        if not proxy:
+            raise NotConfigured
+        return cls(proxy)
+
+    def process_request(self, request, spider):
+        request.meta['proxy'] = self.proxy
+        return None
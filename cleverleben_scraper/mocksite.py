@@ -0,0 +1,195 @@
+"""
+A local stand-in for www.cleverleben.at with a catalog of any size.
+
+MockCatalog derives every page from its number alone, so a catalog of a
+million products costs no memory. The URL shapes are the ones UrlClassifier
+knows:
+
+    /produktauswahl                   start page, links every category
+    /lebensmittel, /getraenke-2, ...  categories, link their subcategories and a few products
+    /produkte/<slug>-<n>[?page=N]     listings of PAGE_SIZE products, with a link to the next page
+    /produkt/<slug>-<id>              product pages with the DOM fields, JSON-LD and page bloat
+
+serve() answers plain and proxy-style requests (GET http://www.cleverleben.at/...),
+so a crawl reaches it by sending every request through it as an HTTP proxy
+(MockSiteMiddleware, MOCKSITE_URL), and the URLs keep the hosts the spider
+expects. The module does not import Scrapy, the server runs in a process of
+its own.
+
+    python -m cleverleben_scraper.mocksite --products 100000 --port 8398
+"""
+import argparse
+import json
+import math
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+SITE = 'http://www.cleverleben.at'
+IMAGE_HOST = 'http://images.cdn.europe-west1.gcp.commercetools.com/mock'
+
+CATEGORY_NAMES = ['lebensmittel', 'getraenke', 'haushalt', 'tiernahrung']
+FIRST_PRODUCT_ID = 100000
+
+
+class MockCatalog:
+    def __init__(self, products=100_000, categories=8, subcategories=25, page_size=24,
+                 featured=4, page_kb=50):
+        self.products = products
+        self.categories = categories
+        self.subcategories = subcategories
+        self.page_size = page_size
+        self.featured = featured
+        # Inline script per page, like the real pages carry
+        self.bloat = 'var state = "' + 'x' * (page_kb * 1024) + '";'
+
+    @property
+    def listings(self):
+        return self.categories * self.subcategories
+
+    def category_path(self, c):
+        name = CATEGORY_NAMES[c % len(CATEGORY_NAMES)]
+        rounds = c // len(CATEGORY_NAMES)
+        return f'/{name}' if rounds == 0 else f'/{name}-{rounds + 1}'
+
+    def listing_path(self, t):
+        return f'/produkte/sortiment-{t}'
+
+    def product_path(self, i):
+        return f'/produkt/artikel-{i}-{FIRST_PRODUCT_ID + i}'
+
+    def listing_products(self, t):
+        """Products are dealt to the listings round-robin"""
+        return range(t, self.products, self.listings)
+
+    def page_count(self, t):
+        return max(1, math.ceil(len(self.listing_products(t)) / self.page_size))
+
+    def page(self, path, query):
+        """(status, HTML) for a path of the site"""
+        if path == '/robots.txt':
+            return 200, 'User-agent: *\nAllow: /\n'
+        if path == '/produktauswahl':
+            return 200, self.start_page()
+        if path.startswith('/produkt/'):
+            i = self._number(path) - FIRST_PRODUCT_ID
+            return (200, self.product_page(i)) if 0 <= i < self.products else (404, 'not found')
+        if path.startswith('/produkte/'):
+            t = self._number(path)
+            page = query.get('page', ['1'])[0]
+            page = int(page) if page.isdigit() else 0
+            if 0 <= t < self.listings and 1 <= page <= self.page_count(t):
+                return 200, self.listing_page(t, page)
+            return 404, 'not found'
+        for c in range(self.categories):
+            if path.rstrip('/') == self.category_path(c):
+                return 200, self.category_page(c)
+        return 404, 'not found'
+
+    def _number(self, path):
+        tail = path.rstrip('/').rsplit('-', 1)[-1]
+        return int(tail) if tail.isdigit() else -1
+
+    def layout(self, title, body):
+        nav = ''.join(f'<a href="{SITE}{self.category_path(c)}">{c}</a>' for c in range(self.categories))
+        return (
+            f'<!DOCTYPE html><html><head><title>{title} | clever</title>'
+            f'<style>.nav a {{ margin: 0 4px; }}</style><script>{self.bloat}</script></head>'
+            f'<body><nav class="nav">{nav}</nav>{body}'
+            f'<svg viewBox="0 0 10 10"><path d="M0 0L10 10"/></svg></body></html>'
+        )
+
+    def start_page(self):
+        links = ''.join(f'<a href="{SITE}{self.category_path(c)}">Kategorie {c}</a>' for c in range(self.categories))
+        return self.layout('Produktauswahl', f'<h1>Produktauswahl</h1>{links}')
+
+    def category_page(self, c):
+        listings = range(c * self.subcategories, (c + 1) * self.subcategories)
+        links = ''.join(f'<a href="{SITE}{self.listing_path(t)}">Sortiment {t}</a>' for t in listings)
+        # A few products straight from the category page, which the listings link again
+        featured = ''.join(
+            f'<a href="{SITE}{self.product_path(i)}">Artikel {i}</a>'
+            for t in listings[:self.featured] for i in self.listing_products(t)[:1]
+        )
+        return self.layout(f'Kategorie {c}', f'<h1>Kategorie {c}</h1>{links}{featured}')
+
+    def listing_page(self, t, page):
+        start = (page - 1) * self.page_size
+        products = self.listing_products(t)[start:start + self.page_size]
+        links = ''.join(
+            f'<div class="product-tile"><a href="{SITE}{self.product_path(i)}">Artikel {i}</a></div>'
+            for i in products
+        )
+        if page < self.page_count(t):
+            links += f'<a class="next" href="{SITE}{self.listing_path(t)}?page={page + 1}">Weiter</a>'
+        return self.layout(f'Sortiment {t}', f'<h1>Sortiment {t}</h1>{links}')
+
+    def product_page(self, i):
+        name = f'Clever Artikel {i}, {100 + i % 900}g'
+        price = f'{1 + (i * 37) % 1000 / 100:.2f}'
+        image = f'{IMAGE_HOST}/{FIRST_PRODUCT_ID + i}.png'
+        jsonld = json.dumps({
+            '@context': 'https://schema.org',
+            '@type': 'Product',
+            'name': name,
+            'image': [image],
+            'description': f'Beschreibung von Artikel {i}, einem Produkt aus dem Sortiment {i % self.listings}.',
+            'offers': {'@type': 'Offer', 'price': price, 'priceCurrency': 'EUR'},
+        })
+        body = (
+            f'<script type="application/ld+json">{jsonld}</script>'
+            f'<h1 itemprop="name">{name}</h1>'
+            f'<span itemprop="price">{price}</span>'
+            f'<div class="product-image"><img itemprop="image" src="{image}">'
+            f'<img src="{IMAGE_HOST}/{FIRST_PRODUCT_ID + i}-medium.png"></div>'
+            f'<div itemprop="description">Beschreibung von Artikel {i}, einem Produkt aus dem Sortiment.</div>'
+            f'<table><tr><td>Zutaten</td><td>Wasser, Zucker, Salz ({i % 7}%)</td></tr>'
+            f'<tr><td>Produktinformation</td><td>Artikelnummer {FIRST_PRODUCT_ID + i}</td></tr></table>'
+        )
+        return self.layout(name, body)
+
+
+class MockSiteHandler(BaseHTTPRequestHandler):
+    catalog = None
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        # Proxy requests carry the absolute URL
+        parts = urlsplit(self.path)
+        status, text = self.catalog.page(parts.path or '/', parse_qs(parts.query))
+        body = text.encode('utf-8')
+        self.send_response(status)
+        content_type = 'text/plain' if parts.path == '/robots.txt' or status != 200 else 'text/html'
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(catalog, host='127.0.0.1', port=8398):
+    """Serve the catalog until the process is stopped"""
+    handler = type('Handler', (MockSiteHandler,), {'catalog': catalog})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a mock cleverleben catalog')
+    parser.add_argument('--products', type=int, default=100_000)
+    parser.add_argument('--categories', type=int, default=8)
+    parser.add_argument('--subcategories', type=int, default=25, help='listings per category')
+    parser.add_argument('--page-size', type=int, default=24, help='products per listing page')
+    parser.add_argument('--page-kb', type=int, default=50, help='inline script per page, in KB')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8398)
+    args = parser.parse_args()
+    catalog = MockCatalog(args.products, args.categories, args.subcategories, args.page_size, page_kb=args.page_kb)
+    print(f"Serving {args.products} products on http://{args.host}:{args.port}")
+    serve(catalog, args.host, args.port)
+
+
+if __name__ == '__main__':
+    main()
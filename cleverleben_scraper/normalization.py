@@ -0,0 +1,156 @@
+"""
+Field normalization for scraped products.
+
+FIELD_TRANSFORMS declares, per field, the function that normalizes a value;
+all regular expressions are compiled once, here. A Normalizer applies them
+to one item (CleverlebenScraperPipeline), to a micro-batch of items, or to a
+whole pandas DataFrame with vectorized string operations, for re-normalizing
+existing feeds after a crawl (normalize_feed.py). All three give the same
+values.
+
+pandas is an optional dependency, only normalize_frame needs it.
+"""
+import re
+
+from cleverleben_scraper.images import canonical_images
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+WHITESPACE_RE = re.compile(r'\s+')
+# Everything but word characters, whitespace and € . , ! ? % -
+SPECIAL_CHARS_RE = re.compile(r'[^\w\s€.,!?%-]')
+PRICE_RE = re.compile(r'(\d+[.,]\d+|\d+)')
+# The last number in the last path segment of a product URL
+UNIQUE_ID_RE = re.compile(r'(\d+)(?=[^/]*$)')
+
+
+def clean_text(text):
+    """Collapse whitespace and remove special characters"""
+    if isinstance(text, str):
+        text = SPECIAL_CHARS_RE.sub('', ' '.join(text.split()))
+    return text
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def clean_price(price):
+    """'1,99 €' -> '1.99'; numbers from structured data are formatted with two decimals"""
+    if is_number(price):
+        return f'{price:.2f}'
+    if isinstance(price, str):
+        # The spider already stores plain prices like '1.99', no regex needed for those
+        whole, dot, fraction = price.partition('.')
+        if price.isascii() and whole.isdigit() and (fraction.isdigit() or not dot):
+            return price
+        match = PRICE_RE.search(price)
+        if match:
+            return match.group(1).replace(',', '.')
+    return price
+
+
+TEXT_FIELDS = ('product_name', 'product_description', 'ingredients', 'details')
+
+FIELD_TRANSFORMS = {
+    **{field: clean_text for field in TEXT_FIELDS},
+    'price': clean_price,
+    # Full-size commercetools assets only, without logos, see images.py
+    'image': canonical_images,
+}
+
+
+class Normalizer:
+    def __init__(self, transforms=None):
+        self.transforms = list((FIELD_TRANSFORMS if transforms is None else transforms).items())
+
+    def normalize(self, item):
+        """Normalize one item in place and return it"""
+        for field, transform in self.transforms:
+            value = item.get(field)
+            if value is not None and value != '':
+                item[field] = transform(value)
+
+        # Ensure unique_id is present, from the URL as a fallback
+        if not item.get('unique_id'):
+            match = UNIQUE_ID_RE.search(item.get('product_url') or '')
+            if match:
+                item['unique_id'] = match.group(1)
+
+        # Ensure product_id is present
+        if not item.get('product_id'):
+            item['product_id'] = item.get('unique_id', '')
+        return item
+
+    def normalize_batch(self, items):
+        """Normalize a list of items in place and return it"""
+        normalize = self.normalize
+        for item in items:
+            normalize(item)
+        return items
+
+    def normalize_frame(self, frame):
+        """
+        A normalized copy of a DataFrame with one row per item. Text and
+        price columns are normalized with pandas string operations instead
+        of one Python call per value.
+        """
+        if pd is None:
+            raise RuntimeError('Normalizing a DataFrame requires pandas (pip install pandas)')
+        frame = frame.copy()
+        for field, transform in self.transforms:
+            if field not in frame:
+                continue
+            if transform is clean_text:
+                frame[field] = self._clean_text_column(frame[field])
+            elif transform is clean_price:
+                frame[field] = self._clean_price_column(frame[field])
+            else:
+                column = frame[field]
+                present = column.notna() & (column != '')
+                frame.loc[present, field] = column[present].map(transform)
+
+        if 'product_url' in frame:
+            unique_id = frame['unique_id'] if 'unique_id' in frame else pd.Series(None, index=frame.index, dtype=object)
+            missing = unique_id.isna() | (unique_id == '')
+            if missing.any():
+                found = frame.loc[missing, 'product_url'].str.extract(UNIQUE_ID_RE, expand=False)
+                unique_id = unique_id.astype(object)
+                unique_id.loc[missing] = found.where(found.notna(), unique_id[missing])
+            frame['unique_id'] = unique_id
+        if 'unique_id' in frame:
+            product_id = frame['product_id'] if 'product_id' in frame else pd.Series(None, index=frame.index, dtype=object)
+            missing = product_id.isna() | (product_id == '')
+            product_id = product_id.astype(object)
+            product_id.loc[missing] = frame.loc[missing, 'unique_id'].fillna('')
+            frame['product_id'] = product_id
+        return frame
+
+    @staticmethod
+    def _clean_text_column(column):
+        if not pd.api.types.is_object_dtype(column) and not pd.api.types.is_string_dtype(column):
+            return column
+        cleaned = (
+            column.str.replace(WHITESPACE_RE, ' ', regex=True)
+            .str.strip()
+            .str.replace(SPECIAL_CHARS_RE, '', regex=True)
+        )
+        # Values that are not strings come back as NaN, they are kept as they were
+        return cleaned.where(cleaned.notna(), column)
+
+    @staticmethod
+    def _clean_price_column(column):
+        if pd.api.types.is_bool_dtype(column):
+            return column
+        if pd.api.types.is_numeric_dtype(column):
+            return column.map('{:.2f}'.format).where(column.notna(), column)
+        extracted = column.str.extract(PRICE_RE, expand=False).str.replace(',', '.', regex=False)
+        cleaned = extracted.where(extracted.notna(), column)
+        # Numbers in an object column, e.g. JSON-LD prices in a mixed feed
+        numbers = column.map(is_number) & column.notna()
+        if numbers.any():
+            cleaned.loc[numbers] = column[numbers].map(clean_price)
+        return cleaned
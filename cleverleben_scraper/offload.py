@@ -0,0 +1,66 @@
+"""
+Product extraction outside the reactor thread.
+
+ExtractionPool runs the spider's extract_product in a pool of worker
+processes (or threads, on a free-threaded Python build where threads run in
+parallel). Each worker keeps its own spider instance; a response goes over as
+(url, body, encoding) and comes back as a plain dict of item fields plus the
+stats the extraction counted, which the spider applies in the main process.
+
+Awaiting a result needs the asyncio reactor, Scrapy's default.
+"""
+import asyncio
+import multiprocessing
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from scrapy.http import HtmlResponse
+
+_spider = None
+
+
+def free_threaded():
+    """True on a Python build without the GIL"""
+    return not getattr(sys, '_is_gil_enabled', lambda: True)()
+
+
+def _init_worker(spidercls, extraction_mode, instrument_selectors):
+    global _spider
+    _spider = spidercls()
+    _spider.extraction_mode = extraction_mode
+    _spider.instrument_selectors = instrument_selectors
+
+
+def _extract(url, body, encoding):
+    response = HtmlResponse(url=url, body=body, encoding=encoding)
+    stats = Counter()
+
+    def inc_stat(key, count=1):
+        stats[key] += count
+
+    item = _spider.extract_product(response, inc_stat)
+    return dict(item), dict(stats)
+
+
+class ExtractionPool:
+    def __init__(self, spider, workers):
+        initargs = (type(spider), spider.extraction_mode, spider.instrument_selectors)
+        if free_threaded():
+            self.executor = ThreadPoolExecutor(workers, initializer=_init_worker, initargs=initargs)
+        else:
+            # Workers are started fresh, not forked from the running reactor
+            self.executor = ProcessPoolExecutor(
+                workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=initargs,
+            )
+
+    def extract(self, response):
+        """Awaitable (item fields, stats) for a product response"""
+        future = self.executor.submit(_extract, response.url, response.body, response.encoding)
+        return asyncio.wrap_future(future)
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
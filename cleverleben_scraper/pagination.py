@@ -0,0 +1,79 @@
+from collections import Counter, defaultdict
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+# Query parameters that never change the listing content
+IGNORED_PARAMS = ('utm_', 'fbclid', 'gclid')
+
+
+class Paginator:
+    """
+    Follows the page sequence of each listing exactly once.
+
+    Listing URLs are normalized (sorted query, tracking parameters and the
+    page parameter removed) into a listing key, so ?page=1, a missing page
+    parameter and reordered query strings all count as the same page. From
+    page N only page N+1 is requested, and only if the page links to it,
+    it was not requested before, and page N lists products that the earlier
+    pages of its listing did not. Products that were already linked from
+    another listing still count: the next page can hold ones nobody has seen.
+    """
+
+    def __init__(self, page_param='page', inc_stat=None):
+        self.page_param = page_param
+        self.inc_stat = inc_stat or (lambda key, count=1: None)
+        self.requested = defaultdict(set)
+        self.listed = defaultdict(set)
+        self.pages = Counter()
+
+    def split(self, url):
+        """Return (listing key, page number) for a listing URL"""
+        parts = urlparse(url)
+        page = 1
+        params = []
+        for name, value in parse_qsl(parts.query, keep_blank_values=False):
+            if name == self.page_param:
+                page = int(value) if value.isdigit() and int(value) > 0 else 1
+            elif not name.startswith(IGNORED_PARAMS):
+                params.append((name, value))
+        key = urlunparse(parts._replace(query=urlencode(sorted(params)), fragment=''))
+        return key, page
+
+    def page_url(self, key, page):
+        """URL of a page of a listing; page 1 is the listing key itself"""
+        if page == 1:
+            return key
+        parts = urlparse(key)
+        params = parse_qsl(parts.query) + [(self.page_param, str(page))]
+        return urlunparse(parts._replace(query=urlencode(sorted(params))))
+
+    def next_page(self, url, page_links, products):
+        """
+        Record that `url` was parsed and return the URL of the next page to
+        request, or None. `page_links` are the pagination links found on the
+        page, `products` all product links on it, new to the crawl or not.
+        """
+        key, page = self.split(url)
+        self.requested[key].add(page)
+        self.pages[key] += 1
+        listing = urlparse(key).path.lstrip('/')
+        self.inc_stat(f'pagination/pages/{listing}')
+        if self.pages[key] == 1:
+            self.inc_stat('pagination/listings')
+
+        listed = self.listed[key]
+        new_products = [product for product in products if product not in listed]
+        listed.update(new_products)
+        if not new_products:
+            self.inc_stat('pagination/stopped/no_new_products')
+            return None
+
+        next_number = page + 1
+        if not any(self.split(link) == (key, next_number) for link in page_links):
+            self.inc_stat('pagination/stopped/last_page')
+            return None
+        if next_number in self.requested[key]:
+            self.inc_stat('pagination/stopped/already_requested')
+            return None
+
+        self.requested[key].add(next_number)
+        return self.page_url(key, next_number)
@@ -1,47 +1,235 @@
-import re
+import hashlib
+import json
+import mimetypes
+import os
+from io import BytesIO
+from urllib.parse import urlparse
+
+from itemadapter import ItemAdapter
+from scrapy import Request, signals
+from scrapy.exceptions import DropItem, NotConfigured
+from scrapy.pipelines.files import FilesPipeline
+
+from cleverleben_scraper.dedup import build_seen_set
+from cleverleben_scraper.delta import DeltaIndex
+from cleverleben_scraper.images import ImageIndex
+from cleverleben_scraper.instrumentation import timed_stage
+from cleverleben_scraper.normalization import Normalizer
+from cleverleben_scraper.store import ProductStore
+
 
 class CleverlebenScraperPipeline:
+    """Normalizes the text, price and id fields of every item, see normalization.py"""
+
+    def __init__(self, normalizer=None):
+        self.normalizer = normalizer or Normalizer()
+
+    @timed_stage
     def process_item(self, item, spider):
-        # Clean all string fields
-        for field in ['product_name', 'product_description', 'ingredients', 'details']:
-            if field in item and item[field]:
-                item[field] = self.clean_text(item[field])
-        
-        # Clean price field
-        if 'price' in item and item['price']:
-            item['price'] = self.clean_price(item['price'])
-        
-        # Ensure unique_id is present
-        if not item.get('unique_id'):
-            # Extract from URL as fallback
-            url = item.get('product_url', '')
-            match = re.search(r'(\d+)(?=[^/]*$)', url)
-            if match:
-                item['unique_id'] = match.group(1)
-        
-        # Ensure product_id is present
-        if not item.get('product_id'):
-            item['product_id'] = item.get('unique_id', '')
-        
+        return self.normalizer.normalize(item)
+
+
+class DuplicateFilterPipeline:
+    """
+    Drops items whose unique_id was already emitted. The same id set is
+    handed to the spider, which then stops requesting those product pages.
+    """
+
+    def __init__(self, seen, stats=None):
+        self.seen = seen
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        # With JOBDIR the ids belong to the job, so resuming it keeps them
+        jobdir = settings.get('JOBDIR')
+        seen = build_seen_set(
+            settings.get('DEDUP_MODE', 'exact'),
+            capacity=settings.getint('DEDUP_CAPACITY', 1_000_000),
+            error_rate=settings.getfloat('DEDUP_ERROR_RATE', 0.001),
+            path=os.path.join(jobdir, 'dedup.sqlite') if jobdir else settings.get('DEDUP_PATH'),
+            resume=bool(jobdir),
+        )
+        return cls(seen, crawler.stats)
+
+    def open_spider(self, spider):
+        spider.emitted_ids = self.seen
+
+    def close_spider(self, spider):
+        self.seen.close()
+
+    @timed_stage
+    def process_item(self, item, spider):
+        key = item.get('unique_id') or item.get('product_url')
+        if not key:
+            return item
+        if not self.seen.add(key):
+            self.stats.inc_value('dedup/dropped_items')
+            raise DropItem(f"Duplicate product {key}")
+        self.stats.inc_value('dedup/unique_items')
         return item
-    
-    def clean_text(self, text):
-        """Clean and normalize text"""
-        if isinstance(text, str):
-            # Remove extra whitespace
-            text = ' '.join(text.split())
-            # Remove special characters but keep essential ones
-            text = re.sub(r'[^\w\s€.,!?%-]', '', text)
-        return text
-    
-    def clean_price(self, price):
-        """Clean price string"""
-        if isinstance(price, str):
-            # Extract numbers and decimals
-            price_match = re.search(r'(\d+[.,]\d+|\d+)', price)
-            if price_match:
-                clean_price = price_match.group(1)
-                # Replace comma with dot for decimal
-                clean_price = clean_price.replace(',', '.')
-                return clean_price
-        return price
\ No newline at end of file
+
+
+class DeltaPipeline:
+    """
+    Writes the products that were added, changed or removed since the last
+    crawl to DELTA_FILE (JSON lines), see delta.py. Removals are only written
+    when the crawl finished, a partial crawl did not see the whole catalog.
+    """
+
+    def __init__(self, index_path, delta_path, resume, stats):
+        self.index_path = index_path
+        self.delta_path = delta_path
+        self.resume = resume
+        self.stats = stats
+        self.index = None
+        self.file = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('DELTA_ENABLED'):
+            raise NotConfigured
+        pipeline = cls(
+            settings.get('DELTA_INDEX'),
+            settings.get('DELTA_FILE'),
+            bool(settings.get('JOBDIR')),
+            crawler.stats,
+        )
+        crawler.signals.connect(pipeline.spider_closed, signal=signals.spider_closed)
+        return pipeline
+
+    def open_spider(self, spider):
+        self.index = DeltaIndex(self.index_path, resume=self.resume)
+        # A resumed run adds to the delta of its first part
+        self.file = open(self.delta_path, 'a' if self.index.resumed else 'w', encoding='utf-8')
+
+    @timed_stage
+    def process_item(self, item, spider):
+        data = ItemAdapter(item).asdict()
+        record = self.index.track(data.get('unique_id') or data.get('product_url'), data)
+        if record is None:
+            self.stats.inc_value('delta/unchanged')
+        else:
+            self.write(record)
+        return item
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        self.stats.inc_value(f"delta/{record['op']}")
+        # Keep the feed in step with the committed index
+        if self.index.pending == 0:
+            self.file.flush()
+
+    def spider_closed(self, spider, reason):
+        if self.index is None:
+            return
+        try:
+            if reason == 'finished':
+                for record in self.index.finish():
+                    self.write(record)
+        finally:
+            self.index.close()
+            self.file.close()
+
+
+class ProductStorePipeline:
+    """Upserts every item into the indexed product store at PRODUCT_STORE_PATH, see store.py"""
+
+    def __init__(self, path, commit_every=100):
+        self.path = path
+        self.commit_every = commit_every
+        self.store = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('PRODUCT_STORE_ENABLED'):
+            raise NotConfigured
+        return cls(settings.get('PRODUCT_STORE_PATH'), settings.getint('PRODUCT_STORE_COMMIT_EVERY', 100))
+
+    def open_spider(self, spider):
+        self.store = ProductStore(self.path, self.commit_every)
+
+    def close_spider(self, spider):
+        self.store.close()
+
+    @timed_stage
+    def process_item(self, item, spider):
+        self.store.upsert(ItemAdapter(item).asdict())
+        return item
+
+
+class ProductImagesPipeline(FilesPipeline):
+    """
+    Downloads the (canonical, see images.py) product images of every item
+    through the crawl's downloader, so the adaptive throttle bounds the
+    connections to the image CDN. Files are stored under the SHA-256 of their
+    content: an image that is already stored is not written again, and a URL
+    that is in the ImageIndex from an earlier crawl is not downloaded again.
+    """
+
+    index = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('PRODUCT_IMAGES_ENABLED'):
+            raise NotConfigured
+        pipeline = super().from_crawler(crawler)
+        pipeline.index_path = crawler.settings.get('PRODUCT_IMAGES_INDEX')
+        pipeline.stats = crawler.stats
+        return pipeline
+
+    def open_spider(self, spider):
+        super().open_spider(spider)
+        self.index = ImageIndex(self.index_path)
+
+    def close_spider(self, spider):
+        self.index.close()
+
+    def get_media_requests(self, item, info):
+        # Image URLs are off-site and look like assets, and the HTTP cache would store them twice
+        return [
+            Request(url, dont_filter=True, meta={'download_guard_exempt': True, 'dont_cache': True})
+            for url in ItemAdapter(item).get(self.files_urls_field) or []
+        ]
+
+    def media_to_download(self, request, info, *, item=None):
+        stored = self.index.lookup(request.url)
+        if stored is None or not self.is_stored(stored[0]):
+            return None
+        self.stats.inc_value('images/uptodate')
+        path, checksum = stored
+        return {'url': request.url, 'path': path, 'checksum': checksum, 'status': 'uptodate'}
+
+    def file_path(self, request, response=None, info=None, *, item=None):
+        if response is None:
+            return super().file_path(request, response, info, item=item)
+        checksum = self.checksum(request, response)
+        return f'full/{checksum[:2]}/{checksum}{self.extension(request.url)}'
+
+    def file_downloaded(self, response, request, info, *, item=None):
+        checksum = self.checksum(request, response)
+        path = self.file_path(request, response, info, item=item)
+        if self.index.has_content(checksum) and self.is_stored(path):
+            self.stats.inc_value('images/shared')
+        else:
+            self.store.persist_file(path, BytesIO(response.body), info)
+            self.stats.inc_value('images/stored')
+        self.index.add(request.url, checksum, path)
+        return checksum
+
+    def checksum(self, request, response):
+        if 'image_checksum' not in request.meta:
+            request.meta['image_checksum'] = hashlib.sha256(response.body).hexdigest()
+        return request.meta['image_checksum']
+
+    def extension(self, url):
+        ext = os.path.splitext(urlparse(url).path)[1].lower()
+        return ext if ext in mimetypes.types_map else ''
+
+    def is_stored(self, path):
+        # Only a filesystem store can be checked cheaply, other stores are trusted
+        basedir = getattr(self.store, 'basedir', None)
+        return basedir is None or os.path.exists(os.path.join(basedir, path))
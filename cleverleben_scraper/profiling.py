@@ -0,0 +1,232 @@
+"""
+Opt-in profiling of a running crawl (PROFILING_ENABLED, run_spider.py --profile).
+
+- CPU: a SIGPROF interval timer samples the Python stack every
+  PROFILING_INTERVAL seconds of CPU time. Each sample is attributed to the
+  spider callback on the stack (or to 'engine' when none is), so the time
+  spent extracting products and the time spent fanning out listings are
+  told apart. Profiles are written in the folded-stack format that
+  flamegraph.pl and speedscope read.
+- Memory: tracemalloc heap snapshots every PROFILING_HEAP_EVERY scraped
+  items, each with a text report of the top allocators and of the growth
+  since the previous snapshot.
+
+Sending PROFILING_SIGNAL (kill -USR1 <pid>) dumps both right away, while the
+crawl keeps running. At the end, summary.txt lists the slowest functions and
+the top allocators. All files go to PROFILING_DIR.
+
+Disabled, the extension is not loaded at all; it needs a POSIX system for
+the CPU sampling and the dump signal.
+"""
+import logging
+import os
+import signal
+import tracemalloc
+from collections import Counter
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+logger = logging.getLogger(__name__)
+
+# Frames kept per CPU sample, counted from the innermost one
+MAX_DEPTH = 64
+
+ENGINE = 'engine'
+
+OWN_FILES = {tracemalloc.__file__, __file__}
+
+
+def frame_label(code):
+    """module:function of a code object, as used in the profiles"""
+    filename = code.co_filename
+    module = os.path.splitext(os.path.basename(filename))[0] if filename else '?'
+    return f'{module}:{code.co_name}'
+
+
+class CpuSampler:
+    """Collects stacks of the main thread on SIGPROF, by spider callback"""
+
+    def __init__(self, callbacks, interval):
+        # Code objects of the spider's methods; the outermost one on a stack names the callback
+        self.callbacks = callbacks
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.previous = None
+
+    def start(self):
+        self.previous = signal.signal(signal.SIGPROF, self.sample)
+        self.resume()
+
+    def pause(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+
+    def resume(self):
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        self.pause()
+        signal.signal(signal.SIGPROF, self.previous or signal.SIG_DFL)
+
+    def sample(self, signum, frame):
+        codes = []
+        callback = ENGINE
+        while frame is not None and len(codes) < MAX_DEPTH:
+            code = frame.f_code
+            codes.append(code)
+            if code in self.callbacks:
+                callback = code.co_name
+            frame = frame.f_back
+        self.stacks[callback, tuple(codes)] += 1
+        self.samples += 1
+
+    def folded(self):
+        """Lines of 'callback;outer;...;inner count', outermost frame first"""
+        folded = Counter()
+        for (callback, codes), count in self.stacks.items():
+            path = ';'.join(frame_label(code) for code in reversed(codes))
+            folded[f'{callback};{path}'] += count
+        return [f'{stack} {count}' for stack, count in sorted(folded.items())]
+
+    def by_callback(self):
+        counts = Counter()
+        for (callback, _), count in self.stacks.items():
+            counts[callback] += count
+        return counts
+
+    def functions(self):
+        """(self samples, total samples) per function"""
+        own, total = Counter(), Counter()
+        for (_, codes), count in self.stacks.items():
+            if codes:
+                own[frame_label(codes[0])] += count
+            for label in {frame_label(code) for code in codes}:
+                total[label] += count
+        return own, total
+
+
+class CrawlProfiler:
+    def __init__(self, crawler, directory, interval, heap_every, heap_frames, dump_signal, top):
+        self.crawler = crawler
+        self.directory = directory
+        self.interval = interval
+        self.heap_every = heap_every
+        self.heap_frames = heap_frames
+        self.dump_signal = dump_signal
+        self.top = top
+        self.cpu = None
+        self.items = 0
+        self.dumps = 0
+        self.first_heap = None
+        self.last_heap = None
+        self.previous_handler = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('PROFILING_ENABLED'):
+            raise NotConfigured
+        if not hasattr(signal, 'setitimer'):
+            logger.warning("Profiling needs a POSIX system, PROFILING_ENABLED is ignored")
+            raise NotConfigured
+        dump_signal = settings.get('PROFILING_SIGNAL')
+        ext = cls(
+            crawler,
+            settings.get('PROFILING_DIR'),
+            settings.getfloat('PROFILING_INTERVAL', 0.01),
+            settings.getint('PROFILING_HEAP_EVERY'),
+            settings.getint('PROFILING_HEAP_FRAMES', 8),
+            getattr(signal, dump_signal) if dump_signal else None,
+            settings.getint('PROFILING_TOP', 20),
+        )
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(ext.item_scraped, signal=signals.item_scraped)
+        return ext
+
+    def spider_opened(self, spider):
+        os.makedirs(self.directory, exist_ok=True)
+        callbacks = {
+            value.__code__ for value in vars(type(spider)).values() if hasattr(value, '__code__')
+        }
+        self.cpu = CpuSampler(callbacks, self.interval)
+        self.cpu.start()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.heap_frames)
+        self.first_heap = self.last_heap = tracemalloc.take_snapshot()
+        if self.dump_signal is not None:
+            self.previous_handler = signal.signal(self.dump_signal, self.on_signal)
+        logger.info(
+            "Profiling to %s (pid %s, send %s to dump now)", self.directory, os.getpid(),
+            signal.Signals(self.dump_signal).name if self.dump_signal is not None else 'no signal',
+        )
+
+    def spider_closed(self, spider, reason):
+        if self.dump_signal is not None:
+            signal.signal(self.dump_signal, self.previous_handler or signal.SIG_DFL)
+        self.dump('final')
+        self.cpu.stop()
+        self.write_summary(reason)
+        tracemalloc.stop()
+        logger.info("Profiling summary in %s", os.path.join(self.directory, 'summary.txt'))
+
+    def item_scraped(self, item, response, spider):
+        self.items += 1
+        if self.heap_every and self.items % self.heap_every == 0:
+            self.dump(f'{self.items}-items')
+
+    def on_signal(self, signum, frame):
+        # Dump between two reactor iterations, not in the middle of a callback
+        from twisted.internet import reactor
+        reactor.callFromThread(self.dump, 'signal')
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def dump(self, label):
+        """Write the CPU profile so far and a heap snapshot with its reports"""
+        # The dump itself is not part of the crawl's CPU profile
+        self.cpu.pause()
+        self.dumps += 1
+        name = f'{self.dumps:03d}-{label}'
+        with open(self.path(f'cpu-{name}.folded'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.cpu.folded()) + '\n')
+        heap = tracemalloc.take_snapshot()
+        heap.dump(self.path(f'heap-{name}.tracemalloc'))
+        with open(self.path(f'heap-{name}.txt'), 'w', encoding='utf-8') as f:
+            f.write(f'Top allocators after {self.items} items\n')
+            f.write(self.format_stats(heap.statistics('lineno')))
+            f.write('\nGrowth since the previous snapshot\n')
+            f.write(self.format_stats(heap.compare_to(self.last_heap, 'lineno')))
+        self.last_heap = heap
+        self.cpu.resume()
+        self.crawler.stats.inc_value('profiling/dumps')
+        logger.info("Profile %s written to %s", name, self.directory)
+
+    def format_stats(self, stats):
+        # The profiler's own allocations are noise in the reports
+        stats = [stat for stat in stats if stat.traceback[0].filename not in OWN_FILES]
+        return ''.join(f'  {stat}\n' for stat in stats[:self.top])
+
+    def write_summary(self, reason):
+        own, total = self.cpu.functions()
+        samples = self.cpu.samples or 1
+        lines = [
+            f'Crawl finished ({reason}) after {self.items} items, '
+            f'{self.cpu.samples} CPU samples every {self.interval * 1000:g} ms',
+            '',
+            'CPU samples by callback',
+        ]
+        lines += [f'  {count:>8}  {count / samples:6.1%}  {name}' for name, count in self.cpu.by_callback().most_common()]
+        lines += ['', 'Slowest functions (own samples, with callees)']
+        lines += [
+            f'  {count:>8}  {count / samples:6.1%}  {total[name] / samples:6.1%}  {name}'
+            for name, count in own.most_common(self.top)
+        ]
+        lines += ['', 'Top allocators']
+        lines.append(self.format_stats(self.last_heap.statistics('lineno')).rstrip('\n'))
+        lines += ['', 'Growth since the crawl started']
+        lines.append(self.format_stats(self.last_heap.compare_to(self.first_heap, 'lineno')).rstrip('\n'))
+        with open(self.path('summary.txt'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
@@ -0,0 +1,127 @@
+"""
+Offline re-extraction: rebuild the product feeds from the HTTP cache.
+
+After a selector fix, the cached product pages are extracted again instead
+of being crawled again. Responses are read straight from the cache (a
+filesystem cache directory or a SqliteCacheStorage file), filtered by URL
+class and cache timestamp, and extracted in a pool of worker processes with
+the same worker setup as ExtractionPool. The items then go through the same
+checks as in a crawl: CleverSpider.accept_product, the Normalizer and
+duplicate suppression by unique_id. No scheduler, downloader or delays are
+involved.
+"""
+import multiprocessing
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from scrapy.http import TextResponse
+
+from cleverleben_scraper import offload
+from cleverleben_scraper.dedup import ExactSeenSet
+from cleverleben_scraper.exporters import FeedWriter
+from cleverleben_scraper.items import CleverlebenItem
+from cleverleben_scraper.normalization import Normalizer
+from cleverleben_scraper.replay import iter_cached_responses
+from cleverleben_scraper.urls import PRODUCT, UrlClassifier
+
+# URL classes whose pages have an extractor; listings only yield links
+EXTRACTED_CLASSES = [PRODUCT]
+
+
+def select_pages(cache_dir, stats, url_classes=(PRODUCT,), since=None, until=None, classifier=None):
+    """
+    Yield (url, body, encoding) of the cached HTML pages of `url_classes`,
+    stored between the timestamps `since` and `until` (either can be None)
+    """
+    classifier = classifier or UrlClassifier()
+    url_classes = set(url_classes)
+    for meta, response in iter_cached_responses(cache_dir):
+        stats['responses'] += 1
+        timestamp = meta.get('timestamp')
+        if timestamp is not None and (
+            (since is not None and timestamp < since) or (until is not None and timestamp >= until)
+        ):
+            stats['skipped/timestamp'] += 1
+            continue
+        if classifier.classify(meta['url']) not in url_classes:
+            stats['skipped/url_class'] += 1
+            continue
+        if response.status != 200 or not isinstance(response, TextResponse):
+            stats['skipped/not_html'] += 1
+            continue
+        yield response.url, response.body, response.encoding
+
+
+def _extract_chunk(pages):
+    return [(url, *offload._extract(url, body, encoding)) for url, body, encoding in pages]
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for value in iterable:
+        chunk.append(value)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def extract_pages(pages, spider, workers=None, chunk_size=50):
+    """
+    Yield (url, item fields, extraction stats) for `pages`, in their order.
+    Pages are sent to the workers in chunks, and only a few chunks per worker
+    are in flight, so the cache is never loaded into memory as a whole.
+    """
+    initargs = (type(spider), spider.extraction_mode, spider.instrument_selectors)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        offload._init_worker(*initargs)
+        for chunk in _chunks(pages, chunk_size):
+            yield from _extract_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=offload._init_worker,
+        initargs=initargs,
+    ) as executor:
+        pending = deque()
+        for chunk in _chunks(pages, chunk_size):
+            pending.append(executor.submit(_extract_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def reextract(cache_dir, outputs, spider, workers=None, url_classes=(PRODUCT,), since=None, until=None):
+    """
+    Extract the selected cached pages again and write the items to `outputs`
+    ({path: feed format}). Returns the stats: items written, pages skipped
+    and why, and the extraction stats of the workers.
+    """
+    unknown = set(url_classes) - set(EXTRACTED_CLASSES)
+    if unknown:
+        raise ValueError(f'No extractor for the URL classes {sorted(unknown)}, expected {EXTRACTED_CLASSES}')
+    stats = Counter()
+    normalizer = Normalizer()
+    seen = ExactSeenSet()
+    pages = select_pages(cache_dir, stats, url_classes, since, until, spider.url_classifier)
+    with FeedWriter(outputs) as writer:
+        for url, fields, extraction_stats in extract_pages(pages, spider, workers):
+            stats.update(extraction_stats)
+            stats['pages'] += 1
+            item = spider.accept_product(CleverlebenItem(fields), url)
+            if item is None:
+                stats['rejected'] += 1
+                continue
+            item = normalizer.normalize(item)
+            if not seen.add(item.get('unique_id') or url):
+                stats['dedup/dropped_items'] += 1
+                continue
+            writer.export_item(item)
+        stats['items'] = writer.count
+    return stats
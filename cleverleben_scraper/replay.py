@@ -0,0 +1,93 @@
+import os
+import pickle
+from urllib.parse import urlparse
+
+from scrapy.http import Headers, Request, TextResponse
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import get_project_settings
+from scrapy.utils.test import get_crawler
+from w3lib.http import headers_raw_to_dict
+
+from cleverleben_scraper.httpcache import iter_cache_db
+
+DEFAULT_CACHE_DIR = os.path.join('.scrapy', 'httpcache', 'clever_spider')
+
+
+def iter_cache_dirs(cache_dir=DEFAULT_CACHE_DIR):
+    """Yield every entry directory of a filesystem HTTP cache, sorted by path"""
+    for bucket in sorted(os.listdir(cache_dir)):
+        bucket_path = os.path.join(cache_dir, bucket)
+        if not os.path.isdir(bucket_path):
+            continue
+        for key in sorted(os.listdir(bucket_path)):
+            entry_path = os.path.join(bucket_path, key)
+            if os.path.exists(os.path.join(entry_path, 'pickled_meta')):
+                yield entry_path
+
+
+def load_cached_response(entry_path):
+    """Rebuild the Response stored in one filesystem cache entry"""
+    with open(os.path.join(entry_path, 'pickled_meta'), 'rb') as f:
+        meta = pickle.load(f)
+    with open(os.path.join(entry_path, 'response_headers'), 'rb') as f:
+        headers = Headers(headers_raw_to_dict(f.read()))
+    with open(os.path.join(entry_path, 'response_body'), 'rb') as f:
+        body = f.read()
+
+    url = meta['response_url']
+    respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+    response = respcls(
+        url=url,
+        status=meta['status'],
+        headers=headers,
+        body=body,
+        request=Request(meta['url']),
+    )
+    return meta, response
+
+
+def iter_cached_responses(cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Yield (meta, response) for every entry in the cache, either a filesystem
+    cache directory or a SqliteCacheStorage database file
+    """
+    if os.path.isfile(cache_dir):
+        yield from iter_cache_db(cache_dir)
+        return
+    for entry_path in iter_cache_dirs(cache_dir):
+        yield load_cached_response(entry_path)
+
+
+def route_callback(spider, response):
+    """
+    Pick the spider callback that would have handled this response during a crawl.
+    Returns the callback name, or None for responses the spider never parses.
+    """
+    if response.status != 200 or not isinstance(response, TextResponse):
+        return None
+
+    path = urlparse(response.url).path
+    if path == '/robots.txt':
+        return None
+    if path.rstrip('/') == urlparse(spider.start_urls[0]).path:
+        return 'parse'
+    if '/produkt/' in path:
+        return 'parse_product'
+    if '/produkte/' in path:
+        return 'parse_subcategory'
+    return 'parse_main_category'
+
+
+def build_spider(spidercls, settings=None):
+    """
+    Create a spider bound to a crawler with the project settings and a stats
+    collector, without starting the engine or installing a reactor.
+    """
+    if settings is None:
+        settings = get_project_settings()
+    # Nothing is downloaded, no reactor is needed
+    settings.set('TWISTED_REACTOR_ENABLED', False)
+    crawler = get_crawler(spidercls, settings.copy_to_dict())
+    spider = spidercls.from_crawler(crawler)
+    crawler.spider = spider
+    return spider
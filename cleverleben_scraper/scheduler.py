@@ -0,0 +1,89 @@
+"""
+Scheduler with a bounded memory queue.
+
+Scrapy keeps every pending request in memory unless JOBDIR is set. The
+BoundedScheduler keeps at most SCHEDULER_MEMORY_QUEUE_LIMIT requests in
+memory and spills the rest to a disk queue in a temporary directory, which is
+removed when the crawl ends. With JOBDIR, requests go to the persistent disk
+queue as usual.
+
+Requests are always popped in priority order across both queues, not memory
+first. With SQLite disk queues (SCHEDULER_DISK_QUEUE) every push and pop is
+committed, and the queue priorities, which Scrapy only records in
+active.json on a clean shutdown, are recovered from the queue file names
+after a crash, so a killed crawl resumes from where it was. Both need
+SCHEDULER_PRIORITY_QUEUE to be a ScrapyPriorityQueue.
+"""
+import os
+import re
+import shutil
+import tempfile
+
+from scrapy.core.scheduler import Scheduler
+from scrapy.pqueues import ScrapyPriorityQueue
+
+# Priority queue files in a disk queue directory: '<priority>' and '<priority>s' (start requests)
+QUEUE_FILE_RE = re.compile(r'^(-?\d+)s?$')
+
+
+class BoundedScheduler(Scheduler):
+    def __init__(self, dupefilter, jobdir=None, *args, memory_limit=10_000, **kwargs):
+        super().__init__(dupefilter, jobdir, *args, **kwargs)
+        self.memory_limit = memory_limit
+        self.spill_dir = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        scheduler = super().from_crawler(crawler)
+        if not issubclass(scheduler.pqclass, ScrapyPriorityQueue):
+            raise ValueError(
+                f'{cls.__name__} requires SCHEDULER_PRIORITY_QUEUE to be a ScrapyPriorityQueue, '
+                f'not {scheduler.pqclass.__name__}'
+            )
+        scheduler.memory_limit = crawler.settings.getint('SCHEDULER_MEMORY_QUEUE_LIMIT', 10_000)
+        return scheduler
+
+    def open(self, spider):
+        if self.dqdir is None and self.memory_limit > 0:
+            self.spill_dir = tempfile.mkdtemp(prefix='scheduler-')
+            self.dqdir = self.spill_dir
+        return super().open(spider)
+
+    def close(self, reason):
+        result = super().close(reason)
+        if self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+        return result
+
+    def _dqpush(self, request):
+        # Spilling: memory first, disk only once the memory queue is full
+        if self.spill_dir is not None and len(self.mqs) < self.memory_limit:
+            return False
+        pushed = super()._dqpush(request)
+        if pushed and self.spill_dir is not None:
+            self.stats.inc_value('scheduler/spilled')
+        return pushed
+
+    def next_request(self):
+        # Priority queues store -request.priority, so the lower curprio is more urgent
+        disk = getattr(self.dqs, 'curprio', None)
+        memory = getattr(self.mqs, 'curprio', None)
+        if disk is not None and memory is not None and disk < memory:
+            request = self._dqpop()
+            if request is not None:
+                self.stats.inc_value('scheduler/dequeued/disk')
+                self.stats.inc_value('scheduler/dequeued')
+                return request
+        return super().next_request()
+
+    def _read_dqs_state(self, dqdir):
+        # active.json is missing after a crash, and stale if an earlier run shut down
+        # cleanly and a later one did not, so the queue files on disk are added to it
+        state = set(super()._read_dqs_state(dqdir))
+        if os.path.isdir(dqdir):
+            state.update(
+                int(match.group(1))
+                for match in map(QUEUE_FILE_RE.match, os.listdir(dqdir))
+                if match
+            )
+        return sorted(state)
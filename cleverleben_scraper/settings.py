@@ -9,10 +9,23 @@ ROBOTSTXT_OBEY = True
 DOWNLOAD_DELAY = 1
 RANDOMIZE_DOWNLOAD_DELAY = True
 
-# Auto throttle
-AUTOTHROTTLE_ENABLED = True
-AUTOTHROTTLE_START_DELAY = 1
-AUTOTHROTTLE_MAX_DELAY = 10
+# Throttling: AdaptiveThrottleMiddleware tunes concurrency and delay per host and endpoint
+# (listing pages, product pages, assets) from latency, errors and 429s, see throttle.py.
+# Each endpoint starts at 'concurrency'/'delay' and never goes past 'max_concurrency' or
+# below 'min_delay'; 'max_delay' caps the backoff, except for a longer Retry-After of a 429.
+# The endpoints of a host share one download slot, which gets the lowest
+# concurrency (at most CONCURRENT_REQUESTS_PER_DOMAIN) and the longest delay of them.
+# AutoThrottle would fight over the same slot delays, so it is off.
+AUTOTHROTTLE_ENABLED = False
+ADAPTIVE_THROTTLE_ENABLED = True
+ADAPTIVE_THROTTLE_TARGET_LATENCY = 1.0
+ADAPTIVE_THROTTLE_WINDOW = 20
+ADAPTIVE_THROTTLE_ERROR_RATE = 0.1
+ADAPTIVE_THROTTLE_ENDPOINTS = {
+    'listing': {'concurrency': 2, 'max_concurrency': 8, 'delay': 1.0, 'min_delay': 0.25, 'max_delay': 10},
+    'product': {'concurrency': 4, 'max_concurrency': 8, 'delay': 0.5, 'min_delay': 0.25, 'max_delay': 10},
+    'asset': {'concurrency': 4, 'max_concurrency': 8, 'delay': 0.25, 'min_delay': 0, 'max_delay': 5},
+}
 
 # Set user agent
 USER_AGENT = 'cleverleben_scraper (+http://www.yourdomain.com)'
@@ -20,13 +33,156 @@ USER_AGENT = 'cleverleben_scraper (+http://www.yourdomain.com)'
 # Configure item pipelines
 ITEM_PIPELINES = {
     'cleverleben_scraper.pipelines.CleverlebenScraperPipeline': 300,
+    'cleverleben_scraper.pipelines.DuplicateFilterPipeline': 400,
+    'cleverleben_scraper.pipelines.ProductImagesPipeline': 450,
+    'cleverleben_scraper.pipelines.DeltaPipeline': 500,
+    'cleverleben_scraper.pipelines.ProductStorePipeline': 600,
+}
+
+# Duplicate products (same unique_id) are dropped, and product pages whose id was already
+# emitted are not requested. 'exact' keeps all ids in memory, 'bloom' uses a fixed-size
+# Bloom filter (a false positive drops a new product), 'disk' keeps the ids in SQLite
+# (in the JOBDIR when there is one, so only 'disk' remembers the ids when a crawl is resumed).
+DEDUP_MODE = 'exact'
+DEDUP_CAPACITY = 1_000_000
+DEDUP_ERROR_RATE = 0.001
+DEDUP_PATH = '.scrapy/dedup.sqlite'
+
+# Delta feed (off by default, run_spider.py --delta): the products added, changed (with the
+# changed fields) and removed since the last crawl, from a content-hash index per unique_id in
+# DELTA_INDEX. Removals are only written by a crawl that finished; a crawl resumed from its
+# JOBDIR continues the delta of its first part.
+DELTA_ENABLED = False
+DELTA_INDEX = '.scrapy/delta.sqlite'
+DELTA_FILE = 'output_delta.jsonl'
+
+# Product images (off by default): the canonical image URLs of every item are downloaded,
+# bounded by the 'asset' endpoint of the adaptive throttle, and stored in FILES_STORE under the
+# SHA-256 of their content. PRODUCT_IMAGES_INDEX maps image URLs to stored files across crawls.
+PRODUCT_IMAGES_ENABLED = False
+PRODUCT_IMAGES_INDEX = '.scrapy/images.sqlite'
+FILES_STORE = 'images'
+FILES_URLS_FIELD = 'image'
+FILES_RESULT_FIELD = 'image_files'
+
+# Product store (off by default, run_spider.py --store): every item is upserted into an indexed
+# SQLite database with full-text search over name, description and ingredients, for lookups
+# with query_products.py.
+PRODUCT_STORE_ENABLED = False
+PRODUCT_STORE_PATH = 'output_data.sqlite'
+PRODUCT_STORE_COMMIT_EVERY = 100
+
+# DownloadGuardMiddleware drops asset URLs and aborts non-HTML or oversized downloads after the headers.
+# It runs closer to the downloader than the HTTP cache, so aborted bodies are never cached.
+# ConditionalGetMiddleware sends stored validators when INCREMENTAL_ENABLED is set.
+DOWNLOADER_MIDDLEWARES = {
+    'cleverleben_scraper.middlewares.DownloadGuardMiddleware': 950,
+    # Assigns the per-endpoint download slot; cached responses are not counted
+    'cleverleben_scraper.middlewares.AdaptiveThrottleMiddleware': 940,
+    # Below the HTTP cache (900), so the cache stores full pages
+    'cleverleben_scraper.middlewares.ResponseSlimmingMiddleware': 800,
+    'cleverleben_scraper.middlewares.ConditionalGetMiddleware': 560,
+    # Sharded crawls only: wait for a crawl-wide request slot, after the HTTP cache
+    'cleverleben_scraper.middlewares.FrontierThrottleMiddleware': 960,
+    # Load tests only (run_loadtest.py): route all requests to the mock site, before HttpProxyMiddleware
+    'cleverleben_scraper.middlewares.MockSiteMiddleware': 100,
+}
+DOWNLOAD_GUARD_ALLOWED_TYPES = ['text/html', 'application/xhtml+xml']
+DOWNLOAD_GUARD_MAXSIZE = 2 * 1024 * 1024
+# Address of the mock site (cleverleben_scraper/mocksite.py) in load tests, None for real crawls
+MOCKSITE_URL = None
+
+# Incremental recrawls with conditional GETs (run_spider.py --incremental).
+# Validators and the last item of every product page are kept in INCREMENTAL_STORE.
+INCREMENTAL_ENABLED = False
+INCREMENTAL_STORE = '.scrapy/incremental.sqlite'
+SPIDER_MIDDLEWARES = {
+    'cleverleben_scraper.middlewares.IncrementalItemMiddleware': 600,
+    # Closest to the spider, so only the callback itself is timed
+    'cleverleben_scraper.middlewares.InstrumentationMiddleware': 990,
+    # Closest to the engine, so it sees the end of the callback output last
+    'cleverleben_scraper.middlewares.ReleaseResponseMiddleware': 10,
 }
 
+# Response slimming: HTML pages lose their scripts (JSON-LD stays), styles, inline SVG and
+# comments before they are parsed, and their selector tree is dropped when the callback is done.
+# Pages still larger than SLIMMING_MAXSIZE for their URL class (in bytes) are dropped.
+SLIMMING_ENABLED = True
+SLIMMING_MAXSIZE = {
+    'product': 512 * 1024,
+    'category': 1024 * 1024,
+    'subcategory': 1024 * 1024,
+    'pagination': 1024 * 1024,
+}
+
+# Selector hit/miss counts, callback and pipeline timings and response sizes in the crawl stats.
+# The stats are also appended to INSTRUMENTATION_SNAPSHOT_FILE as JSON lines every
+# INSTRUMENTATION_SNAPSHOT_INTERVAL seconds (no file: no snapshots).
+INSTRUMENTATION_ENABLED = True
+INSTRUMENTATION_SNAPSHOT_FILE = '.scrapy/stats.jsonl'
+INSTRUMENTATION_SNAPSHOT_INTERVAL = 60
+EXTENSIONS = {
+    'cleverleben_scraper.instrumentation.StatsSnapshots': 500,
+    'cleverleben_scraper.profiling.CrawlProfiler': 510,
+}
+
+# Opt-in profiling of a running crawl (run_spider.py --profile), written to PROFILING_DIR:
+# CPU stack samples per spider callback every PROFILING_INTERVAL seconds of CPU time, and a
+# tracemalloc heap snapshot every PROFILING_HEAP_EVERY items (0: only on the signal and at the
+# end). PROFILING_SIGNAL dumps both while the crawl keeps running. tracemalloc slows the crawl
+# down noticeably, and a snapshot of a large heap takes seconds.
+PROFILING_ENABLED = False
+PROFILING_DIR = '.scrapy/profile'
+PROFILING_INTERVAL = 0.01
+PROFILING_HEAP_EVERY = 10_000
+PROFILING_HEAP_FRAMES = 8
+PROFILING_SIGNAL = 'SIGUSR1'
+PROFILING_TOP = 20
+
 # Enable and configure HTTP caching
 HTTPCACHE_ENABLED = True
 HTTPCACHE_EXPIRATION_SECS = 3600
+# One compressed SQLite file per spider instead of six files per response. An existing
+# filesystem cache of the spider is migrated into it on the first crawl (or by migrate_httpcache.py).
+HTTPCACHE_STORAGE = 'cleverleben_scraper.httpcache.SqliteCacheStorage'
+HTTPCACHE_SQLITE_COMPRESSION = 6
+HTTPCACHE_SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+# A cached 304 is only meaningful together with the incremental store
+HTTPCACHE_IGNORE_HTTP_CODES = [304]
 
 FEED_EXPORT_ENCODING = 'utf-8'
+# Columnar output, written in row groups while the crawl runs (needs pyarrow)
+FEED_EXPORTERS = {
+    'parquet': 'cleverleben_scraper.exporters.ParquetItemExporter',
+}
+PARQUET_BATCH_SIZE = 500
+
+# Product pages: read the JSON-LD Product block first, DOM selectors only for missing fields ('jsonld' or 'dom')
+PRODUCT_EXTRACTION_MODE = 'jsonld'
+# Extract product pages in a pool of this many worker processes instead of on the reactor thread (0: inline).
+# Free-threaded Python builds use a thread pool instead.
+EXTRACTION_WORKERS = 0
+
+# Sharded crawls (run_spider.py --shards N) set these for every shard process: the shared
+# frontier database, the shard number and count, and the crawl-wide delay between requests
+# to one host (by default the spider's DOWNLOAD_DELAY). SHARD_FRONTIER = None is a normal crawl.
+SHARD_FRONTIER = None
+SHARD_INDEX = 0
+SHARD_COUNT = 1
+SHARD_DOWNLOAD_DELAY = None
+
+# Scheduling: requests are prioritized by URL class (CleverSpider.url_priorities), deeper
+# requests first within a class. At most SCHEDULER_MEMORY_QUEUE_LIMIT requests are kept in
+# memory, the rest waits in a disk queue. SQLite disk queues, also for the start requests, commit
+# every push and pop, so a crawl with JOBDIR (run_spider.py --jobdir) can be resumed even after it
+# was killed. BoundedScheduler needs one priority queue for the whole crawl, not Scrapy's default
+# of one per download slot.
+SCHEDULER = 'cleverleben_scraper.scheduler.BoundedScheduler'
+SCHEDULER_PRIORITY_QUEUE = 'scrapy.pqueues.ScrapyPriorityQueue'
+SCHEDULER_DISK_QUEUE = 'scrapy.squeues.PickleLifoSQLiteQueue'
+SCHEDULER_START_DISK_QUEUE = 'scrapy.squeues.PickleFifoSQLiteQueue'
+SCHEDULER_MEMORY_QUEUE_LIMIT = 10_000
+DEPTH_PRIORITY = -1
 
 # Set concurrent requests
 CONCURRENT_REQUESTS = 16
@@ -0,0 +1,140 @@
+"""
+Sharded crawls: N processes crawl the catalog together.
+
+Every shard fetches the start page and follows only the categories it owns
+(by a stable hash of the category URL). Below that, each link is followed by
+the first shard that claims it in the shared frontier (frontier.py), which
+also spaces out the requests of all shards per host. Each shard writes its
+own JSON-lines shard; merge_shards() combines them into the final outputs,
+ordered by unique_id, dropping products that several shards found.
+
+Everything lives in one work directory (.scrapy/shards by default):
+
+    frontier.sqlite     claims and request slots
+    shard-<n>.jsonl     items of shard n
+    merge.sqlite        index used by merge_shards
+"""
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+
+from scrapy.crawler import CrawlerProcess
+from scrapy.utils.project import get_project_settings
+
+from cleverleben_scraper.exporters import FeedWriter
+from cleverleben_scraper.items import CleverlebenItem
+from cleverleben_scraper.spiders.clever_spider import CleverSpider
+
+WORK_DIR = '.scrapy/shards'
+
+
+def shard_path(work_dir, index):
+    return os.path.join(work_dir, f'shard-{index}.jsonl')
+
+
+def shard_settings(index, count, work_dir, overrides=None):
+    """Project settings for one shard process"""
+    settings = get_project_settings()
+    for name, value in (overrides or {}).items():
+        settings.set(name, value)
+    # Resolve the limits the spider itself asks for, they are split across shards
+    CleverSpider.update_settings(settings)
+    delay = settings.get('SHARD_DOWNLOAD_DELAY')
+    delay = settings.getfloat('DOWNLOAD_DELAY') if delay is None else float(delay)
+
+    settings.setdict({
+        'SHARD_FRONTIER': os.path.join(work_dir, 'frontier.sqlite'),
+        'SHARD_INDEX': index,
+        'SHARD_COUNT': count,
+        'SHARD_DOWNLOAD_DELAY': delay,
+        # Politeness is enforced for all shards together by FrontierThrottleMiddleware
+        'DOWNLOAD_DELAY': 0,
+        'AUTOTHROTTLE_ENABLED': False,
+        'ADAPTIVE_THROTTLE_ENABLED': False,
+        'CONCURRENT_REQUESTS': max(1, settings.getint('CONCURRENT_REQUESTS') // count),
+        'CONCURRENT_REQUESTS_PER_DOMAIN': max(1, settings.getint('CONCURRENT_REQUESTS_PER_DOMAIN') // count),
+        # Shards share the cache, incremental and product store databases, commit every write
+        # so no shard holds the write lock for long
+        'HTTPCACHE_SQLITE_COMMIT_EVERY': 1,
+        'INCREMENTAL_COMMIT_EVERY': 1,
+        'PRODUCT_STORE_COMMIT_EVERY': 1,
+        'DEDUP_PATH': os.path.join(work_dir, f'dedup-{index}.sqlite'),
+        # A shard sees only part of the catalog, it cannot tell what was removed
+        'DELTA_ENABLED': False,
+        'INSTRUMENTATION_SNAPSHOT_FILE': (
+            os.path.join(work_dir, f'stats-{index}.jsonl')
+            if settings.get('INSTRUMENTATION_SNAPSHOT_FILE') else None
+        ),
+        'PROFILING_DIR': os.path.join(settings.get('PROFILING_DIR'), f'shard-{index}'),
+        'FEEDS': {shard_path(work_dir, index): {'format': 'jsonlines'}},
+    }, priority='cmdline')
+    return settings
+
+
+def run_shard(index, count, work_dir=WORK_DIR, overrides=None):
+    """Crawl one shard; runs in its own process, a Twisted reactor cannot be restarted"""
+    process = CrawlerProcess(shard_settings(index, count, work_dir, overrides))
+    process.crawl(CleverSpider.name)
+    process.start()
+
+
+def merge_shards(shard_files, outputs, work_dir=WORK_DIR, batch_size=500, fields=None):
+    """
+    Write the items of all shard files to `outputs` ({path: feed format}),
+    ordered by unique_id. If several shards scraped the same product, the
+    first shard wins. Items are indexed in SQLite, not held in memory.
+    `fields` are the columns of the outputs, feed_fields() by default.
+    Returns the number of items written.
+    """
+    index_path = os.path.join(work_dir, 'merge.sqlite')
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    db = sqlite3.connect(index_path)
+    db.execute('CREATE TABLE items (key TEXT PRIMARY KEY, item TEXT NOT NULL) WITHOUT ROWID')
+    for path in shard_files:
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                data = json.loads(line)
+                key = data.get('unique_id') or data.get('product_url')
+                db.execute('INSERT OR IGNORE INTO items VALUES (?, ?)', (key, line))
+    db.commit()
+
+    try:
+        with FeedWriter(outputs, batch_size, fields) as writer:
+            for (line,) in db.execute('SELECT item FROM items ORDER BY key'):
+                writer.export_item(CleverlebenItem(json.loads(line)))
+    finally:
+        db.close()
+    return writer.count
+
+
+def run_sharded(count, outputs, work_dir=WORK_DIR, overrides=None):
+    """
+    Crawl with `count` shard processes and merge their items into `outputs`.
+    Returns (number of items, names of the shards that failed).
+    """
+    if os.path.exists(work_dir):
+        shutil.rmtree(work_dir)
+    os.makedirs(work_dir)
+
+    context = multiprocessing.get_context('spawn')
+    shards = [
+        context.Process(target=run_shard, args=(index, count, work_dir, overrides), name=f'shard-{index}')
+        for index in range(count)
+    ]
+    for shard in shards:
+        shard.start()
+    for shard in shards:
+        shard.join()
+    failed = [shard.name for shard in shards if shard.exitcode != 0]
+
+    fields = shard_settings(0, count, work_dir, overrides).getlist('FEED_EXPORT_FIELDS')
+    item_count = merge_shards([shard_path(work_dir, index) for index in range(count)], outputs, work_dir, fields=fields)
+    return item_count, failed
@@ -0,0 +1,57 @@
+"""
+Response slimming.
+
+Large pages are mostly inline scripts, styles and SVG icons, none of which
+the spider reads. slim_body removes them from the raw HTML bytes before a
+selector tree is ever built, so lxml parses and keeps a much smaller
+document. JSON-LD scripts stay, the structured-data fast path reads them.
+
+The patterns work on the bytes of any ASCII-compatible encoding; bodies in
+UTF-16 or UTF-32 are left alone (see can_slim).
+"""
+import re
+
+# Opening tags of the removed subtrees, and comments; matched on the lowercased body
+OPENING_RE = re.compile(rb'<(script|style|svg)\b([^>]*)>|<!--')
+
+JSON_LD = b'application/ld+json'
+
+
+def can_slim(encoding):
+    """Whether byte patterns can be applied to a body in this encoding"""
+    encoding = (encoding or '').lower().replace('_', '-')
+    return not encoding.startswith(('utf-16', 'utf-32', 'utf16', 'utf32'))
+
+
+def slim_body(body):
+    """The HTML body without scripts (except JSON-LD), styles, inline SVG and comments"""
+    # Closing tags are found with bytes.find instead of lazy regex scans,
+    # which keeps this well below the cost of parsing the page
+    lower = body.lower()
+    parts = []
+    pos = 0
+    while True:
+        match = OPENING_RE.search(lower, pos)
+        if match is None:
+            break
+        tag = match.group(1)
+        if tag is None:
+            end = lower.find(b'-->', match.end())
+            end = end + 3 if end != -1 else -1
+        elif match.group(2).rstrip().endswith(b'/'):
+            # Self-closing <svg ... />
+            end = match.end()
+        else:
+            end = lower.find(b'</' + tag, match.end())
+            end = lower.find(b'>', end) + 1 if end != -1 else -1
+        if end <= 0:
+            break
+        if tag == b'script' and JSON_LD in match.group(2):
+            parts.append(body[pos:end])
+        else:
+            parts.append(body[pos:match.start()])
+        pos = end
+    if not parts:
+        return body
+    parts.append(body[pos:])
+    return b''.join(parts)
@@ -1,66 +1,195 @@
 import scrapy
+from scrapy import signals
+from cleverleben_scraper.exporters import feed_fields
 from cleverleben_scraper.items import CleverlebenItem
+from cleverleben_scraper.links import LinkHarvester
+from cleverleben_scraper.pagination import Paginator
+from cleverleben_scraper.urls import CATEGORY, PAGINATION, PRODUCT, SUBCATEGORY, UrlClassifier, product_id
+from cleverleben_scraper.extraction import AllText, Attr, Extractor, Field, Match, SiblingText, Text, find_jsonld
+from cleverleben_scraper.offload import ExtractionPool
+from cleverleben_scraper.frontier import FrontierSeenSet, SharedFrontier, shard_of
+from functools import partial
 from urllib.parse import urljoin
+from w3lib.html import replace_tags
 import re
 import json
 
+PRICE_RE = re.compile(r'(\d+[.,]\d+|\d+)')
+
+CURRENCY_SYMBOLS = {'EUR': '€'}
+
+
+def _has_text(value):
+    return bool(value.strip())
+
+
+# Product page fields, each with its selectors in fallback priority order.
+# Evaluated in a single walk over the document, see extraction.py.
+PRODUCT_EXTRACTOR = Extractor([
+    Field('product_name', [
+        Text(Match('h1', attrs={'itemprop': 'name'})),
+        Text(Match('h1', class_contains='product')),
+        Text(Match('h1')),
+        Text(Match('title')),
+        Attr(Match('meta', attrs={'property': 'og:title'}), 'content'),
+    ], accept=_has_text),
+    Field('price', [
+        Text(Match('span', attrs={'itemprop': 'price'})),
+        Attr(Match('meta', attrs={'property': 'product:price:amount'}), 'content'),
+        AllText(Match('span', class_contains='price')),
+        AllText(Match('div', class_contains='price')),
+    ], mode='scan', accept=PRICE_RE.search),
+    Field('image', [
+        Attr(Match('img', attrs={'itemprop': 'image'}), 'src'),
+        Attr(Match('meta', attrs={'property': 'og:image'}), 'content'),
+        Attr(Match('img', inside=Match('div', class_contains='product-image')), 'src'),
+        Attr(Match('img', class_contains='product'), 'src'),
+    ], mode='all'),
+    Field('product_description', [
+        AllText(Match('div', attrs={'itemprop': 'description'})),
+        Attr(Match('meta', attrs={'name': 'description'}), 'content'),
+        AllText(Match('div', class_contains='description')),
+    ], mode='all'),
+    Field('ingredients', [
+        SiblingText(Match('td', text_contains='Zutaten'), 'td'),
+        SiblingText(Match('div', text_contains='Zutaten'), 'div'),
+        SiblingText(Match('h3', text_contains='Zutaten'), 'p'),
+    ], accept=_has_text),
+    Field('details', [
+        SiblingText(Match('td', text_contains='Produktinformation'), 'td'),
+        SiblingText(Match('div', text_contains='Produktinformation'), 'div'),
+        SiblingText(Match('h2', text_contains='Produktinformation'), 'p'),
+    ], accept=_has_text),
+])
+
 class CleverSpider(scrapy.Spider):
     name = 'clever_spider'
     allowed_domains = ['cleverleben.at']
     start_urls = ['https://www.cleverleben.at/produktauswahl']
     
-    custom_settings = {
-        'CONCURRENT_REQUESTS': 4,
-        'DOWNLOAD_DELAY': 0.3,
-        'AUTOTHROTTLE_ENABLED': True,
+    # Spiders for other sites can plug in their own field definitions
+    product_extractor = PRODUCT_EXTRACTOR
+
+    # 'jsonld' reads the schema.org Product block first and only falls back
+    # to the DOM selectors for missing fields, 'dom' always uses the selectors
+    extraction_mode = 'dom'
+
+    # Links are classified before a Request is created, see urls.py
+    url_classifier = UrlClassifier()
+    url_callbacks = {
+        CATEGORY: 'parse_main_category',
+        SUBCATEGORY: 'parse_subcategory',
+        PAGINATION: 'parse_subcategory',
+        PRODUCT: 'parse_product',
     }
 
+    # Scheduling order: products first, so items come out early and the queue stays
+    # narrow, then pagination, subcategories and categories. The gaps leave room for
+    # DEPTH_PRIORITY to order requests of the same class.
+    url_priorities = {
+        PRODUCT: 300,
+        PAGINATION: 200,
+        SUBCATEGORY: 100,
+        CATEGORY: 0,
+    }
+
+    # unique_ids of emitted items, set by DuplicateFilterPipeline; product
+    # pages with one of these ids are not requested again
+    emitted_ids = None
+
+    # Count which selectors decide each product field, see record_selector
+    instrument_selectors = False
+
+    # Worker pool for product extraction when EXTRACTION_WORKERS is set
+    extraction_pool = None
+
+    # Sharded crawls (sharding.py): this process follows the categories it
+    # owns, and every other link only if it wins the claim in the shared frontier
+    shard_index = 0
+    shard_count = 1
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Crawl-wide: each link is harvested and requested at most once
+        self.link_harvester = LinkHarvester(self.url_classifier, inc_stat=self.inc_stat)
+        self.paginator = Paginator(inc_stat=self.inc_stat)
+
+    @classmethod
+    def update_settings(cls, settings):
+        super().update_settings(settings)
+        # No empty image_files column in the CSV and Parquet feeds when images are not downloaded
+        if not settings.get('FEED_EXPORT_FIELDS'):
+            settings.set('FEED_EXPORT_FIELDS', feed_fields(settings.getbool('PRODUCT_IMAGES_ENABLED')), priority='spider')
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        spider.extraction_mode = crawler.settings.get('PRODUCT_EXTRACTION_MODE', spider.extraction_mode)
+        spider.instrument_selectors = crawler.settings.getbool('INSTRUMENTATION_ENABLED')
+        workers = crawler.settings.getint('EXTRACTION_WORKERS')
+        if workers > 0:
+            spider.extraction_pool = ExtractionPool(spider, workers)
+            spider.url_callbacks = {**spider.url_callbacks, PRODUCT: 'parse_product_pooled'}
+            crawler.signals.connect(spider.extraction_pool.close, signal=signals.spider_closed)
+        if crawler.settings.get('SHARD_FRONTIER'):
+            spider.shard_index = crawler.settings.getint('SHARD_INDEX')
+            spider.shard_count = crawler.settings.getint('SHARD_COUNT', 1)
+            frontier = SharedFrontier.for_crawler(crawler)
+            spider.link_harvester.seen = FrontierSeenSet(frontier)
+            crawler.signals.connect(frontier.close, signal=signals.spider_closed)
+        return spider
+
+    def follow_link(self, url, meta=None, url_class=None):
+        """
+        Classify a discovered link and build the Request for it, with the callback
+        for its URL class. Returns None for assets and everything off-target.
+        """
+        if url_class is None:
+            url_class = self.url_classifier.classify(url)
+        self.inc_stat(f'urls/{url_class}')
+        callback = self.url_callbacks.get(url_class)
+        if callback is None:
+            return None
+        if url_class == PRODUCT and self.emitted_ids is not None and product_id(url) in self.emitted_ids:
+            self.inc_stat('dedup/skipped_requests')
+            return None
+        return scrapy.Request(
+            url=url,
+            callback=getattr(self, callback),
+            meta=meta or {},
+            priority=self.url_priorities.get(url_class, 0),
+        )
+
+    def inc_stat(self, key, count=1):
+        """Increment a crawl stat, if the spider is running inside a crawler"""
+        crawler = getattr(self, 'crawler', None)
+        if crawler is not None and crawler.stats is not None:
+            crawler.stats.inc_value(key, count)
+
+    def owns(self, url):
+        """Whether this shard crawls a category discovered on the start page"""
+        return self.shard_count == 1 or shard_of(url, self.shard_count) == self.shard_index
+
+    def record_selector(self, field, selector, hit, inc_stat=None):
+        """Count a selector hit or miss; a selector without hits over a crawl can be dropped"""
+        outcome = 'hit' if hit else 'miss'
+        (inc_stat or self.inc_stat)(f'selectors/{field}/{outcome}: {selector}')
+
     def parse(self, response):
         """
         Parse the main produktauswahl page and extract ALL category links
         """
         self.logger.info(f"Parsing main page: {response.url}")
         
-        # Extract ALL category links automatically
-        category_selectors = [
-            '//nav//a/@href',
-            '//header//a/@href',
-            '//a[contains(@href, "/lebensmittel")]/@href',
-            '//a[contains(@href, "/getraenke")]/@href',
-            '//a[contains(@href, "/haushalt")]/@href',
-            '//a[contains(@href, "/tiernahrung")]/@href',
-            '//a[contains(@class, "category")]/@href',
-            '//div[contains(@class, "category")]//a/@href'
-        ]
-        
-        category_links = []
-        for selector in category_selectors:
-            links = response.xpath(selector).getall()
-            if links:
-                category_links.extend(links)
-        
-        # Also get all links and filter for category patterns
-        all_links = response.xpath('//a/@href').getall()
-        category_patterns = [
-            link for link in all_links 
-            if link and not link.startswith('http') and len(link) > 1 
-            and not link.startswith('#') 
-            and any(keyword in link for keyword in ['lebensmittel', 'getraenke', 'haushalt', 'tiernahrung', 'kategorie', 'category'])
-        ]
-        category_links.extend(category_patterns)
-        
-        # Clean and deduplicate
-        category_links = list(set([urljoin(response.url, link) for link in category_links if link]))
+        category_links = self.link_harvester.harvest(response, follow={CATEGORY, SUBCATEGORY}, where=self.owns)
         
         self.logger.info(f"Found {len(category_links)} total category links")
         
         # Process all discovered categories
-        for category_link in category_links:
-            yield scrapy.Request(
-                url=category_link,
-                callback=self.parse_main_category,
-                meta={'category_url': category_link}
-            )
+        for category_link, url_class in category_links:
+            request = self.follow_link(category_link, meta={'category_url': category_link}, url_class=url_class)
+            if request:
+                yield request
 
     def parse_main_category(self, response):
         """
@@ -68,43 +197,15 @@ class CleverSpider(scrapy.Spider):
         """
         self.logger.info(f"Parsing main category: {response.url}")
         
-        # Extract subcategory links using multiple strategies
-        subcategory_selectors = [
-            '//a[contains(@href, "/produkte/")]/@href',
-            '//div[contains(@class, "category")]//a/@href',
-            '//nav//a/@href',
-            '//a[contains(@class, "subcategory")]/@href',
-            '//div[contains(@class, "grid")]//a/@href',
-            '//section//a/@href'
-        ]
-        
-        subcategory_links = []
-        for selector in subcategory_selectors:
-            links = response.xpath(selector).getall()
-            if links:
-                subcategory_links.extend(links)
-        
-        # Also look for any links that might be subcategories
-        all_links = response.xpath('//a/@href').getall()
-        potential_subcategories = [
-            link for link in all_links 
-            if '/produkte/' in link 
-            and not link.startswith('http')
-            and len(link) > 10  # Filter out very short links
-        ]
-        subcategory_links.extend(potential_subcategories)
-        
-        # Clean and deduplicate
-        subcategory_links = list(set([urljoin(response.url, link) for link in subcategory_links if link]))
+        # Top-level pages link each other (a campaign page lists its DIY ideas, which link products)
+        subcategory_links = self.link_harvester.harvest(response, follow={CATEGORY, SUBCATEGORY, PRODUCT})
         
         self.logger.info(f"Found {len(subcategory_links)} subcategories in {response.url}")
         
-        for subcategory_link in subcategory_links:
-            yield scrapy.Request(
-                url=subcategory_link,
-                callback=self.parse_subcategory,
-                meta={'main_category_url': response.url}
-            )
+        for subcategory_link, url_class in subcategory_links:
+            request = self.follow_link(subcategory_link, meta={'main_category_url': response.url}, url_class=url_class)
+            if request:
+                yield request
 
     def parse_subcategory(self, response):
         """
@@ -112,198 +213,191 @@ class CleverSpider(scrapy.Spider):
         """
         self.logger.info(f"Parsing subcategory: {response.url}")
         
-        # Extract individual product links using multiple strategies
-        product_selectors = [
-            '//a[contains(@href, "/produkt/")]/@href',
-            '//article//a/@href',
-            '//div[contains(@class, "product")]//a/@href',
-            '//div[contains(@class, "item")]//a/@href',
-            '//div[contains(@class, "card")]//a/@href',
-            '//li[contains(@class, "product")]//a/@href'
-        ]
-        
-        product_links = []
-        for selector in product_selectors:
-            links = response.xpath(selector).getall()
-            if links:
-                product_links.extend(links)
-        
-        # Also check all links for product patterns
-        all_links = response.xpath('//a/@href').getall()
-        product_patterns = [
-            link for link in all_links 
-            if '/produkt/' in link 
-            and not '/produkte/' in link
-            and len(link) > 10  # Filter out very short links
-        ]
-        product_links.extend(product_patterns)
-        
-        # Clean and deduplicate
-        product_links = list(set([urljoin(response.url, link) for link in product_links if link]))
+        # Child listings are followed too, instead of being parsed as products
+        listed = {PRODUCT: []}
+        links = self.link_harvester.harvest(response, follow={PRODUCT, SUBCATEGORY}, also={PAGINATION}, listed=listed)
+        product_links = [(url, url_class) for url, url_class in links if url_class != PAGINATION]
+        page_links = [url for url, url_class in links if url_class == PAGINATION]
         
         self.logger.info(f"Found {len(product_links)} individual product links on {response.url}")
         
-        for product_link in product_links:
-            yield scrapy.Request(
-                url=product_link,
-                callback=self.parse_product,
-                meta={'subcategory_url': response.url}
+        for product_link, url_class in product_links:
+            request = self.follow_link(product_link, meta={'subcategory_url': response.url}, url_class=url_class)
+            if request:
+                yield request
+        
+        # Pagination: one page after the other, each page once, until a page adds no products to its listing
+        next_page = self.paginator.next_page(response.url, page_links, listed[PRODUCT])
+        if next_page:
+            self.logger.info(f"Found next page: {next_page}")
+            request = self.follow_link(
+                next_page,
+                meta={'main_category_url': response.meta.get('main_category_url')},
+                url_class=PAGINATION
             )
-        
-        # More aggressive pagination handling
-        pagination_selectors = [
-            '//a[contains(@class, "next")]/@href',
-            '//a[contains(@rel, "next")]/@href',
-            '//a[contains(text(), "Weiter")]/@href',
-            '//a[contains(text(), "Next")]/@href',
-            '//a[@aria-label="Next"]/@href',
-            '//a[contains(text(), "›")]/@href',
-            '//a[contains(text(), ">")]/@href',
-            '//link[@rel="next"]/@href',
-            '//a[contains(@class, "pagination")]/@href',
-            '//nav//a[contains(@href, "page")]/@href',
-            '//a[contains(@href, "?page")]/@href'
-        ]
-        
-        for selector in pagination_selectors:
-            next_pages = response.xpath(selector).getall()
-            for next_page in next_pages:
-                if next_page and next_page.strip():
-                    full_next_url = urljoin(response.url, next_page.strip())
-                    # Avoid infinite loops by checking if we've seen this URL pattern
-                    if full_next_url != response.url and not full_next_url.endswith('#'):
-                        self.logger.info(f"Found next page: {full_next_url}")
-                        yield scrapy.Request(
-                            url=full_next_url,
-                            callback=self.parse_subcategory,
-                            meta={'main_category_url': response.meta.get('main_category_url')}
-                        )
+            if request:
+                yield request
 
     def parse_product(self, response):
         """
         Parse INDIVIDUAL PRODUCT page and extract all required fields
         """
+        # Incremental crawl: the page is unchanged, reuse the item from the last crawl
+        if response.status == 304 and 'incremental_item' in response.meta:
+            self.inc_stat('incremental/reused_items')
+            yield CleverlebenItem(response.meta['incremental_item'])
+            return
+        
+        item = self.accept_product(self.extract_product(response, self.inc_stat), response.url)
+        if item is not None:
+            yield item
+
+    async def parse_product_pooled(self, response):
+        """
+        parse_product with the extraction running in the worker pool, so the
+        reactor thread keeps downloading meanwhile. Worker errors are raised
+        here, like errors of parse_product.
+        """
+        if response.status == 304 and 'incremental_item' in response.meta:
+            self.inc_stat('incremental/reused_items')
+            yield CleverlebenItem(response.meta['incremental_item'])
+            return
+        
+        fields, stats = await self.extraction_pool.extract(response)
+        for key, count in stats.items():
+            self.inc_stat(key, count)
+        item = self.accept_product(CleverlebenItem(fields), response.url)
+        if item is not None:
+            yield item
+
+    def extract_product(self, response, inc_stat):
+        """
+        Extract the product fields of a product page. Stats go to `inc_stat`
+        only, as this also runs in pool workers that have no crawler.
+        """
         item = CleverlebenItem()
         
         # Extract product URL
         item['product_url'] = response.url
         
-        # Extract product name
-        name_selectors = [
-            '//h1[@itemprop="name"]/text()',
-            '//h1[contains(@class, "product")]/text()',
-            '//h1/text()',
-            '//title/text()',
-            '//meta[@property="og:title"]/@content'
-        ]
+        root = response.selector.root
         
-        for selector in name_selectors:
-            product_name = response.xpath(selector).get()
-            if product_name and product_name.strip():
-                clean_name = product_name.strip()
-                if '|' in clean_name:
-                    clean_name = clean_name.split('|')[0].strip()
-                item['product_name'] = clean_name
-                break
+        # Structured data first, if enabled
+        if self.extraction_mode == 'jsonld':
+            product = find_jsonld(root, 'Product')
+            if product:
+                for field, value in self.parse_jsonld_product(product).items():
+                    item[field] = value
+                    inc_stat(f'extraction/jsonld/{field}')
         
-        # Extract price
-        price_selectors = [
-            '//span[@itemprop="price"]/text()',
-            '//meta[@property="product:price:amount"]/@content',
-            '//span[contains(@class, "price")]//text()',
-            '//div[contains(@class, "price")]//text()'
-        ]
-        
-        for selector in price_selectors:
-            price_texts = response.xpath(selector).getall()
-            for price_text in price_texts:
-                if price_text:
-                    price_match = re.search(r'(\d+[.,]\d+|\d+)', price_text)
-                    if price_match:
-                        item['price'] = price_match.group(1).replace(',', '.')
-                        break
-            if item.get('price'):
-                break
+        # DOM selectors for whatever structured data did not provide
+        missing = [field.name for field in self.product_extractor.fields if field.name not in item]
+        report = partial(self.record_selector, inc_stat=inc_stat) if self.instrument_selectors else None
+        fields = self.product_extractor.extract(root, only=missing, report=report) if missing else {}
         
-        # Extract images
-        image_selectors = [
-            '//img[@itemprop="image"]/@src',
-            '//meta[@property="og:image"]/@content',
-            '//div[contains(@class, "product-image")]//img/@src',
-            '//img[contains(@class, "product")]/@src'
-        ]
+        # Extract product name
+        product_name = fields.get('product_name')
+        if product_name:
+            clean_name = product_name.strip()
+            if '|' in clean_name:
+                clean_name = clean_name.split('|')[0].strip()
+            item['product_name'] = clean_name
         
-        images = []
-        for selector in image_selectors:
-            found_images = response.xpath(selector).getall()
-            if found_images:
-                images.extend(found_images)
+        # Extract price
+        if fields.get('price'):
+            item['price'] = PRICE_RE.search(fields['price']).group(1).replace(',', '.')
         
-        item['image'] = [urljoin(response.url, img) for img in set(images) if img and not img.startswith('data:')]
+        # Extract images
+        if 'image' in fields:
+            # In page order, so workers with their own hash seed agree
+            images = dict.fromkeys(fields['image'])
+            item['image'] = [urljoin(response.url, img) for img in images if img and not img.startswith('data:')]
         
         # Extract product description
-        desc_selectors = [
-            '//div[@itemprop="description"]//text()',
-            '//meta[@name="description"]/@content',
-            '//div[contains(@class, "description")]//text()'
-        ]
-        
         description_parts = []
-        for selector in desc_selectors:
-            descriptions = response.xpath(selector).getall()
-            for desc in descriptions:
-                if desc and desc.strip():
-                    clean_desc = ' '.join(desc.strip().split())
-                    if clean_desc and len(clean_desc) > 10:
-                        if clean_desc not in description_parts:
-                            description_parts.append(clean_desc)
+        for desc in fields.get('product_description') or []:
+            if desc and desc.strip():
+                clean_desc = ' '.join(desc.strip().split())
+                if clean_desc and len(clean_desc) > 10:
+                    if clean_desc not in description_parts:
+                        description_parts.append(clean_desc)
         
         if description_parts:
             item['product_description'] = ' | '.join(description_parts[:2])
         
         # Extract unique_id from URL
-        unique_id_match = re.search(r'-(\d+)$', response.url) or re.search(r'/(\d+)$', response.url)
-        if unique_id_match:
-            item['unique_id'] = unique_id_match.group(1)
-        else:
-            item['unique_id'] = response.url.split('/')[-1]
+        item['unique_id'] = product_id(response.url)
         
         # Extract ingredients
-        ingredients_selectors = [
-            '//td[contains(text(), "Zutaten")]/following-sibling::td//text()',
-            '//div[contains(text(), "Zutaten")]/following-sibling::div//text()',
-            '//h3[contains(text(), "Zutaten")]/following-sibling::p//text()'
-        ]
-        
-        for selector in ingredients_selectors:
-            ingredients = response.xpath(selector).get()
-            if ingredients and ingredients.strip():
-                item['ingredients'] = ingredients.strip()
-                break
+        if fields.get('ingredients'):
+            item['ingredients'] = fields['ingredients'].strip()
         
         # Extract details
-        details_selectors = [
-            '//td[contains(text(), "Produktinformation")]/following-sibling::td//text()',
-            '//div[contains(text(), "Produktinformation")]/following-sibling::div//text()',
-            '//h2[contains(text(), "Produktinformation")]/following-sibling::p//text()'
-        ]
+        if fields.get('details'):
+            item['details'] = fields['details'].strip()
         
-        for selector in details_selectors:
-            details = response.xpath(selector).get()
-            if details and details.strip():
-                item['details'] = details.strip()
-                break
+        for field in missing:
+            if field in item:
+                inc_stat(f'extraction/dom/{field}')
+            else:
+                inc_stat(f'extraction/missing/{field}')
         
         # Default values
-        item['currency'] = '€'
+        item.setdefault('currency', '€')
         item['product_id'] = item.get('unique_id', '')
-        
-        # Only yield if we have a product name and it doesn't look like a category
+        return item
+
+    def accept_product(self, item, url):
+        """The item, or None if it has no product name or it looks like a category"""
         if (item.get('product_name') and 
             len(item['product_name']) > 5 and
             not any(word in item['product_name'].lower() for word in ['kategorie', 'category', 'übersicht', 'alle '])):
             
             self.logger.info(f"Successfully extracted PRODUCT: {item['product_name']}")
-            yield item
-        else:
-            self.logger.warning(f"Skipping - appears to be category page: {response.url}")
\ No newline at end of file
+            return item
+        self.logger.warning(f"Skipping - appears to be category page: {url}")
+        return None
+
+    def parse_jsonld_product(self, product):
+        """
+        Map a schema.org Product object to item fields.
+        The price is kept as a number, the pipeline formats it without a regex.
+        """
+        fields = {}
+        
+        name = product.get('name')
+        if isinstance(name, str) and name.strip():
+            fields['product_name'] = name.strip()
+        
+        offers = product.get('offers')
+        if isinstance(offers, list):
+            offers = offers[0] if offers else None
+        if isinstance(offers, dict):
+            price = offers.get('price')
+            if isinstance(price, str):
+                try:
+                    price = float(price.replace(',', '.'))
+                except ValueError:
+                    price = None
+            if isinstance(price, (int, float)) and not isinstance(price, bool):
+                fields['price'] = price
+            currency = offers.get('priceCurrency')
+            if currency:
+                fields['currency'] = CURRENCY_SYMBOLS.get(currency, currency)
+        
+        images = product.get('image')
+        if isinstance(images, (str, dict)):
+            images = [images]
+        if isinstance(images, list):
+            urls = [img.get('url') if isinstance(img, dict) else img for img in images]
+            urls = [url for url in urls if isinstance(url, str) and url and not url.startswith('data:')]
+            if urls:
+                fields['image'] = urls
+        
+        description = product.get('description')
+        if isinstance(description, str):
+            clean_desc = ' '.join(replace_tags(description, ' ').split())
+            if len(clean_desc) > 10:
+                fields['product_description'] = clean_desc
+        
+        return fields
@@ -0,0 +1,181 @@
+"""
+Indexed local product store.
+
+ProductStore keeps one row per unique_id in a SQLite database, with an index
+on the price and an FTS5 full-text index over product_name,
+product_description and ingredients that triggers keep in step with the
+table. ProductStorePipeline upserts items while the crawl runs;
+query_products.py looks products up by id, price range or keyword without
+loading a whole feed:
+
+    store = ProductStore('products.sqlite')
+    store.get('27399')
+    store.price_range(1, 2.5)
+    store.search('Haselnüsse', field='ingredients')
+"""
+import json
+import sqlite3
+from time import time
+
+FIELDS = [
+    'unique_id', 'product_id', 'product_url', 'product_name', 'price', 'currency',
+    'image', 'product_description', 'ingredients', 'details',
+]
+TEXT_FIELDS = ['product_name', 'product_description', 'ingredients']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    unique_id TEXT NOT NULL UNIQUE,
+    product_id TEXT,
+    product_url TEXT,
+    product_name TEXT,
+    price TEXT,
+    price_value REAL,
+    currency TEXT,
+    image TEXT,
+    product_description TEXT,
+    ingredients TEXT,
+    details TEXT,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS products_price ON products (price_value);
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+    product_name, product_description, ingredients,
+    content='products', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS products_ai AFTER INSERT ON products BEGIN
+    INSERT INTO products_fts (rowid, product_name, product_description, ingredients)
+    VALUES (new.rowid, new.product_name, new.product_description, new.ingredients);
+END;
+CREATE TRIGGER IF NOT EXISTS products_ad AFTER DELETE ON products BEGIN
+    INSERT INTO products_fts (products_fts, rowid, product_name, product_description, ingredients)
+    VALUES ('delete', old.rowid, old.product_name, old.product_description, old.ingredients);
+END;
+CREATE TRIGGER IF NOT EXISTS products_au AFTER UPDATE ON products BEGIN
+    INSERT INTO products_fts (products_fts, rowid, product_name, product_description, ingredients)
+    VALUES ('delete', old.rowid, old.product_name, old.product_description, old.ingredients);
+    INSERT INTO products_fts (rowid, product_name, product_description, ingredients)
+    VALUES (new.rowid, new.product_name, new.product_description, new.ingredients);
+END;
+"""
+
+UPSERT = """
+INSERT INTO products (
+    unique_id, product_id, product_url, product_name, price, price_value, currency,
+    image, product_description, ingredients, details, updated
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (unique_id) DO UPDATE SET
+    product_id = excluded.product_id,
+    product_url = excluded.product_url,
+    product_name = excluded.product_name,
+    price = excluded.price,
+    price_value = excluded.price_value,
+    currency = excluded.currency,
+    image = excluded.image,
+    product_description = excluded.product_description,
+    ingredients = excluded.ingredients,
+    details = excluded.details,
+    updated = excluded.updated
+"""
+
+SELECT = f"SELECT {', '.join('p.' + field for field in FIELDS)} FROM products p"
+
+
+def price_value(price):
+    """The price as a number for range queries, None if it is not one"""
+    try:
+        return float(str(price).replace(',', '.'))
+    except (TypeError, ValueError):
+        return None
+
+
+def fts_query(text, field=None):
+    """An FTS5 query for `text` as a phrase; a trailing * makes it a prefix search"""
+    prefix = text.endswith('*')
+    phrase = '"' + text.rstrip('*').replace('"', '""') + '"' + ('*' if prefix else '')
+    return f'{field} : {phrase}' if field else phrase
+
+
+class ProductStore:
+    def __init__(self, path, commit_every=100):
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(SCHEMA)
+        self.commit_every = commit_every
+        self.pending = 0
+
+    def upsert(self, data):
+        """Insert or replace the product with data['unique_id']"""
+        key = data.get('unique_id') or data.get('product_url')
+        if not key:
+            return
+        image = data.get('image')
+        self.db.execute(UPSERT, (
+            key,
+            data.get('product_id'),
+            data.get('product_url'),
+            data.get('product_name'),
+            data.get('price'),
+            price_value(data.get('price')),
+            data.get('currency'),
+            json.dumps(image, ensure_ascii=False) if image is not None else None,
+            data.get('product_description'),
+            data.get('ingredients'),
+            data.get('details'),
+            time(),
+        ))
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.commit()
+
+    def get(self, unique_id):
+        """The product with this unique_id, or None"""
+        row = self.db.execute(f'{SELECT} WHERE p.unique_id = ?', (unique_id,)).fetchone()
+        return self._product(row) if row else None
+
+    def price_range(self, low=None, high=None, limit=100):
+        """Products with low <= price <= high, cheapest first"""
+        conditions, params = ['p.price_value IS NOT NULL'], []
+        if low is not None:
+            conditions.append('p.price_value >= ?')
+            params.append(low)
+        if high is not None:
+            conditions.append('p.price_value <= ?')
+            params.append(high)
+        rows = self.db.execute(
+            f"{SELECT} WHERE {' AND '.join(conditions)} ORDER BY p.price_value, p.unique_id LIMIT ?",
+            (*params, limit),
+        )
+        return [self._product(row) for row in rows]
+
+    def search(self, text, field=None, limit=100):
+        """
+        Products matching `text` in product_name, product_description or
+        ingredients (or only in `field`), best matches first
+        """
+        if field is not None and field not in TEXT_FIELDS:
+            raise ValueError(f"Not a full-text field: {field}")
+        rows = self.db.execute(
+            f'{SELECT} JOIN products_fts f ON f.rowid = p.rowid '
+            'WHERE products_fts MATCH ? ORDER BY f.rank LIMIT ?',
+            (fts_query(text, field), limit),
+        )
+        return [self._product(row) for row in rows]
+
+    def count(self):
+        return self.db.execute('SELECT COUNT(*) FROM products').fetchone()[0]
+
+    def _product(self, row):
+        product = {field: value for field, value in zip(FIELDS, row) if value is not None}
+        if 'image' in product:
+            product['image'] = json.loads(product['image'])
+        return product
+
+    def commit(self):
+        self.db.commit()
+        self.pending = 0
+
+    def close(self):
+        self.commit()
+        self.db.close()
@@ -0,0 +1,106 @@
+"""
+Adaptive concurrency and delay per endpoint.
+
+Every host and endpoint (listing pages, product pages, assets) has an
+EndpointThrottle that watches the responses of that endpoint and sets its
+concurrency and delay. The endpoints of a host share the host's download
+slot, which AdaptiveThrottleMiddleware runs at the lowest concurrency and
+the longest delay of them, so the per-host limits hold:
+
+- A 429 answer backs off at once: concurrency is halved and the delay is
+  doubled, or set to the Retry-After value if that is longer. The server's
+  Retry-After is honoured even past `max_delay`.
+- Every `window` responses the window is judged. An error rate (5xx and
+  download errors) above `error_rate` or an average latency above twice
+  `target_latency` backs off the same way. A window without errors and with
+  the latency below `target_latency` speeds up by one request of
+  concurrency and a quarter less delay.
+
+Concurrency stays between 1 and `max_concurrency` and the delay between
+`min_delay` and `max_delay` of the endpoint, so a healthy site is never
+crawled faster than the configured ceilings.
+"""
+from collections import deque
+
+from cleverleben_scraper.urls import ASSET, PRODUCT
+
+LISTING = 'listing'
+
+ENDPOINTS = {PRODUCT: PRODUCT, ASSET: ASSET}
+
+DEFAULT_LIMITS = {
+    'concurrency': 2,
+    'max_concurrency': 4,
+    'delay': 1.0,
+    'min_delay': 0.5,
+    'max_delay': 10.0,
+}
+
+
+def endpoint_of(url_class):
+    """Product pages and assets are endpoints of their own, all other pages are listings"""
+    return ENDPOINTS.get(url_class, LISTING)
+
+
+def retry_after(value):
+    """Seconds from a Retry-After header in seconds form, None for dates and garbage"""
+    if not value:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode('latin1')
+    try:
+        return max(0.0, float(value.strip()))
+    except ValueError:
+        return None
+
+
+class EndpointThrottle:
+    def __init__(self, limits, target_latency=1.0, window=20, error_rate=0.1):
+        limits = {**DEFAULT_LIMITS, **limits}
+        self.max_concurrency = max(1, int(limits['max_concurrency']))
+        self.min_delay = float(limits['min_delay'])
+        self.max_delay = max(self.min_delay, float(limits['max_delay']))
+        self.concurrency = min(max(1, int(limits['concurrency'])), self.max_concurrency)
+        self.delay = min(max(self.min_delay, float(limits['delay'])), self.max_delay)
+        self.target_latency = target_latency
+        self.error_rate = error_rate
+        # (latency or None, error) of the responses since the last decision
+        self.samples = deque(maxlen=window)
+
+    def record(self, latency=None, status=None, error=False, wait=None):
+        """
+        Record one response (its latency and status) or download error.
+        Returns 'backoff' or 'speedup' if the limits changed, else None.
+        """
+        if status == 429:
+            self.samples.clear()
+            return self.backoff(wait)
+        self.samples.append((latency, error or (status is not None and status >= 500)))
+        if len(self.samples) < self.samples.maxlen:
+            return None
+        latencies = [latency for latency, _ in self.samples if latency is not None]
+        errors = sum(1 for _, failed in self.samples if failed)
+        average = sum(latencies) / len(latencies) if latencies else 0.0
+        self.samples.clear()
+        if errors / self.samples.maxlen > self.error_rate or average > 2 * self.target_latency:
+            return self.backoff()
+        if errors == 0 and average <= self.target_latency:
+            return self.speedup()
+        return None
+
+    def backoff(self, wait=None):
+        concurrency = max(1, self.concurrency // 2)
+        # Doubling stops at max_delay, a longer Retry-After wait is kept and never shortened by a backoff
+        delay = max(min(self.delay * 2, self.max_delay), self.delay, self.min_delay or 0.25, wait or 0.0)
+        return self.update(concurrency, delay, 'backoff', max_delay=max(self.max_delay, delay))
+
+    def speedup(self):
+        return self.update(self.concurrency + 1, self.delay * 0.75, 'speedup')
+
+    def update(self, concurrency, delay, change, max_delay=None):
+        concurrency = min(concurrency, self.max_concurrency)
+        delay = min(max(delay, self.min_delay), max_delay or self.max_delay)
+        if (concurrency, delay) == (self.concurrency, self.delay):
+            return None
+        self.concurrency, self.delay = concurrency, delay
+        return change
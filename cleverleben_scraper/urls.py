@@ -0,0 +1,89 @@
+"""
+Rule-based URL classification, used to decide what to do with a link before
+a Request is ever created for it.
+"""
+import re
+from urllib.parse import urlparse
+
+PRODUCT = 'product'
+CATEGORY = 'category'
+SUBCATEGORY = 'subcategory'
+PAGINATION = 'pagination'
+ASSET = 'asset'
+IGNORE = 'ignore'
+
+URL_CLASSES = [PRODUCT, CATEGORY, SUBCATEGORY, PAGINATION, ASSET, IGNORE]
+
+SITE_HOSTS = ['www.cleverleben.at', 'cleverleben.at']
+
+# Site pages without products or product links
+SERVICE_PAGES = ['impressum', 'datenschutz', 'kontakt', 'barrierefreiheit', 'newsletter']
+
+ASSET_EXTENSIONS = [
+    'pdf', 'zip', 'jpg', 'jpeg', 'png', 'gif', 'svg', 'webp', 'avif', 'ico',
+    'mp4', 'webm', 'mp3', 'css', 'js', 'json', 'xml', 'woff', 'woff2', 'ttf',
+]
+
+
+class UrlRule:
+    """
+    Matches URLs by host, path and query. Every given condition must match;
+    `path` and `query` are regular expressions searched in that URL part.
+    """
+
+    def __init__(self, url_class, hosts=None, path=None, query=None):
+        self.url_class = url_class
+        self.hosts = set(hosts) if hosts else None
+        self.path = re.compile(path) if path else None
+        self.query = re.compile(query) if query else None
+
+    def matches(self, parts):
+        if self.hosts is not None and parts.hostname not in self.hosts:
+            return False
+        if self.path is not None and not self.path.search(parts.path):
+            return False
+        if self.query is not None and not self.query.search(parts.query):
+            return False
+        return True
+
+
+DEFAULT_RULES = [
+    UrlRule(ASSET, path=r'\.(%s)$' % '|'.join(ASSET_EXTENSIONS)),
+    UrlRule(ASSET, hosts=['files.cleverleben.at']),
+    UrlRule(PRODUCT, hosts=SITE_HOSTS, path=r'^/produkt/[^/]+/?$'),
+    UrlRule(PAGINATION, hosts=SITE_HOSTS, path=r'^/produkte/[^/]+/?$', query=r'(^|&)page=\d+'),
+    UrlRule(SUBCATEGORY, hosts=SITE_HOSTS, path=r'^/produkte/[^/]+/?$'),
+    UrlRule(CATEGORY, hosts=SITE_HOSTS,
+            path=r'^/[^/]*(lebensmittel|getraenke|haushalt|tiernahrung|kategorie|category)[^/]*/?$'),
+    UrlRule(IGNORE, hosts=SITE_HOSTS, path=r'^/(%s)(/|$)' % '|'.join(SERVICE_PAGES)),
+    # Any other top-level page (themes, campaigns, DIY ideas) can link to products
+    UrlRule(CATEGORY, hosts=SITE_HOSTS, path=r'^/[^/.]+/?$', query=r'^$'),
+]
+
+
+class UrlClassifier:
+    """First matching rule wins; anything that is not http(s) or matches no rule is IGNORE"""
+
+    def __init__(self, rules=None):
+        self.rules = DEFAULT_RULES if rules is None else rules
+
+    def classify(self, url):
+        parts = urlparse(url)
+        if parts.scheme not in ('http', 'https'):
+            return IGNORE
+        for rule in self.rules:
+            if rule.matches(parts):
+                return rule.url_class
+        return IGNORE
+
+
+PRODUCT_ID_RES = [re.compile(r'-(\d+)$'), re.compile(r'/(\d+)$')]
+
+
+def product_id(url):
+    """The article number at the end of a product URL, or its last path segment"""
+    for regex in PRODUCT_ID_RES:
+        match = regex.search(url)
+        if match:
+            return match.group(1)
+    return url.split('/')[-1]
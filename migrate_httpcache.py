@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Copy the filesystem HTTP cache into the single-file SQLite cache used by
+cleverleben_scraper.httpcache.SqliteCacheStorage.
+
+    python migrate_httpcache.py
+    python migrate_httpcache.py --source .scrapy/httpcache/clever_spider --target .scrapy/httpcache/clever_spider.sqlite
+"""
+import argparse
+import os
+import sys
+import time
+
+from cleverleben_scraper.httpcache import migrate_filesystem_cache
+from cleverleben_scraper.replay import DEFAULT_CACHE_DIR
+
+
+def directory_size(path):
+    total = files = 0
+    for root, dirs, names in os.walk(path):
+        for name in names:
+            total += os.path.getsize(os.path.join(root, name))
+            files += 1
+    return total, files
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrate a filesystem HTTP cache to SQLite')
+    parser.add_argument('--source', default=DEFAULT_CACHE_DIR, help='filesystem cache directory of one spider')
+    parser.add_argument('--target', default=None, help='SQLite file, default <source>.sqlite')
+    parser.add_argument('--level', type=int, default=6, help='zlib compression level')
+    args = parser.parse_args()
+
+    target = args.target or args.source.rstrip('/\\') + '.sqlite'
+    if not os.path.isdir(args.source):
+        print(f"❌ Cache directory not found: {args.source}")
+        return 1
+
+    print(f"Migrating {args.source} -> {target}")
+    start = time.perf_counter()
+    count = migrate_filesystem_cache(args.source, target, args.level)
+    elapsed = time.perf_counter() - start
+
+    size, files = directory_size(args.source)
+    print(f"✓ Migrated {count} responses in {elapsed:.1f}s")
+    print(f"✓ {files} files, {size / 1024 / 1024:.1f} MB -> 1 file, {os.path.getsize(target) / 1024 / 1024:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Normalize an existing feed again with the current field transforms, e.g.
+after a change in cleverleben_scraper/normalization.py. Reads and writes
+JSON lines (.json, .jsonl), CSV and Parquet; needs pandas (and pyarrow for
+Parquet).
+
+    python normalize_feed.py output_data.json
+    python normalize_feed.py output_data.csv --output output_data_normalized.csv
+"""
+import argparse
+import os
+import sys
+import time
+
+from cleverleben_scraper.normalization import Normalizer, pd
+
+
+def feed_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.json', '.jsonl'):
+        return 'jsonlines'
+    if ext in ('.csv', '.parquet'):
+        return ext[1:]
+    raise ValueError(f"Unknown feed format: {path}")
+
+
+def read_feed(path):
+    """A DataFrame with the feed's values as they were written, no type guessing"""
+    fmt = feed_format(path)
+    if fmt == 'csv':
+        return pd.read_csv(path, dtype=str, keep_default_na=False)
+    if fmt == 'parquet':
+        return pd.read_parquet(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.read(1).strip() != '['
+    return pd.read_json(path, lines=lines, dtype=False, convert_dates=False)
+
+
+def write_feed(frame, path):
+    fmt = feed_format(path)
+    if fmt == 'csv':
+        frame.to_csv(path, index=False)
+    elif fmt == 'parquet':
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_json(path, orient='records', lines=True, force_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-normalize a Cleverleben feed')
+    parser.add_argument('feed', help='JSON lines, CSV or Parquet feed')
+    parser.add_argument('--output', default=None, help='output file, default: overwrite the feed')
+    args = parser.parse_args()
+
+    if pd is None:
+        print("❌ pandas is not installed (pip install pandas)")
+        return 1
+    if not os.path.exists(args.feed):
+        print(f"❌ Feed not found: {args.feed}")
+        return 1
+
+    start = time.perf_counter()
+    frame = read_feed(args.feed)
+    loaded = time.perf_counter()
+    frame = Normalizer().normalize_frame(frame)
+    normalized = time.perf_counter()
+    write_feed(frame, args.output or args.feed)
+
+    print(f"✓ Normalized {len(frame)} rows in {normalized - loaded:.2f}s "
+          f"(read {loaded - start:.2f}s, write {time.perf_counter() - normalized:.2f}s)")
+    print(f"✓ {args.output or args.feed}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
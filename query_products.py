@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Look up products in the product store that crawls fill (run_spider.py --store,
+PRODUCT_STORE_PATH), or load an existing JSON feed into it first.
+
+    python query_products.py id 27399
+    python query_products.py price --min 1 --max 2.5
+    python query_products.py search Haselnüsse --field ingredients
+    python query_products.py import output_data_final.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from cleverleben_scraper.store import TEXT_FIELDS, ProductStore
+
+DEFAULT_STORE = 'output_data.sqlite'
+
+
+def iter_feed(path):
+    """Items of a JSON array or JSON lines feed"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if f.read(1).strip() == '[':
+            f.seek(0)
+            yield from json.load(f)
+            return
+        f.seek(0)
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def print_products(products, elapsed):
+    for product in products:
+        print(json.dumps(product, ensure_ascii=False))
+    print(f"{len(products)} products in {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the Cleverleben product store')
+    parser.add_argument('--store', default=DEFAULT_STORE, help='product store database')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    by_id = commands.add_parser('id', help='products by unique_id')
+    by_id.add_argument('unique_ids', nargs='+')
+
+    by_price = commands.add_parser('price', help='products in a price range, cheapest first')
+    by_price.add_argument('--min', type=float, default=None)
+    by_price.add_argument('--max', type=float, default=None)
+    by_price.add_argument('--limit', type=int, default=100)
+
+    search = commands.add_parser('search', help='full-text search, a trailing * searches a prefix')
+    search.add_argument('text')
+    search.add_argument('--field', choices=TEXT_FIELDS, default=None, help='search only this field')
+    search.add_argument('--limit', type=int, default=100)
+
+    load = commands.add_parser('import', help='upsert the items of a JSON or JSON lines feed')
+    load.add_argument('feed')
+    args = parser.parse_args()
+
+    if args.command != 'import' and not os.path.exists(args.store):
+        print(f"❌ Product store not found: {args.store}")
+        return 1
+
+    store = ProductStore(args.store)
+    try:
+        start = time.perf_counter()
+        if args.command == 'import':
+            for item in iter_feed(args.feed):
+                store.upsert(item)
+            store.commit()
+            print(f"✓ Imported {args.feed} in {time.perf_counter() - start:.1f}s, {store.count()} products in {args.store}")
+        elif args.command == 'id':
+            products = [store.get(unique_id) for unique_id in args.unique_ids]
+            print_products([p for p in products if p], time.perf_counter() - start)
+        elif args.command == 'price':
+            print_products(store.price_range(args.min, args.max, args.limit), time.perf_counter() - start)
+        else:
+            print_products(store.search(args.text, args.field, args.limit), time.perf_counter() - start)
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Rebuild the output feeds from the HTTP cache instead of crawling again,
+e.g. after a selector fix. Runs the product extraction over the cached
+pages in a process pool; no requests are sent.
+
+    python reextract.py
+    python reextract.py --workers 8 --since 2026-10-01
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+from scrapy.utils.project import get_project_settings
+
+from cleverleben_scraper.reextraction import EXTRACTED_CLASSES, reextract
+from cleverleben_scraper.replay import DEFAULT_CACHE_DIR
+from cleverleben_scraper.spiders.clever_spider import CleverSpider
+from cleverleben_scraper.urls import PRODUCT
+from run_spider import output_formats, remove_outputs, report
+
+
+def default_cache():
+    """The SQLite cache if the crawls write one, else the filesystem cache"""
+    sqlite_cache = DEFAULT_CACHE_DIR + '.sqlite'
+    return sqlite_cache if os.path.exists(sqlite_cache) else DEFAULT_CACHE_DIR
+
+
+def timestamp(value):
+    """Unix time from seconds or an ISO date ('2026-10-01', '2026-10-01T12:00')"""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-extract the Cleverleben feeds from the HTTP cache')
+    parser.add_argument('--cache-dir', default=None, help='filesystem cache directory or SQLite cache file')
+    parser.add_argument('--workers', type=int, default=None, help='extraction processes, default: one per CPU')
+    parser.add_argument('--url-class', action='append', choices=EXTRACTED_CLASSES, dest='url_classes',
+                        help='extract pages of this URL class, can be repeated (default: product)')
+    parser.add_argument('--since', type=timestamp, help='only responses cached at or after this time')
+    parser.add_argument('--until', type=timestamp, help='only responses cached before this time')
+    args = parser.parse_args()
+
+    cache_dir = args.cache_dir or default_cache()
+    if not os.path.exists(cache_dir):
+        print(f"❌ Cache not found: {cache_dir}")
+        return 1
+
+    # Rejected pages are counted in the summary, not logged one by one
+    logging.basicConfig(level=logging.ERROR)
+
+    settings = get_project_settings()
+    spider = CleverSpider()
+    spider.extraction_mode = settings.get('PRODUCT_EXTRACTION_MODE', spider.extraction_mode)
+
+    print(f"Re-extracting from {cache_dir}")
+    remove_outputs()
+    outputs = output_formats()
+
+    start = time.perf_counter()
+    stats = reextract(
+        cache_dir,
+        outputs,
+        spider,
+        workers=args.workers,
+        url_classes=args.url_classes or [PRODUCT],
+        since=args.since,
+        until=args.until,
+    )
+    elapsed = time.perf_counter() - start
+
+    print(f"✓ {stats['pages']} of {stats['responses']} cached responses extracted in {elapsed:.1f}s")
+    for key in ['skipped/url_class', 'skipped/timestamp', 'skipped/not_html', 'rejected', 'dedup/dropped_items']:
+        if stats[key]:
+            print(f"  {key}: {stats[key]}")
+    report(stats['items'], outputs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Replay the cached responses in .scrapy/httpcache through the spider callbacks
+and the item pipeline, without any network or download delays.
+
+    python run_benchmark.py                  # run and print the report
+    python run_benchmark.py --save-baseline  # store the numbers in benchmark_baseline.json
+    python run_benchmark.py --check          # fail if slower than the saved baseline
+
+Timings depend on the machine, so the baseline is not committed: save one
+before a change and check against it after.
+    python run_benchmark.py --slim           # parse slimmed pages, like ResponseSlimmingMiddleware
+    python run_benchmark.py --normalization 200000  # microbenchmark the field normalization
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+from collections import defaultdict
+from itertools import cycle, islice
+
+from scrapy import Request
+from scrapy.http import HtmlResponse
+
+from cleverleben_scraper.instrumentation import percentile
+from cleverleben_scraper.items import CleverlebenItem
+from cleverleben_scraper.normalization import Normalizer, pd
+from cleverleben_scraper.pipelines import CleverlebenScraperPipeline
+from cleverleben_scraper.replay import DEFAULT_CACHE_DIR, build_spider, iter_cached_responses, route_callback
+from cleverleben_scraper.slimming import can_slim, slim_body
+from cleverleben_scraper.spiders.clever_spider import CleverSpider
+
+BASELINE_FILE = 'benchmark_baseline.json'
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes everywhere else
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def run_benchmark(cache_dir=DEFAULT_CACHE_DIR, rounds=1, slim=False):
+    spider = build_spider(CleverSpider)
+    pipeline = CleverlebenScraperPipeline()
+
+    # Loading the cache is I/O, not parsing, so keep it out of the timings
+    responses = []
+    for meta, response in iter_cached_responses(cache_dir):
+        callback = route_callback(spider, response)
+        if callback:
+            # Like ResponseSlimmingMiddleware in a crawl
+            if slim and isinstance(response, HtmlResponse) and can_slim(response.encoding):
+                response = response.replace(body=slim_body(response.body))
+            responses.append((callback, response))
+
+    timings = defaultdict(list)
+    pipeline_timings = []
+    pages = items = requests = errors = 0
+
+    start = time.perf_counter()
+    for round_number in range(rounds):
+        # The crawl-wide seen sets would drop every link of a second round, each round is a crawl of its own
+        if round_number:
+            spider = build_spider(CleverSpider)
+        for callback, cached in responses:
+            # A fresh copy per call, so parsed trees are not kept alive between pages
+            response = cached.replace()
+            output = []
+            t0 = time.perf_counter()
+            try:
+                # Like a real crawl, keep whatever the callback yielded before failing
+                for obj in getattr(spider, callback)(response):
+                    output.append(obj)
+            except Exception:
+                errors += 1
+            timings[callback].append(time.perf_counter() - t0)
+            pages += 1
+
+            for obj in output:
+                if isinstance(obj, Request):
+                    requests += 1
+                elif isinstance(obj, CleverlebenItem):
+                    t0 = time.perf_counter()
+                    pipeline.process_item(obj, spider)
+                    pipeline_timings.append(time.perf_counter() - t0)
+                    items += 1
+    elapsed = time.perf_counter() - start
+
+    callbacks = {}
+    for name, values in sorted(timings.items()):
+        callbacks[name] = {
+            'calls': len(values),
+            'p50_ms': round(percentile(values, 50) * 1000, 3),
+            'p95_ms': round(percentile(values, 95) * 1000, 3),
+        }
+    callbacks['pipeline'] = {
+        'calls': len(pipeline_timings),
+        'p50_ms': round(percentile(pipeline_timings, 50) * 1000, 3),
+        'p95_ms': round(percentile(pipeline_timings, 95) * 1000, 3),
+    }
+
+    return {
+        'pages': pages,
+        'items': items,
+        'requests': requests,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'pages_per_sec': round(pages / elapsed, 2) if elapsed else 0.0,
+        'items_per_sec': round(items / elapsed, 2) if elapsed else 0.0,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'callbacks': callbacks,
+        # Of the last round, every round does the same work
+        'stats': {
+            key: value for key, value in sorted(spider.crawler.stats.get_stats().items())
+            if isinstance(value, (int, float))
+        },
+    }
+
+
+# Raw field values like the spider emits them, for the normalization microbenchmark
+NORMALIZATION_SAMPLES = [
+    {
+        'product_url': 'https://www.cleverleben.at/produkt/katzenschale-kalb-100g-27399',
+        'product_name': '  Katzenschale Kalb,\n 100g ',
+        'price': '0.35',
+        'product_description': 'Die clever Pasteten sind ein   leckeres Alleinfutter für Katzen* (100g) & mehr!',
+        'ingredients': 'Fleisch und tierische Nebenerzeugnisse (davon 4% Kalb), Mineralstoffe',
+    },
+    {
+        'product_url': 'https://www.cleverleben.at/produkt/vollmilch-schokolade-10412',
+        'product_name': 'Vollmilch Schokolade | clever',
+        'price': 'ab 1,29 €',
+        'product_description': '\tZartschmelzende  Vollmilchschokolade: "Alpenmilch" aus Österreich',
+        'details': 'Produktinformation:  100 g / Tafel',
+    },
+    {
+        'product_url': 'https://www.cleverleben.at/produkt/spuelmittel-zitrone-31004',
+        'product_name': 'Spülmittel Zitrone',
+        'price': 2.49,
+        'product_description': 'Entfernt Fett & Schmutz - mit Zitronenduft.',
+    },
+]
+
+
+def run_normalization_benchmark(rows):
+    """Rows per second of the item-at-a-time, micro-batch and DataFrame normalization"""
+    normalizer = Normalizer()
+    results = {}
+
+    items = [dict(sample) for sample in islice(cycle(NORMALIZATION_SAMPLES), rows)]
+    t0 = time.perf_counter()
+    for item in items:
+        normalizer.normalize(item)
+    results['item'] = time.perf_counter() - t0
+
+    items = [dict(sample) for sample in islice(cycle(NORMALIZATION_SAMPLES), rows)]
+    t0 = time.perf_counter()
+    for start in range(0, rows, 500):
+        normalizer.normalize_batch(items[start:start + 500])
+    results['batch'] = time.perf_counter() - t0
+
+    if pd is not None:
+        frame = pd.DataFrame(list(islice(cycle(NORMALIZATION_SAMPLES), rows)))
+        t0 = time.perf_counter()
+        normalizer.normalize_frame(frame)
+        results['frame'] = time.perf_counter() - t0
+
+    return {
+        name: {'seconds': round(seconds, 3), 'rows_per_sec': round(rows / seconds) if seconds else 0}
+        for name, seconds in results.items()
+    }
+
+
+def print_report(result):
+    print(f"Pages:      {result['pages']} ({result['pages_per_sec']} pages/sec)")
+    print(f"Items:      {result['items']} ({result['items_per_sec']} items/sec)")
+    print(f"Requests:   {result['requests']}")
+    print(f"Errors:     {result['errors']}")
+    print(f"Time:       {result['seconds']}s")
+    print(f"Peak RSS:   {result['peak_rss_mb']} MB")
+    print()
+    print(f"{'callback':<22}{'calls':>8}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, stats in result['callbacks'].items():
+        print(f"{name:<22}{stats['calls']:>8}{stats['p50_ms']:>10}{stats['p95_ms']:>10}")
+    if result.get('stats'):
+        print()
+        for key, value in result['stats'].items():
+            print(f"{key:<40}{value:>10}")
+
+
+def compare_to_baseline(result, baseline, tolerance):
+    """Return a list of regressions larger than `tolerance` (a fraction)"""
+    regressions = []
+    for key in ['pages_per_sec', 'items_per_sec']:
+        if baseline.get(key) and result[key] < baseline[key] * (1 - tolerance):
+            regressions.append(f"{key}: {result[key]} < baseline {baseline[key]}")
+    if baseline.get('peak_rss_mb') and result['peak_rss_mb'] > baseline['peak_rss_mb'] * (1 + tolerance):
+        regressions.append(f"peak_rss_mb: {result['peak_rss_mb']} > baseline {baseline['peak_rss_mb']}")
+    for name, stats in result['callbacks'].items():
+        base = baseline.get('callbacks', {}).get(name)
+        if base and base['p95_ms'] and stats['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name} p95: {stats['p95_ms']}ms > baseline {base['p95_ms']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline replay benchmark for the Cleverleben spider')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='filesystem cache directory or SQLite cache file')
+    parser.add_argument('--rounds', type=int, default=1, help='replay the cache this many times')
+    parser.add_argument('--slim', action='store_true', help='slim the pages like ResponseSlimmingMiddleware')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the new baseline')
+    parser.add_argument('--check', action='store_true', help='exit non-zero on a regression against the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed regression, default 20%%')
+    parser.add_argument('--normalization', type=int, metavar='ROWS', help='only benchmark normalizing this many rows')
+    args = parser.parse_args()
+
+    if args.normalization:
+        print(f"{'normalization':<22}{'seconds':>10}{'rows/sec':>12}")
+        for name, stats in run_normalization_benchmark(args.normalization).items():
+            print(f"{name:<22}{stats['seconds']:>10}{stats['rows_per_sec']:>12}")
+        if pd is None:
+            print("pandas not installed, skipping the DataFrame normalization")
+        return 0
+
+    if not os.path.exists(args.cache_dir):
+        print(f"❌ Cache not found: {args.cache_dir}")
+        return 1
+
+    result = run_benchmark(args.cache_dir, args.rounds, args.slim)
+    print_report(result)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"✓ Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        if args.check:
+            print(f"❌ No baseline in {args.baseline}, save one with --save-baseline first")
+            return 1
+    else:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(result, baseline, args.tolerance)
+        if regressions:
+            print("⚠ Regressions against baseline:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            if args.check:
+                return 1
+        else:
+            print("✓ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test against a generated catalog (cleverleben_scraper/mocksite.py).
+
+Starts the mock site in a process of its own and crawls it with CleverSpider
+and the project's scheduler, dupefilter, middlewares and pipelines, without
+download delays or the HTTP cache. Every --interval seconds a sample of the
+throughput, memory, scheduler queue depth, in-flight requests and seen-set
+sizes is appended to <work dir>/samples.jsonl; a summary is printed at the end.
+
+    python run_loadtest.py --products 100000
+    python run_loadtest.py --products 20000 --page-kb 200 --concurrency 32
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import socket
+import sys
+import time
+
+from scrapy import signals
+from scrapy.crawler import CrawlerProcess
+from scrapy.utils.project import get_project_settings
+
+from cleverleben_scraper.instrumentation import create_looping_call
+from cleverleben_scraper.mocksite import SITE, MockCatalog, serve
+from cleverleben_scraper.spiders.clever_spider import CleverSpider
+
+WORK_DIR = '.scrapy/loadtest'
+
+
+def rss_mb():
+    """Current resident set size of this process in MB (the peak where /proc is missing)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class LoadSampler:
+    """Extension that appends one sample of the crawl state per interval to LOADTEST_SAMPLES"""
+
+    def __init__(self, crawler, path, interval):
+        self.crawler = crawler
+        self.path = path
+        self.interval = interval
+        self.samples = []
+        self.started = None
+        self.task = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        ext = cls(crawler, settings.get('LOADTEST_SAMPLES'), settings.getfloat('LOADTEST_INTERVAL', 5.0))
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def spider_opened(self, spider):
+        self.started = time.perf_counter()
+        self.file = open(self.path, 'w', encoding='utf-8')
+        self.task = create_looping_call(self.sample)
+        self.task.start(self.interval, now=True)
+
+    def spider_closed(self, spider, reason):
+        if self.task and self.task.running:
+            self.task.stop()
+        self.sample()
+        self.file.close()
+
+    def sample(self):
+        engine = self.crawler.engine
+        stats = self.crawler.stats
+        slot = getattr(engine, '_slot', None) or getattr(engine, 'slot', None)
+        scheduler = getattr(slot, 'scheduler', None)
+        dupefilter = getattr(scheduler, 'df', None)
+        scraper_slot = getattr(engine.scraper, 'slot', None)
+        seen = getattr(getattr(self.crawler.spider, 'link_harvester', None), 'seen', None)
+        record = {
+            'elapsed': round(time.perf_counter() - self.started, 2),
+            'items': stats.get_value('item_scraped_count', 0),
+            'responses': stats.get_value('response_received_count', 0),
+            'enqueued': stats.get_value('scheduler/enqueued', 0),
+            'queue': len(scheduler) if scheduler is not None else 0,
+            'spilled': stats.get_value('scheduler/spilled', 0),
+            'inflight': len(engine.downloader.active),
+            'scraping': len(scraper_slot.active) if scraper_slot is not None else 0,
+            'dupefilter': len(getattr(dupefilter, 'fingerprints', ())),
+            'seen_links': len(seen) if hasattr(seen, '__len__') else None,
+            'rss_mb': round(rss_mb(), 1),
+        }
+        self.samples.append(record)
+        self.file.write(json.dumps(record) + '\n')
+        self.file.flush()
+
+
+def loadtest_settings(args, work_dir, port):
+    settings = get_project_settings()
+    settings.setdict({
+        'MOCKSITE_URL': f'http://127.0.0.1:{port}',
+        # Measure the crawler, not the politeness settings
+        'DOWNLOAD_DELAY': 0,
+        'AUTOTHROTTLE_ENABLED': False,
+        'ADAPTIVE_THROTTLE_ENABLED': False,
+        'HTTPCACHE_ENABLED': False,
+        'CONCURRENT_REQUESTS': args.concurrency,
+        'CONCURRENT_REQUESTS_PER_DOMAIN': args.concurrency,
+        'CLOSESPIDER_TIMEOUT': args.max_seconds,
+        'LOG_LEVEL': args.log_level,
+        'TELNETCONSOLE_ENABLED': False,
+        # Everything the crawl writes stays in the work directory
+        'FEEDS': {os.path.join(work_dir, 'items.jsonl'): {'format': 'jsonlines'}},
+        'DEDUP_PATH': os.path.join(work_dir, 'dedup.sqlite'),
+        'DELTA_ENABLED': True,
+        'DELTA_INDEX': os.path.join(work_dir, 'delta.sqlite'),
+        'DELTA_FILE': os.path.join(work_dir, 'delta.jsonl'),
+        'PRODUCT_STORE_ENABLED': True,
+        'PRODUCT_STORE_PATH': os.path.join(work_dir, 'products.sqlite'),
+        'INCREMENTAL_STORE': os.path.join(work_dir, 'incremental.sqlite'),
+        'INSTRUMENTATION_SNAPSHOT_FILE': os.path.join(work_dir, 'stats.jsonl'),
+        'LOADTEST_SAMPLES': os.path.join(work_dir, 'samples.jsonl'),
+        'LOADTEST_INTERVAL': args.interval,
+        'EXTENSIONS': {**settings.getdict('EXTENSIONS'), LoadSampler: 600},
+    }, priority='cmdline')
+    return settings
+
+
+def wait_for_port(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def summarize(samples, products, stats):
+    """The numbers that show where the crawl stops scaling"""
+    last = samples[-1]
+    # Memory growth once the crawl is warm: from the first sample with 10% of the items
+    warm = next((s for s in samples if s['items'] >= last['items'] / 10), samples[0])
+    items_after_warm = last['items'] - warm['items']
+    return {
+        'seconds': last['elapsed'],
+        'items': last['items'],
+        'coverage': round(last['items'] / products, 4) if products else 0.0,
+        'items_per_sec': round(last['items'] / last['elapsed'], 1) if last['elapsed'] else 0.0,
+        'responses_per_sec': round(last['responses'] / last['elapsed'], 1) if last['elapsed'] else 0.0,
+        'peak_rss_mb': max(s['rss_mb'] for s in samples),
+        'rss_mb_per_10k_items': (
+            round((last['rss_mb'] - warm['rss_mb']) / items_after_warm * 10_000, 1) if items_after_warm else 0.0
+        ),
+        'max_queue': max(s['queue'] for s in samples),
+        'spilled': last['spilled'],
+        'dupefilter': last['dupefilter'],
+        'seen_links': last['seen_links'],
+        'duplicates_filtered': stats.get('dupefilter/filtered', 0),
+        'finish_reason': stats.get('finish_reason'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the crawler against a mock catalog')
+    parser.add_argument('--products', type=int, default=100_000)
+    parser.add_argument('--categories', type=int, default=8)
+    parser.add_argument('--subcategories', type=int, default=25, help='listings per category')
+    parser.add_argument('--page-size', type=int, default=24, help='products per listing page')
+    parser.add_argument('--page-kb', type=int, default=50, help='inline script per page, in KB')
+    parser.add_argument('--concurrency', type=int, default=16, help='CONCURRENT_REQUESTS')
+    parser.add_argument('--interval', type=float, default=5.0, help='seconds between samples')
+    parser.add_argument('--max-seconds', type=int, default=0, help='stop the crawl after this long (0: no limit)')
+    parser.add_argument('--port', type=int, default=8398)
+    parser.add_argument('--work-dir', default=WORK_DIR)
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args()
+
+    if os.path.exists(args.work_dir):
+        shutil.rmtree(args.work_dir)
+    os.makedirs(args.work_dir)
+
+    catalog = MockCatalog(args.products, args.categories, args.subcategories, args.page_size, page_kb=args.page_kb)
+    server = multiprocessing.get_context('spawn').Process(
+        target=serve, args=(catalog, '127.0.0.1', args.port), daemon=True,
+    )
+    server.start()
+    try:
+        if not wait_for_port(args.port):
+            print(f"❌ Mock site did not start on port {args.port}")
+            return 1
+        print(f"Mock catalog: {args.products} products in {catalog.listings} listings on port {args.port}")
+
+        process = CrawlerProcess(loadtest_settings(args, args.work_dir, args.port))
+        crawler = process.create_crawler(CleverSpider)
+        process.crawl(crawler, start_urls=[f'{SITE}/produktauswahl'])
+        process.start()
+    finally:
+        server.terminate()
+        server.join()
+
+    sampler = crawler.extensions.middlewares
+    samples = next(ext for ext in sampler if isinstance(ext, LoadSampler)).samples
+    summary = summarize(samples, args.products, crawler.stats.get_stats())
+    for key, value in summary.items():
+        print(f"{key:<24}{value:>14}")
+    with open(os.path.join(args.work_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    print(f"✓ Samples in {os.path.join(args.work_dir, 'samples.jsonl')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
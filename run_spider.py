@@ -1,32 +1,117 @@
 #!/usr/bin/env python3
+import argparse
 import scrapy
 from scrapy.crawler import CrawlerProcess
 from scrapy.utils.project import get_project_settings
 import os
-import json
-import pandas as pd
+import shutil
 from datetime import datetime
 import sys
+from cleverleben_scraper.exporters import parquet_available
+from cleverleben_scraper.sharding import run_sharded
 
-def run_spider():
+# Output files
+JSON_FILE = 'output_data.json'
+CSV_FILE = 'output_data.csv'
+PARQUET_FILE = 'output_data.parquet'
+
+def remove_outputs():
+    for file in [JSON_FILE, CSV_FILE, PARQUET_FILE]:
+        if os.path.exists(file):
+            os.remove(file)
+            print(f"Removed existing {file}")
+
+def output_formats():
+    """{file: feed format} of the outputs; Parquet needs pyarrow"""
+    formats = {JSON_FILE: 'jsonlines', CSV_FILE: 'csv'}
+    if parquet_available():
+        formats[PARQUET_FILE] = 'parquet'
+    else:
+        print("pyarrow not installed, skipping the Parquet output")
+    return formats
+
+def report(item_count, files):
+    print(f"Final count: {item_count} items")
+    
+    if item_count > 0:
+        print(f"✓ Successfully processed {item_count} items")
+        for file in files:
+            print(f"✓ {file}")
+        
+        if item_count < 1000:
+            print(f"⚠ Only {item_count} items extracted. Need at least 1000.")
+        else:
+            print(f"🎉 Success: {item_count} items extracted!")
+    else:
+        print("❌ No items extracted")
+
+def next_part(path):
+    """output_data.parquet -> the first of output_data.1.parquet, output_data.2.parquet, ... that does not exist"""
+    base, ext = os.path.splitext(path)
+    part = 1
+    while os.path.exists(f"{base}.{part}{ext}"):
+        part += 1
+    return f"{base}.{part}{ext}"
+
+def start_profiling(settings):
+    """Enable the crawl profiler, with a fresh PROFILING_DIR"""
+    profile_dir = settings.get('PROFILING_DIR')
+    if os.path.exists(profile_dir):
+        shutil.rmtree(profile_dir)
+    print(f"Profiling to {profile_dir}: CPU samples per callback, a heap snapshot every "
+          f"{settings.getint('PROFILING_HEAP_EVERY')} items")
+    return {'PROFILING_ENABLED': True}
+
+def run_spider(incremental=False, jobdir=None, profile=False, delta=False, store=False):
     print("Setting up Cleverleben spider...")
     
     # Configure settings
     settings = get_project_settings()
     
-    # Set output files
-    json_file = 'output_data.json'
-    csv_file = 'output_data.csv'
+    if incremental:
+        # Revalidate known product pages with conditional GETs instead of refetching them
+        settings.set('INCREMENTAL_ENABLED', True)
+        print("Incremental mode: reusing unchanged products from the last crawl")
     
-    # Remove existing files
-    for file in [json_file, csv_file]:
-        if os.path.exists(file):
-            os.remove(file)
-            print(f"Removed existing {file}")
+    if delta:
+        settings.set('DELTA_ENABLED', True)
+        print(f"Writing the changes since the last crawl to {settings.get('DELTA_FILE')}")
+    
+    if store:
+        settings.set('PRODUCT_STORE_ENABLED', True)
+        print(f"Storing the products in {settings.get('PRODUCT_STORE_PATH')}, query them with query_products.py")
     
-    # Configure feed exports
-    settings.set('FEED_URI', json_file)
-    settings.set('FEED_FORMAT', 'jsonlines')
+    if profile:
+        settings.setdict(start_profiling(settings))
+        dump_signal = settings.get('PROFILING_SIGNAL')
+        if dump_signal:
+            print(f"Dump the profiles while crawling with: kill -{dump_signal[3:]} {os.getpid()}")
+    
+    # Persistent crawl state: pending requests and seen fingerprints are kept in the job directory
+    resuming = bool(jobdir) and os.path.isdir(jobdir) and bool(os.listdir(jobdir))
+    if jobdir:
+        settings.set('JOBDIR', jobdir)
+        if resuming:
+            print(f"Resuming crawl from {jobdir}")
+        else:
+            print(f"Crawl state is kept in {jobdir}, run again with the same --jobdir to resume")
+    
+    # A resumed crawl adds to the outputs of the interrupted one
+    if not resuming:
+        remove_outputs()
+    
+    # Configure feed exports: every format is written while items arrive,
+    # nothing is re-read or converted after the crawl
+    feeds = {file: {'format': feed_format} for file, feed_format in output_formats().items()}
+    if resuming and os.path.exists(CSV_FILE):
+        feeds[CSV_FILE]['item_export_kwargs'] = {'include_headers_line': False}
+    if PARQUET_FILE in feeds:
+        parquet = feeds.pop(PARQUET_FILE)
+        parquet['item_export_kwargs'] = {'batch_size': settings.getint('PARQUET_BATCH_SIZE')}
+        # Parquet files cannot be appended to, a resumed crawl writes the next part
+        parquet_file = next_part(PARQUET_FILE) if resuming and os.path.exists(PARQUET_FILE) else PARQUET_FILE
+        feeds[parquet_file] = parquet
+    settings.set('FEEDS', feeds)
     settings.set('FEED_EXPORT_ENCODING', 'utf-8')
     
     process = CrawlerProcess(settings)
@@ -35,43 +120,66 @@ def run_spider():
     print("This may take a while as we need to extract 1000+ products...")
     
     try:
-        process.crawl('clever_spider')
+        crawler = process.create_crawler('clever_spider')
+        process.crawl(crawler)
         process.start()
         
         # Check results after spider finishes
-        if os.path.exists(json_file):
-            with open(json_file, 'r', encoding='utf-8') as f:
-                line_count = sum(1 for line in f)
-            print(f"Final count: {line_count} items")
-            
-            # Convert to CSV
-            if line_count > 0:
-                data = []
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        try:
-                            data.append(json.loads(line.strip()))
-                        except json.JSONDecodeError:
-                            continue
-                
-                df = pd.DataFrame(data)
-                df.to_csv(csv_file, index=False, encoding='utf-8')
-                print(f"✓ Successfully processed {len(data)} items")
-                print(f"✓ JSON file: {json_file}")
-                print(f"✓ CSV file: {csv_file}")
-                
-                if len(data) < 1000:
-                    print(f"⚠ Only {len(data)} items extracted. Need at least 1000.")
-                else:
-                    print(f"🎉 Success: {len(data)} items extracted!")
-                    
-        else:
-            print("❌ No output file created")
+        report(crawler.stats.get_value('item_scraped_count', 0), feeds)
+        if profile:
+            print(f"✓ Profiles and summary in {settings.get('PROFILING_DIR')}")
             
     except Exception as e:
         print(f"❌ Spider execution failed: {e}")
 
+def run_sharded_spider(shards, incremental=False, profile=False, store=False):
+    print(f"Setting up Cleverleben spider with {shards} shards...")
+    
+    overrides = {}
+    if incremental:
+        overrides['INCREMENTAL_ENABLED'] = True
+        print("Incremental mode: reusing unchanged products from the last crawl")
+    if store:
+        overrides['PRODUCT_STORE_ENABLED'] = True
+        print("Storing the products of all shards in one product store")
+    if profile:
+        # Every shard profiles itself, into PROFILING_DIR/shard-<n>
+        print("Profiling every shard, send PROFILING_SIGNAL to a shard process to dump its profiles")
+        overrides.update(start_profiling(get_project_settings()))
+    
+    remove_outputs()
+    outputs = output_formats()
+    
+    print(f"Starting {shards} spider processes...")
+    
+    try:
+        # Each shard writes its own feed, they are merged (ordered by unique_id) at the end
+        item_count, failed = run_sharded(shards, outputs, overrides=overrides)
+        for name in failed:
+            print(f"❌ {name} failed, its items are missing")
+        report(item_count, outputs)
+        
+    except Exception as e:
+        print(f"❌ Sharded crawl failed: {e}")
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Cleverleben Data Scraper')
+    parser.add_argument('--incremental', action='store_true', help='revalidate known products with conditional GETs')
+    parser.add_argument('--shards', type=int, default=1, help='crawl with this many processes sharing one frontier')
+    parser.add_argument('--jobdir', help='keep the crawl state in this directory and resume from it')
+    parser.add_argument('--profile', action='store_true', help='profile CPU per callback and the heap while crawling')
+    parser.add_argument('--delta', action='store_true', help='write the products added, changed and removed since the last crawl')
+    parser.add_argument('--store', action='store_true', help='upsert the products into the indexed product store')
+    args = parser.parse_args()
+    if args.jobdir and args.shards > 1:
+        parser.error('--jobdir cannot be combined with --shards')
+    if args.delta and args.shards > 1:
+        # A shard sees only part of the catalog, it cannot tell what was removed
+        parser.error('--delta cannot be combined with --shards')
+    
     print("Cleverleben Data Scraper")
     print("=" * 50)
-    run_spider()
\ No newline at end of file
+    if args.shards > 1:
+        run_sharded_spider(args.shards, incremental=args.incremental, profile=args.profile, store=args.store)
+    else:
+        run_spider(incremental=args.incremental, jobdir=args.jobdir, profile=args.profile, delta=args.delta, store=args.store)
\ No newline at end of file
@@ -0,0 +1,60 @@
+import pytest
+
+from cleverleben_scraper.dedup import BloomSeenSet, DiskSeenSet, build_seen_set
+
+
+@pytest.fixture(params=['exact', 'bloom', 'disk'])
+def seen(request, tmp_path):
+    seen = build_seen_set(request.param, capacity=1000, error_rate=0.001, path=str(tmp_path / 'dedup.sqlite'))
+    yield seen
+    seen.close()
+
+
+def test_add_reports_new_keys(seen):
+    assert seen.add('27399')
+    assert not seen.add('27399')
+    assert seen.add('27400')
+    assert '27399' in seen
+    assert '99999' not in seen
+    assert len(seen) == 2
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        build_seen_set('fuzzy')
+
+
+def test_bloom_false_positive_rate():
+    seen = BloomSeenSet(capacity=10_000, error_rate=0.01)
+    for i in range(10_000):
+        seen.add(f'id-{i}')
+    assert all(f'id-{i}' in seen for i in range(10_000))
+    false_positives = sum(f'other-{i}' in seen for i in range(10_000))
+    assert false_positives < 200
+
+
+def test_disk_set_is_emptied_when_opened(tmp_path):
+    path = str(tmp_path / 'dedup.sqlite')
+    seen = DiskSeenSet(path)
+    seen.add('27399')
+    seen.close()
+
+    seen = DiskSeenSet(path)
+    assert '27399' not in seen
+    assert len(seen) == 0
+    seen.close()
+
+
+def test_disk_set_keeps_keys_when_resumed(tmp_path):
+    path = str(tmp_path / 'dedup.sqlite')
+    seen = DiskSeenSet(path, commit_every=1000)
+    seen.add('27399')
+    seen.add('27400')
+    seen.close()
+
+    seen = DiskSeenSet(path, resume=True)
+    assert len(seen) == 2
+    assert not seen.add('27399')
+    assert seen.add('27401')
+    seen.close()
+
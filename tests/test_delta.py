@@ -0,0 +1,120 @@
+import csv
+
+import pytest
+from scrapy.exceptions import NotConfigured
+from scrapy.settings import Settings
+from scrapy.utils.project import get_project_settings
+from scrapy.utils.test import get_crawler
+
+from cleverleben_scraper.delta import DeltaIndex, content_hash, field_changes
+from cleverleben_scraper.exporters import FeedWriter, feed_fields
+from cleverleben_scraper.items import CleverlebenItem
+from cleverleben_scraper.pipelines import DeltaPipeline
+from cleverleben_scraper.spiders.clever_spider import CleverSpider
+
+KAFFEE = {
+    'unique_id': '27399',
+    'product_url': 'https://www.cleverleben.at/produkt/clever-kaffee-27399',
+    'product_name': 'Clever Kaffee',
+    'price': '3.99',
+    'image': ['https://images.example.com/kaffee.png'],
+}
+
+
+def test_content_hash_ignores_field_order():
+    assert content_hash(KAFFEE) == content_hash(dict(reversed(list(KAFFEE.items()))))
+    assert content_hash(KAFFEE) != content_hash({**KAFFEE, 'price': '4.29'})
+
+
+def test_image_download_results_are_not_content():
+    downloaded = {**KAFFEE, 'image_files': [{'url': KAFFEE['image'][0], 'path': 'full/ab/ab12.png', 'status': 'downloaded'}]}
+    uptodate = {**KAFFEE, 'image_files': [{'url': KAFFEE['image'][0], 'path': 'full/ab/ab12.png', 'status': 'uptodate'}]}
+    assert content_hash(downloaded) == content_hash(uptodate) == content_hash(KAFFEE)
+    assert field_changes(downloaded, uptodate) == {}
+
+
+def test_field_changes():
+    new = {**KAFFEE, 'price': '4.29', 'ingredients': 'Kaffee'}
+    del new['image']
+    assert field_changes(KAFFEE, new) == {
+        'image': [KAFFEE['image'], None],
+        'ingredients': [None, 'Kaffee'],
+        'price': ['3.99', '4.29'],
+    }
+
+
+def crawl(path, items, finish=True, resume=False):
+    index = DeltaIndex(path, resume=resume)
+    records = [index.track(item['unique_id'], item) for item in items]
+    if finish:
+        records += index.finish()
+    index.close()
+    return [record for record in records if record is not None]
+
+
+def test_delta_between_runs(tmp_path):
+    path = str(tmp_path / 'delta.sqlite')
+    milch = {**KAFFEE, 'unique_id': '27400', 'product_name': 'Clever Milch'}
+    assert [r['op'] for r in crawl(path, [KAFFEE, milch])] == ['added', 'added']
+
+    # Unchanged products write nothing, even when their images were downloaded this time
+    assert crawl(path, [{**KAFFEE, 'image_files': []}, milch]) == []
+
+    cheaper = {**KAFFEE, 'price': '3.49'}
+    assert crawl(path, [cheaper]) == [
+        {'op': 'changed', 'unique_id': '27399', 'product_url': KAFFEE['product_url'], 'changes': {'price': ['3.99', '3.49']}},
+        {'op': 'removed', 'unique_id': '27400', 'product_url': milch['product_url']},
+    ]
+
+
+def test_index_stores_the_content_hash(tmp_path):
+    path = str(tmp_path / 'delta.sqlite')
+    crawl(path, [KAFFEE])
+    index = DeltaIndex(path)
+    assert index.db.execute('SELECT hash FROM products').fetchall() == [(content_hash(KAFFEE),)]
+    index.close()
+
+
+def test_resumed_run_keeps_what_it_saw(tmp_path):
+    path = str(tmp_path / 'delta.sqlite')
+    milch = {**KAFFEE, 'unique_id': '27400', 'product_name': 'Clever Milch'}
+    crawl(path, [KAFFEE, milch])
+    # The second run stops after one product and is resumed for the other
+    crawl(path, [KAFFEE], finish=False)
+    assert crawl(path, [milch], resume=True) == []
+    index = DeltaIndex(path, resume=True)
+    assert not index.resumed
+    index.close()
+
+
+def test_feed_fields():
+    assert 'image_files' not in feed_fields()
+    assert feed_fields(images=True) == list(CleverlebenItem.fields)
+
+
+def test_feeds_have_an_image_files_column_only_with_images():
+    settings = Settings({'PRODUCT_IMAGES_ENABLED': False})
+    CleverSpider.update_settings(settings)
+    assert settings.getlist('FEED_EXPORT_FIELDS') == feed_fields()
+
+    settings = Settings({'PRODUCT_IMAGES_ENABLED': True})
+    CleverSpider.update_settings(settings)
+    assert 'image_files' in settings.getlist('FEED_EXPORT_FIELDS')
+
+
+def test_feed_writer_columns(tmp_path):
+    path = tmp_path / 'items.csv'
+    with FeedWriter({str(path): 'csv'}) as writer:
+        writer.export_item(CleverlebenItem(KAFFEE))
+    with open(path, newline='', encoding='utf-8') as f:
+        assert next(csv.reader(f)) == feed_fields()
+
+
+def test_delta_pipeline_is_opt_in(tmp_path):
+    assert not get_project_settings().getbool('DELTA_ENABLED')
+    with pytest.raises(NotConfigured):
+        DeltaPipeline.from_crawler(get_crawler(CleverSpider))
+    crawler = get_crawler(CleverSpider, {
+        'DELTA_ENABLED': True, 'DELTA_INDEX': str(tmp_path / 'delta.sqlite'), 'DELTA_FILE': str(tmp_path / 'delta.jsonl'),
+    })
+    assert isinstance(DeltaPipeline.from_crawler(crawler), DeltaPipeline)
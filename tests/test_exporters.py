@@ -0,0 +1,64 @@
+import csv
+import json
+
+import pytest
+
+from cleverleben_scraper import exporters
+from cleverleben_scraper.exporters import FeedWriter, ParquetItemExporter, feed_fields
+from cleverleben_scraper.items import CleverlebenItem
+
+ITEMS = [
+    CleverlebenItem(unique_id=str(27000 + i), product_name=f'Clever Artikel {i}', price=f'{i}.99',
+                    image=[f'https://www.cleverleben.at/media/{i}.png'])
+    for i in range(5)
+]
+
+
+def test_feed_fields():
+    assert 'image_files' not in feed_fields()
+    assert feed_fields(images=True)[-1] == 'image_files'
+    assert feed_fields()[:3] == list(CleverlebenItem.fields)[:3]
+
+
+def test_writes_every_output(tmp_path):
+    jsonl, csv_path = str(tmp_path / 'items.jsonl'), str(tmp_path / 'items.csv')
+    with FeedWriter({jsonl: 'jsonlines', csv_path: 'csv'}) as writer:
+        for item in ITEMS:
+            writer.export_item(item)
+    assert writer.count == 5
+    with open(jsonl, encoding='utf-8') as f:
+        assert [json.loads(line) for line in f] == [dict(item) for item in ITEMS]
+    with open(csv_path, encoding='utf-8', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == feed_fields()
+    assert [row['unique_id'] for row in rows] == [item['unique_id'] for item in ITEMS]
+    assert rows[0]['product_description'] == ''
+
+
+def test_unknown_format_closes_the_opened_files(tmp_path, monkeypatch):
+    opened = []
+    real_open = open
+    monkeypatch.setattr('builtins.open', lambda *args, **kwargs: opened.append(real_open(*args, **kwargs)) or opened[-1])
+    with pytest.raises(KeyError):
+        FeedWriter({str(tmp_path / 'a.jsonl'): 'jsonlines', str(tmp_path / 'b.xml'): 'xml'})
+    assert opened and all(f.closed for f in opened)
+
+
+def test_parquet_needs_pyarrow(tmp_path, monkeypatch):
+    monkeypatch.setattr(exporters, 'pa', None)
+    with open(tmp_path / 'items.parquet', 'wb') as f, pytest.raises(RuntimeError):
+        ParquetItemExporter(f)
+
+
+def test_parquet_row_groups(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / 'items.parquet')
+    with FeedWriter({path: 'parquet'}, batch_size=2) as writer:
+        for item in ITEMS:
+            writer.export_item(item)
+    table = pq.ParquetFile(path)
+    assert table.metadata.num_row_groups == 3
+    rows = table.read().to_pylist()
+    assert [row['unique_id'] for row in rows] == [item['unique_id'] for item in ITEMS]
+    assert rows[0]['image'] == ITEMS[0]['image']
+    assert rows[0]['product_description'] is None
@@ -0,0 +1,150 @@
+import pytest
+from parsel import Selector
+from scrapy.http import HtmlResponse
+
+from cleverleben_scraper.extraction import find_jsonld
+from cleverleben_scraper.spiders.clever_spider import PRODUCT_EXTRACTOR, CleverSpider
+
+PAGES = {
+    'microdata': '''
+        <html><head>
+          <title>Clever Kaffee | Clever</title>
+          <meta property="og:title" content="Clever Kaffee gemahlen">
+          <meta property="og:image" content="/media/kaffee-og.png">
+          <meta name="description" content="Gemahlener Röstkaffee aus 100% Arabica">
+        </head><body>
+          <h1 itemprop="name">Clever Kaffee gemahlen 500g</h1>
+          <span itemprop="price">3,99</span>
+          <img itemprop="image" src="/media/kaffee.png">
+          <div itemprop="description"><p>Kräftiger Röstkaffee</p> <p>für jeden Tag</p></div>
+          <table>
+            <tr><td>Zutaten</td><td>Röstkaffee <b>100%</b></td></tr>
+            <tr><td>Produktinformation</td><td>Vakuumverpackt</td></tr>
+          </table>
+        </body></html>
+    ''',
+    'fallbacks': '''
+        <html><head><title>Clever Milch 1l | Clever</title></head><body>
+          <h1 class="product-title">   </h1>
+          <h1>Clever Vollmilch 3,5%</h1>
+          <div class="price-box"><span class="price-label">ab</span> <span class="price-value">€ 1,19</span></div>
+          <div class="product-image"><div><img src="/media/milch-1.png"><img src="/media/milch-2.png"></div></div>
+          <img class="product-thumb" src="/media/milch-1.png">
+          <div class="description">Frische Vollmilch <div class="description-more">aus Österreich</div></div>
+          <div>Zutaten</div><div>Milch</div><div>3,5% Fett</div>
+          <h2>Produktinformation</h2><p>   </p><p>Gekühlt lagern</p>
+        </body></html>
+    ''',
+    'sparse': '''
+        <html><head>
+          <meta property="og:title" content="Clever Reis">
+          <meta property="product:price:amount" content="0.99">
+        </head><body>
+          <div class="price">Preis auf Anfrage</div>
+          <h3><b>Hinweis:</b> Zutaten siehe Packung</h3><p>Reis</p>
+        </body></html>
+    ''',
+    'empty': '<html><body><p>Seite nicht gefunden</p></body></html>',
+}
+
+
+def xpath_value(selector, field):
+    """The field as the original spider computed it, one XPath query per selector"""
+    xpaths = [s.describe() for s in field.selectors]
+    if field.mode == 'all':
+        return [value for xpath in xpaths for value in selector.xpath(xpath).getall()]
+    for xpath in xpaths:
+        values = selector.xpath(xpath).getall()
+        if field.mode == 'first':
+            values = values[:1]
+        for value in values:
+            if field.accept(value):
+                return value
+    return None
+
+
+@pytest.mark.parametrize('page', sorted(PAGES))
+def test_extractor_matches_the_xpath_selectors(page):
+    selector = Selector(text=PAGES[page])
+    fields = PRODUCT_EXTRACTOR.extract(selector.root)
+    assert fields == {field.name: xpath_value(selector, field) for field in PRODUCT_EXTRACTOR.fields}
+
+
+def test_extracted_values():
+    fields = PRODUCT_EXTRACTOR.extract(Selector(text=PAGES['fallbacks']).root)
+    # Like .get(), each selector only offers its first result: the blank h1 hides the second
+    # one, and the blank paragraph the details
+    assert fields['product_name'] == 'Clever Milch 1l | Clever'
+    assert fields['price'] == '€ 1,19'
+    assert fields['image'] == ['/media/milch-1.png', '/media/milch-2.png', '/media/milch-1.png']
+    assert fields['ingredients'] == 'Milch'
+    assert fields['details'] is None
+
+
+def test_only_and_report():
+    outcomes = []
+    fields = PRODUCT_EXTRACTOR.extract(
+        Selector(text=PAGES['sparse']).root,
+        only={'product_name', 'price'},
+        report=lambda name, xpath, hit: outcomes.append((name, xpath, bool(hit))),
+    )
+    assert fields == {'product_name': 'Clever Reis', 'price': '0.99'}
+    assert outcomes == [
+        ('product_name', '//h1[@itemprop="name"]/text()', False),
+        ('product_name', '//h1[contains(@class, "product")]/text()', False),
+        ('product_name', '//h1/text()', False),
+        ('product_name', '//title/text()', False),
+        ('product_name', '//meta[@property="og:title"]/@content', True),
+        ('price', '//span[@itemprop="price"]/text()', False),
+        ('price', '//meta[@property="product:price:amount"]/@content', True),
+    ]
+
+
+def test_find_jsonld():
+    page = '''
+        <script type="application/ld+json">not json</script>
+        <script type="application/ld+json">
+          {"@graph": [{"@type": "BreadcrumbList"}, {"@type": "Product", "name": "Clever Kaffee"}]}
+        </script>
+    '''
+    root = Selector(text=page).root
+    assert find_jsonld(root, 'Product')['name'] == 'Clever Kaffee'
+    assert find_jsonld(root, 'Offer') is None
+
+
+def test_parse_jsonld_product():
+    fields = CleverSpider().parse_jsonld_product({
+        '@type': 'Product',
+        'name': ' Clever Kaffee ',
+        'offers': [{'@type': 'Offer', 'price': '3,99', 'priceCurrency': 'EUR'}],
+        'image': [{'url': '/media/kaffee.png'}, 'data:image/png;base64,AAAA', '/media/kaffee-2.png'],
+        'description': '<p>Kräftiger <b>Röstkaffee</b></p>',
+    })
+    assert fields == {
+        'product_name': 'Clever Kaffee',
+        'price': 3.99,
+        'currency': '€',
+        'image': ['/media/kaffee.png', '/media/kaffee-2.png'],
+        'product_description': 'Kräftiger Röstkaffee',
+    }
+    # Unusable values are left to the DOM selectors
+    assert CleverSpider().parse_jsonld_product({
+        'name': ' ', 'offers': {'price': 'auf Anfrage'}, 'image': 'data:x', 'description': 'kurz',
+    }) == {}
+
+
+def test_jsonld_mode_fills_the_rest_from_the_dom():
+    spider = CleverSpider()
+    spider.extraction_mode = 'jsonld'
+    jsonld = '{"@type": "Product", "name": "Clever Kaffee Bohnen", "offers": {"price": 4.49, "priceCurrency": "EUR"}}'
+    page = PAGES['microdata'].replace('</head>', f'<script type="application/ld+json">{jsonld}</script></head>')
+    stats = []
+    response = HtmlResponse('https://www.cleverleben.at/produkt/clever-kaffee-27399', body=page, encoding='utf-8')
+    item = spider.extract_product(response, lambda key, count=1: stats.append(key))
+    assert item['product_name'] == 'Clever Kaffee Bohnen'
+    assert item['price'] == 4.49
+    assert item['ingredients'] == 'Röstkaffee'
+    assert sorted(key for key in stats if key.startswith('extraction/jsonld/')) == [
+        'extraction/jsonld/currency', 'extraction/jsonld/price', 'extraction/jsonld/product_name',
+    ]
+    assert 'extraction/dom/ingredients' in stats and 'extraction/dom/product_name' not in stats
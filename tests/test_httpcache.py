@@ -0,0 +1,134 @@
+import os
+
+import pytest
+from scrapy import Request, Spider
+from scrapy.extensions.httpcache import FilesystemCacheStorage
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+
+from cleverleben_scraper.httpcache import SqliteCacheStorage, iter_cache_db, migrate_filesystem_cache, migrate_once
+
+URL = 'https://www.cleverleben.at/produkt/clever-kaffee-27399'
+BODY = '<html><h1 itemprop="name">Clever Kaffee</h1></html>'.encode('utf-8') * 50
+
+
+class CacheSpider(Spider):
+    name = 'cache_test'
+
+
+@pytest.fixture
+def spider(tmp_path):
+    crawler = get_crawler(CacheSpider, {'HTTPCACHE_DIR': str(tmp_path / 'httpcache'), 'HTTPCACHE_EXPIRATION_SECS': 0})
+    return crawler._create_spider()
+
+
+def open_storage(spider):
+    storage = SqliteCacheStorage(spider.crawler.settings)
+    storage.open_spider(spider)
+    return storage
+
+
+def kaffee_response(request):
+    return HtmlResponse(
+        f'{URL}?ref=1', status=200, body=BODY, request=request,
+        headers={'Content-Type': 'text/html; charset=utf-8', 'ETag': '"abc"'},
+    )
+
+
+def test_round_trip(spider):
+    request = Request(URL)
+    storage = open_storage(spider)
+    assert storage.retrieve_response(spider, request) is None
+    storage.store_response(spider, request, kaffee_response(request))
+    storage.close_spider(spider)
+
+    storage = open_storage(spider)
+    cached = storage.retrieve_response(spider, Request(URL))
+    [(stored,)] = storage.db.execute('SELECT length(body) FROM responses').fetchall()
+    storage.close_spider(spider)
+    assert isinstance(cached, HtmlResponse)
+    assert cached.url == f'{URL}?ref=1'
+    assert cached.status == 200
+    assert cached.body == BODY
+    assert cached.headers['ETag'] == b'"abc"'
+    assert cached.css('h1::text').get() == 'Clever Kaffee'
+    # Stored compressed
+    assert stored < len(BODY) / 10
+
+
+def test_fingerprint_is_the_key(spider):
+    request = Request(URL)
+    storage = open_storage(spider)
+    storage.store_response(spider, request, kaffee_response(request))
+    assert storage.retrieve_response(spider, Request(f'{URL}-2')) is None
+    assert storage.retrieve_response(spider, Request(URL, method='POST')) is None
+    storage.close_spider(spider)
+
+
+def test_expired_responses_are_not_returned(spider):
+    request = Request(URL)
+    storage = open_storage(spider)
+    storage.store_response(spider, request, kaffee_response(request))
+    assert storage.retrieve_response(spider, request) is not None
+    storage.expiration_secs = 60
+    storage.db.execute('UPDATE responses SET timestamp = timestamp - 120')
+    assert storage.retrieve_response(spider, request) is None
+    storage.close_spider(spider)
+
+
+def test_migrated_filesystem_cache_is_found(spider, tmp_path):
+    request = Request(URL)
+    filesystem = FilesystemCacheStorage(spider.crawler.settings)
+    filesystem.open_spider(spider)
+    filesystem.store_response(spider, request, kaffee_response(request))
+    filesystem.close_spider(spider)
+
+    cache_dir = os.path.join(filesystem.cachedir, spider.name)
+    db_path = os.path.join(str(tmp_path / 'httpcache'), 'cache_test.sqlite')
+    assert migrate_filesystem_cache(cache_dir, db_path) == 1
+
+    storage = open_storage(spider)
+    cached = storage.retrieve_response(spider, request)
+    storage.close_spider(spider)
+    assert cached.body == BODY
+    assert cached.headers['ETag'] == b'"abc"'
+
+    [(meta, response)] = list(iter_cache_db(db_path))
+    assert meta['url'] == URL
+    assert meta['status'] == 200
+    assert response.body == BODY
+
+
+def store_in_filesystem_cache(spider, request):
+    filesystem = FilesystemCacheStorage(spider.crawler.settings)
+    filesystem.open_spider(spider)
+    filesystem.store_response(spider, request, kaffee_response(request))
+    filesystem.close_spider(spider)
+    return os.path.join(filesystem.cachedir, spider.name)
+
+
+def test_filesystem_cache_is_migrated_on_first_open(spider):
+    request = Request(URL)
+    store_in_filesystem_cache(spider, request)
+
+    storage = open_storage(spider)
+    storage.expiration_secs = 3600
+    cached = storage.retrieve_response(spider, request)
+    storage.close_spider(spider)
+    # As fresh as it was in the filesystem cache
+    assert cached.body == BODY
+
+    # Only once: later responses live in the database alone
+    other = Request(f'{URL}-2')
+    store_in_filesystem_cache(spider, other)
+    storage = open_storage(spider)
+    assert storage.retrieve_response(spider, other) is None
+    storage.close_spider(spider)
+
+
+def test_only_one_process_migrates(spider, tmp_path):
+    cache_dir = store_in_filesystem_cache(spider, Request(URL))
+    db_path = str(tmp_path / 'cache.sqlite')
+    assert migrate_once(cache_dir, db_path) == 1
+    assert migrate_once(cache_dir, db_path) is None
+    assert sorted(os.listdir(tmp_path)) == ['cache.sqlite', 'httpcache']
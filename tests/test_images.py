@@ -0,0 +1,48 @@
+from cleverleben_scraper.images import ImageIndex, canonical_image_url, canonical_images, is_branding
+
+ASSET = 'https://images.cdn.europe-west1.gcp.commercetools.com/5f1a/Clever-Kaffee-EoB5R2'
+
+
+def test_variants_map_to_the_full_size_asset():
+    assert canonical_image_url(f'{ASSET}-medium.png') == f'{ASSET}.png'
+    assert canonical_image_url(f'{ASSET}-thumb.jpg') == f'{ASSET}.jpg'
+    assert canonical_image_url(f'{ASSET}.png') == f'{ASSET}.png'
+    # Only commercetools names its variants that way
+    assert canonical_image_url('https://example.com/kaffee-medium.png') == 'https://example.com/kaffee-medium.png'
+
+
+def test_branding():
+    assert is_branding('https://www.cleverleben.at/tenant/logo.svg')
+    assert is_branding('https://www.cleverleben.at/static/favicon.ico')
+    assert is_branding('https://cdn.example.com/img/site_logo.png')
+    assert not is_branding(f'{ASSET}.png')
+    assert not is_branding('https://cdn.example.com/img/logorrhea-kaffee.png')
+
+
+def test_canonical_images():
+    urls = [
+        f'{ASSET}-medium.png',
+        'https://www.cleverleben.at/tenant/logo.svg',
+        f'{ASSET}.png',
+        f'{ASSET}-large.png',
+        '',
+        None,
+        f'{ASSET}-2.png',
+    ]
+    assert canonical_images(urls) == [f'{ASSET}.png', f'{ASSET}-2.png']
+    # Joined CSV values are left alone
+    assert canonical_images(f'{ASSET}.png, {ASSET}-2.png') == f'{ASSET}.png, {ASSET}-2.png'
+
+
+def test_image_index(tmp_path):
+    path = str(tmp_path / 'images.sqlite')
+    index = ImageIndex(path)
+    assert index.lookup(f'{ASSET}.png') is None
+    assert not index.has_content('ab12')
+    index.add(f'{ASSET}.png', 'ab12', 'full/ab/ab12.png')
+    index.close()
+
+    index = ImageIndex(path)
+    assert index.lookup(f'{ASSET}.png') == ('full/ab/ab12.png', 'ab12')
+    assert index.has_content('ab12')
+    index.close()
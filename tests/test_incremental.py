@@ -0,0 +1,77 @@
+import pytest
+from scrapy import Request
+from scrapy.exceptions import NotConfigured
+from scrapy.http import HtmlResponse, Response
+from scrapy.utils.test import get_crawler
+
+from cleverleben_scraper.incremental import ValidatorStore
+from cleverleben_scraper.middlewares import ConditionalGetMiddleware, IncrementalItemMiddleware
+from cleverleben_scraper.spiders.clever_spider import CleverSpider
+
+URL = 'https://www.cleverleben.at/produkt/clever-kaffee-27399'
+PAGE = b'<html><body><h1>Clever Kaffee gemahlen</h1><span itemprop="price">3,99</span></body></html>'
+ETAG = '"27399-v1"'
+LAST_MODIFIED = 'Tue, 06 Oct 2026 08:00:00 GMT'
+
+
+def crawl(tmp_path):
+    crawler = get_crawler(CleverSpider, {'INCREMENTAL_ENABLED': True, 'INCREMENTAL_STORE': str(tmp_path / 'incremental.sqlite')})
+    spider = crawler._create_spider()
+    downloader = ConditionalGetMiddleware.from_crawler(crawler)
+    items = IncrementalItemMiddleware.from_crawler(crawler)
+    return crawler, spider, downloader, items
+
+
+def test_is_opt_in():
+    crawler = get_crawler(CleverSpider)
+    with pytest.raises(NotConfigured):
+        ConditionalGetMiddleware.from_crawler(crawler)
+    with pytest.raises(NotConfigured):
+        IncrementalItemMiddleware.from_crawler(crawler)
+
+
+def test_unchanged_page_reuses_the_stored_item(tmp_path):
+    crawler, spider, downloader, items = crawl(tmp_path)
+    # Both middlewares of a crawler share one store
+    assert downloader.store is items.store
+    request = Request(URL)
+    assert downloader.process_request(request, spider) is None
+    assert 'If-None-Match' not in request.headers
+    response = HtmlResponse(URL, body=PAGE, request=request, headers={'ETag': ETAG, 'Last-Modified': LAST_MODIFIED})
+    first = list(items.process_spider_output(response, spider.parse_product(response), spider))
+    assert first[0]['price'] == '3.99'
+    downloader.spider_closed(spider)
+    items.spider_closed(spider)
+
+    crawler, spider, downloader, items = crawl(tmp_path)
+    request = Request(URL)
+    downloader.process_request(request, spider)
+    assert request.headers['If-None-Match'] == ETAG.encode()
+    assert request.headers['If-Modified-Since'] == LAST_MODIFIED.encode()
+    assert 304 in request.meta['handle_httpstatus_list']
+    response = downloader.process_response(request, Response(URL, status=304, request=request), spider)
+    second = list(items.process_spider_output(response, spider.parse_product(response), spider))
+    assert [dict(item) for item in second] == [dict(item) for item in first]
+    assert crawler.stats.get_value('incremental/conditional_requests') == 1
+    assert crawler.stats.get_value('incremental/not_modified') == 1
+    assert crawler.stats.get_value('incremental/reused_items') == 1
+    downloader.spider_closed(spider)
+
+
+def test_pages_without_validators_are_not_stored(tmp_path):
+    crawler, spider, downloader, items = crawl(tmp_path)
+    request = Request(URL)
+    response = HtmlResponse(URL, body=PAGE, request=request)
+    list(items.process_spider_output(response, spider.parse_product(response), spider))
+    assert items.store.lookup(URL) is None
+    items.spider_closed(spider)
+
+
+def test_store_keeps_the_latest_item(tmp_path):
+    store = ValidatorStore(str(tmp_path / 'incremental.sqlite'), commit_every=1)
+    store.save(URL, ETAG, None, {'price': '3.99'})
+    store.save(URL, '"27399-v2"', LAST_MODIFIED, {'price': '4.29'})
+    assert store.lookup(URL) == ('"27399-v2"', LAST_MODIFIED, {'price': '4.29'})
+    assert store.lookup(URL + '-x') is None
+    store.close()
+    store.close()
@@ -0,0 +1,91 @@
+import json
+from datetime import datetime
+
+from scrapy import Request, Spider
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+
+from cleverleben_scraper.instrumentation import StatsSnapshots, Timings, percentile, timed_stage
+from cleverleben_scraper.middlewares import InstrumentationMiddleware
+
+
+class TimedSpider(Spider):
+    name = 'timed'
+
+    def parse_listing(self, response):
+        yield {'url': response.url}
+        yield {'url': response.url}
+
+
+class UpperPipeline:
+    @timed_stage
+    def process_item(self, item, spider):
+        return {key: value.upper() for key, value in item.items()}
+
+
+def crawler_and_spider(enabled=True, **settings):
+    crawler = get_crawler(TimedSpider, {'INSTRUMENTATION_ENABLED': enabled, **settings})
+    crawler.spider = crawler._create_spider()
+    return crawler, crawler.spider
+
+
+def test_percentile():
+    assert percentile([], 95) == 0.0
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile(list(range(1, 101)), 95) == 95
+    assert percentile([7], 1) == 7
+
+
+def test_timings_publish_percentiles():
+    crawler, _ = crawler_and_spider()
+    timings = Timings.for_crawler(crawler)
+    assert Timings.for_crawler(crawler) is timings
+    for ms in range(1, 101):
+        timings.record('callback/parse', ms / 1000)
+    timings.publish()
+    stats = crawler.stats.get_stats()
+    assert stats['timing/callback/parse/count'] == 100
+    assert stats['timing/callback/parse/total_ms'] == 5050.0
+    assert stats['timing/callback/parse/p50_ms'] == 50.0
+    assert stats['timing/callback/parse/p95_ms'] == 95.0
+    assert stats['timing/callback/parse/max_ms'] == 100.0
+
+
+def test_timed_stage():
+    crawler, spider = crawler_and_spider()
+    assert UpperPipeline().process_item({'name': 'kaffee'}, spider) == {'name': 'KAFFEE'}
+    assert crawler.stats.get_value('timing/pipeline/UpperPipeline/count') == 1
+
+    crawler, spider = crawler_and_spider(enabled=False)
+    assert UpperPipeline().process_item({'name': 'kaffee'}, spider) == {'name': 'KAFFEE'}
+    assert crawler.stats.get_value('timing/pipeline/UpperPipeline/count') is None
+
+
+def test_callback_timings_and_sizes():
+    crawler, spider = crawler_and_spider()
+    middleware = InstrumentationMiddleware.from_crawler(crawler)
+    request = Request('https://www.cleverleben.at/produkte/kaffee-10580', callback=spider.parse_listing)
+    response = HtmlResponse(request.url, body=b'<html>' + b' ' * 994 + b'</html>', request=request)
+    middleware.process_spider_input(response, spider)
+    output = list(middleware.process_spider_output(response, spider.parse_listing(response), spider))
+    assert len(output) == 2
+    stats = crawler.stats.get_stats()
+    assert stats['timing/callback/parse_listing/count'] == 1
+    assert stats['response_bytes/parse_listing/total'] == 1007
+    assert stats['response_bytes/parse_listing/max'] == 1007
+
+
+def test_snapshots(tmp_path):
+    path = tmp_path / 'stats' / 'snapshots.jsonl'
+    crawler, spider = crawler_and_spider(INSTRUMENTATION_SNAPSHOT_FILE=str(path))
+    crawler.stats.set_value('start_time', datetime(2026, 10, 16, 8, 0))
+    Timings.for_crawler(crawler).record('callback/parse', 0.25)
+    snapshots = StatsSnapshots.from_crawler(crawler)
+    path.parent.mkdir()
+    snapshots.snapshot()
+    snapshots.snapshot('finished')
+    first, last = [json.loads(line) for line in path.read_text().splitlines()]
+    assert not first['final']
+    assert (last['final'], last['reason']) == (True, 'finished')
+    assert last['stats']['timing/callback/parse/p95_ms'] == 250.0
+    assert last['stats']['start_time'] == '2026-10-16T08:00:00'
@@ -0,0 +1,77 @@
+from scrapy.http import HtmlResponse
+
+from cleverleben_scraper.links import LinkHarvester
+from cleverleben_scraper.urls import CATEGORY, PAGINATION, PRODUCT, SUBCATEGORY, UrlClassifier
+
+SITE = 'https://www.cleverleben.at'
+LISTING = f'{SITE}/produkte/kaffee-10580'
+
+
+def page(url, hrefs):
+    links = ''.join(f'<a href="{href}">link</a>' for href in hrefs)
+    return HtmlResponse(url, body=f'<html><body>{links}<a>no href</a></body></html>'.encode('utf-8'))
+
+
+def harvester():
+    stats = {}
+
+    def inc_stat(key, count=1):
+        stats[key] = stats.get(key, 0) + count
+    return LinkHarvester(UrlClassifier(), inc_stat=inc_stat), stats
+
+
+def test_new_links_in_document_order():
+    links, stats = harvester()
+    response = page(LISTING, [
+        '/produkt/clever-tee-2',
+        f'{SITE}/produkt/clever-kaffee-1',
+        ' /produkt/clever-tee-2 ',
+        # The same URL after canonicalization
+        '/produkt/clever-kaffee-1#zutaten',
+        '/produkte/tee-10581?b=2&a=1',
+        '/produkte/tee-10581?a=1&b=2',
+        '/lebensmittel',
+        '/impressum',
+        'http://[::1',
+    ])
+    assert links.harvest(response, follow={PRODUCT, SUBCATEGORY}) == [
+        (f'{SITE}/produkt/clever-tee-2', PRODUCT),
+        (f'{SITE}/produkt/clever-kaffee-1', PRODUCT),
+        (f'{SITE}/produkte/tee-10581?a=1&b=2', SUBCATEGORY),
+    ]
+    assert stats == {'links/new': 3, 'links/duplicate': 2}
+
+
+def test_links_are_handed_out_once_per_crawl():
+    links, stats = harvester()
+    products = ['/produkt/clever-kaffee-1', '/produkt/clever-tee-2']
+    assert len(links.harvest(page(LISTING, products), follow={PRODUCT})) == 2
+    assert links.harvest(page(f'{LISTING}?page=2', products), follow={PRODUCT}) == []
+    assert stats['links/duplicate'] == 2
+
+
+def test_skipped_links_stay_available():
+    links, _ = harvester()
+    response = page(f'{SITE}/produktauswahl', ['/lebensmittel', '/getraenke', '/produkte/tee-10581'])
+    # Not followed, or not ours: another page can still hand them out
+    assert links.harvest(response, follow={CATEGORY}, where=lambda url: url.endswith('getraenke')) == [
+        (f'{SITE}/getraenke', CATEGORY),
+    ]
+    assert links.harvest(response, follow={CATEGORY, SUBCATEGORY}) == [
+        (f'{SITE}/lebensmittel', CATEGORY),
+        (f'{SITE}/produkte/tee-10581', SUBCATEGORY),
+    ]
+
+
+def test_also_and_listed():
+    links, _ = harvester()
+    hrefs = ['/produkt/clever-kaffee-1', f'{LISTING}?page=2', '/produkt/clever-tee-2']
+    links.harvest(page(f'{SITE}/lebensmittel', hrefs[:1]), follow={PRODUCT})
+
+    listed = {PRODUCT: []}
+    found = links.harvest(page(LISTING, hrefs), follow={PRODUCT}, also={PAGINATION}, listed=listed)
+    assert found == [(f'{LISTING}?page=2', PAGINATION), (f'{SITE}/produkt/clever-tee-2', PRODUCT)]
+    # Every product on the page, including the one handed out before
+    assert listed == {PRODUCT: [f'{SITE}/produkt/clever-kaffee-1', f'{SITE}/produkt/clever-tee-2']}
+    # Pagination links come back on every page
+    assert links.harvest(page(LISTING, hrefs), follow={PRODUCT}, also={PAGINATION}) == [(f'{LISTING}?page=2', PAGINATION)]
@@ -0,0 +1,96 @@
+import http.client
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from scrapy import Request
+from scrapy.http import HtmlResponse
+
+from cleverleben_scraper.items import CleverlebenItem
+from cleverleben_scraper.mocksite import FIRST_PRODUCT_ID, SITE, MockCatalog, MockSiteHandler
+from cleverleben_scraper.spiders.clever_spider import CleverSpider
+from cleverleben_scraper.urls import CATEGORY, PAGINATION, PRODUCT, SUBCATEGORY, UrlClassifier
+
+
+@pytest.fixture
+def catalog():
+    return MockCatalog(products=100, categories=5, subcategories=3, page_size=4, featured=2, page_kb=1)
+
+
+def get(catalog, url):
+    parts = urlsplit(url)
+    return catalog.page(parts.path, parse_qs(parts.query))
+
+
+def test_pages(catalog):
+    assert get(catalog, f'{SITE}/produktauswahl')[0] == 200
+    assert get(catalog, f'{SITE}/getraenke')[0] == 200
+    assert get(catalog, f'{SITE}/lebensmittel-2/')[0] == 200
+    assert get(catalog, f'{SITE}/getraenke-2')[0] == 404
+    assert get(catalog, f'{SITE}/produkte/sortiment-14?page=2')[0] == 200
+    assert get(catalog, f'{SITE}/produkte/sortiment-15')[0] == 404
+    # 100 products over 15 listings of 4 per page: 7 products, 2 pages in listing 0
+    assert catalog.page_count(0) == 2
+    assert get(catalog, f'{SITE}/produkte/sortiment-0?page=3')[0] == 404
+    assert get(catalog, f'{SITE}/produkt/artikel-99-{FIRST_PRODUCT_ID + 99}')[0] == 200
+    assert get(catalog, f'{SITE}/produkt/artikel-100-{FIRST_PRODUCT_ID + 100}')[0] == 404
+    assert get(catalog, f'{SITE}/robots.txt') == (200, 'User-agent: *\nAllow: /\n')
+
+
+def test_urls_have_the_real_url_classes(catalog):
+    classifier = UrlClassifier()
+    assert classifier.classify(SITE + catalog.category_path(4)) == CATEGORY
+    assert classifier.classify(SITE + catalog.listing_path(3)) == SUBCATEGORY
+    assert classifier.classify(f'{SITE}{catalog.listing_path(3)}?page=2') == PAGINATION
+    assert classifier.classify(SITE + catalog.product_path(7)) == PRODUCT
+
+
+def test_every_product_is_in_one_listing(catalog):
+    listed = [i for t in range(catalog.listings) for i in catalog.listing_products(t)]
+    assert sorted(listed) == list(range(catalog.products))
+
+
+def test_spider_crawls_the_whole_catalog(catalog):
+    spider = CleverSpider()
+    queue = deque([Request(f'{SITE}/produktauswahl', callback=spider.parse)])
+    requested, items = [], []
+    while queue:
+        request = queue.popleft()
+        requested.append(request.url)
+        status, text = get(catalog, request.url)
+        assert status == 200, request.url
+        response = HtmlResponse(request.url, body=text.encode('utf-8'), encoding='utf-8', request=request)
+        for result in request.callback(response) or ():
+            if isinstance(result, Request):
+                queue.append(result)
+            else:
+                assert isinstance(result, CleverlebenItem)
+                items.append(result)
+    assert len(requested) == len(set(requested))
+    assert sorted(int(item['unique_id']) for item in items) == list(range(FIRST_PRODUCT_ID, FIRST_PRODUCT_ID + 100))
+    item = next(item for item in items if item['unique_id'] == str(FIRST_PRODUCT_ID + 7))
+    assert item['product_name'] == 'Clever Artikel 7, 107g'
+    assert item['price'] == '3.59'
+
+
+def test_server_answers_proxy_requests(catalog):
+    handler = type('Handler', (MockSiteHandler,), {'catalog': catalog})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=5)
+        connection.request('GET', f'{SITE}/produkt/artikel-1-{FIRST_PRODUCT_ID + 1}')
+        response = connection.getresponse()
+        assert response.status == 200
+        assert response.getheader('Content-Type') == 'text/html; charset=utf-8'
+        assert b'Clever Artikel 1, 101g' in response.read()
+        # The connection is kept alive
+        connection.request('GET', '/produkt/artikel-x')
+        response = connection.getresponse()
+        assert (response.status, response.read()) == (404, b'not found')
+        connection.close()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,66 @@
+import copy
+
+import pytest
+
+from cleverleben_scraper.normalization import Normalizer, clean_price, clean_text
+
+ITEMS = [
+    {
+        'product_url': 'https://www.cleverleben.at/produkt/clever-kaffee-27399',
+        'product_name': '  Clever Kaffee\n gemahlen ★ 500g ',
+        'product_description': 'Kräftiger Röstkaffee | für jeden Tag',
+        'price': '€ 3,99',
+        'image': [
+            'https://images.europe-west1.gcp.commercetools.com/kaffee-EoB5R2-medium.png',
+            'https://images.europe-west1.gcp.commercetools.com/kaffee-EoB5R2.png',
+            'https://www.cleverleben.at/tenant/logo.svg',
+        ],
+    },
+    {
+        'product_url': 'https://www.cleverleben.at/produkt/vollmilch-10412/',
+        'unique_id': '10412', 'product_id': 'A-10412', 'price': 1.2, 'ingredients': '',
+    },
+    {'product_url': 'https://www.cleverleben.at/produkt/reis', 'price': 'auf Anfrage'},
+]
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('1.99', '1.99'),
+    ('1,99 €', '1.99'),
+    ('ab € 12', '12'),
+    (0.5, '0.50'),
+    (3, '3.00'),
+    ('auf Anfrage', 'auf Anfrage'),
+])
+def test_clean_price(value, expected):
+    assert clean_price(value) == expected
+
+
+def test_clean_text():
+    assert clean_text(' Milch\t&  Honig (500g)\n') == 'Milch  Honig 500g'
+    assert clean_text('100% Arabica – fair!') == '100% Arabica  fair!'
+    assert clean_text(None) is None
+
+
+def test_normalize():
+    first, second, third = Normalizer().normalize_batch(copy.deepcopy(ITEMS))
+    assert first['product_name'] == 'Clever Kaffee gemahlen  500g'
+    assert first['product_description'] == 'Kräftiger Röstkaffee  für jeden Tag'
+    assert first['price'] == '3.99'
+    assert first['image'] == ['https://images.europe-west1.gcp.commercetools.com/kaffee-EoB5R2.png']
+    assert (first['unique_id'], first['product_id']) == ('27399', '27399')
+    # Values that are there already are kept
+    assert (second['unique_id'], second['product_id'], second['price']) == ('10412', 'A-10412', '1.20')
+    assert second['ingredients'] == ''
+    assert third['price'] == 'auf Anfrage'
+    assert 'unique_id' not in third and third['product_id'] == ''
+
+
+def test_frame_matches_items():
+    pd = pytest.importorskip('pandas')
+    normalizer = Normalizer()
+    items = [normalizer.normalize(dict(item)) for item in copy.deepcopy(ITEMS)]
+    frame = normalizer.normalize_frame(pd.DataFrame(copy.deepcopy(ITEMS)))
+    for item, row in zip(items, frame.to_dict('records')):
+        row = {field: value for field, value in row.items() if not (isinstance(value, float) and pd.isna(value))}
+        assert row == item
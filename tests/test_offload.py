@@ -0,0 +1,64 @@
+import asyncio
+from collections import Counter
+
+import pytest
+from scrapy.http import HtmlResponse
+
+from cleverleben_scraper import offload
+from cleverleben_scraper.offload import ExtractionPool
+from cleverleben_scraper.spiders.clever_spider import CleverSpider
+from tests.test_extraction import PAGES
+
+
+def responses():
+    return [
+        HtmlResponse(url=f'https://www.cleverleben.at/produkt/{page}-{n}', body=PAGES[page], encoding='utf-8')
+        for n, page in enumerate(sorted(PAGES), 27000)
+    ]
+
+
+def in_process(spider, response):
+    stats = Counter()
+
+    def inc_stat(key, count=1):
+        stats[key] += count
+
+    return dict(spider.extract_product(response, inc_stat)), dict(stats)
+
+
+def pooled(spider, pages):
+    pool = ExtractionPool(spider, 2)
+
+    async def extract_all():
+        return await asyncio.gather(*(pool.extract(response) for response in pages))
+
+    try:
+        return asyncio.run(extract_all())
+    finally:
+        pool.close()
+
+
+@pytest.mark.parametrize('threads', [False, True], ids=['processes', 'threads'])
+def test_pool_matches_in_process_extraction(monkeypatch, threads):
+    monkeypatch.setattr(offload, 'free_threaded', lambda: threads)
+    spider = CleverSpider()
+    spider.extraction_mode = 'jsonld'
+    spider.instrument_selectors = True
+    pages = responses()
+    assert pooled(spider, pages) == [in_process(spider, response) for response in pages]
+
+
+def test_worker_errors_reach_the_caller(monkeypatch):
+    monkeypatch.setattr(offload, 'free_threaded', lambda: True)
+    pool = ExtractionPool(CleverSpider(), 1)
+    response = HtmlResponse(url='https://www.cleverleben.at/produkt/kaputt', body=b'<html></html>')
+    monkeypatch.setattr(CleverSpider, 'extract_product', lambda self, response, inc_stat: 1 / 0)
+
+    async def extract():
+        return await pool.extract(response)
+
+    try:
+        with pytest.raises(ZeroDivisionError):
+            asyncio.run(extract())
+    finally:
+        pool.close()
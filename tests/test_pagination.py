@@ -0,0 +1,103 @@
+from scrapy import Request
+from scrapy.http import HtmlResponse
+
+from cleverleben_scraper.pagination import Paginator
+from cleverleben_scraper.spiders.clever_spider import CleverSpider
+
+LISTING = 'https://www.cleverleben.at/produkte/kaffee-10580'
+
+
+def page(number):
+    return f'{LISTING}?page={number}'
+
+
+def products(first, count):
+    return [f'https://www.cleverleben.at/produkt/clever-artikel-{i}' for i in range(first, first + count)]
+
+
+def stats():
+    values = {}
+
+    def inc_stat(key, count=1):
+        values[key] = values.get(key, 0) + count
+    return values, inc_stat
+
+
+def test_listing_key_and_page():
+    paginator = Paginator()
+    assert paginator.split(LISTING) == (LISTING, 1)
+    assert paginator.split(f'{LISTING}?page=1') == (LISTING, 1)
+    assert paginator.split(f'{LISTING}?page=0') == (LISTING, 1)
+    assert paginator.split(f'{LISTING}?page=abc') == (LISTING, 1)
+    assert paginator.split(f'{LISTING}?utm_source=nl&sort=price&page=3&fbclid=x#top') == (f'{LISTING}?sort=price', 3)
+    assert paginator.split(f'{LISTING}?page=3&sort=price') == paginator.split(f'{LISTING}?sort=price&page=3')
+    assert paginator.page_url(LISTING, 1) == LISTING
+    assert paginator.page_url(f'{LISTING}?sort=price', 2) == f'{LISTING}?page=2&sort=price'
+
+
+def test_follows_the_pages_in_order():
+    values, inc_stat = stats()
+    paginator = Paginator(inc_stat=inc_stat)
+    assert paginator.next_page(LISTING, [page(2), page(3)], products(0, 24)) == page(2)
+    assert paginator.next_page(page(2), [LISTING, page(3)], products(24, 24)) == page(3)
+    assert values['pagination/listings'] == 1
+    assert values['pagination/pages/produkte/kaffee-10580'] == 2
+
+
+def test_stops_on_the_last_page():
+    values, inc_stat = stats()
+    paginator = Paginator(inc_stat=inc_stat)
+    assert paginator.next_page(page(3), [LISTING, page(2)], products(0, 5)) is None
+    # Links to other listings do not continue this one
+    assert paginator.next_page(page(4), ['https://www.cleverleben.at/produkte/tee-10581?page=5'], products(5, 5)) is None
+    assert values['pagination/stopped/last_page'] == 2
+
+
+def test_stops_without_new_products():
+    values, inc_stat = stats()
+    paginator = Paginator(inc_stat=inc_stat)
+    assert paginator.next_page(page(7), [page(8)], []) is None
+    # A site that serves the last page for every page number past the end
+    assert paginator.next_page(LISTING, [page(2)], products(0, 24)) == page(2)
+    assert paginator.next_page(page(2), [page(3)], products(0, 24)) is None
+    assert values['pagination/stopped/no_new_products'] == 2
+
+
+def test_products_of_other_listings_are_new_to_this_one():
+    paginator = Paginator()
+    # The same products on the first page of two listings, e.g. a listing and its parent
+    assert paginator.next_page(LISTING, [page(2)], products(0, 24)) == page(2)
+    other = 'https://www.cleverleben.at/produkte/fruehstueck-10500'
+    assert paginator.next_page(other, [f'{other}?page=2'], products(0, 24)) == f'{other}?page=2'
+
+
+def test_requests_each_page_once():
+    values, inc_stat = stats()
+    paginator = Paginator(inc_stat=inc_stat)
+    assert paginator.next_page(LISTING, [page(2)], products(0, 24)) == page(2)
+    # The same listing reached again, under another URL of page 1
+    assert paginator.next_page(f'{LISTING}?page=1&utm_campaign=x', [page(2)], products(24, 24)) is None
+    assert values['pagination/stopped/already_requested'] == 1
+    # A loop back to an earlier page
+    assert paginator.next_page(page(3), [page(4)], products(48, 24)) == page(4)
+    assert paginator.next_page(page(2), [page(3)], products(72, 24)) is None
+    assert values['pagination/stopped/already_requested'] == 2
+
+
+def listing_page(url, product_urls, page_urls):
+    links = ''.join(f'<a href="{link}">{link}</a>' for link in product_urls + page_urls)
+    return HtmlResponse(url, body=f'<html><body>{links}</body></html>'.encode('utf-8'), request=Request(url))
+
+
+def test_spider_pages_through_a_listing_whose_first_page_was_seen_elsewhere():
+    spider = CleverSpider()
+    parent = 'https://www.cleverleben.at/produkte/fruehstueck-10500'
+    requests = list(spider.parse_subcategory(listing_page(parent, products(0, 24), [])))
+    assert len(requests) == 24
+
+    # Every product on page 1 of the child listing is known already, page 2 is not
+    requests = list(spider.parse_subcategory(listing_page(LISTING, products(0, 24), [page(2)])))
+    assert [request.url for request in requests] == [page(2)]
+
+    requests = list(spider.parse_subcategory(listing_page(page(2), products(24, 12), [page(1)])))
+    assert [request.url for request in requests] == products(24, 12)
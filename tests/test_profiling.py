@@ -0,0 +1,103 @@
+import os
+import signal
+import sys
+import time
+import tracemalloc
+
+import pytest
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.test import get_crawler
+
+from cleverleben_scraper.profiling import ENGINE, CpuSampler, CrawlProfiler
+from cleverleben_scraper.spiders.clever_spider import CleverSpider
+
+pytestmark = pytest.mark.skipif(not hasattr(signal, 'setitimer'), reason='Profiling needs a POSIX system')
+
+
+def parse_listing(sampler):
+    sampler.sample(signal.SIGPROF, sys._getframe())
+
+
+def extract(sampler):
+    sampler.sample(signal.SIGPROF, sys._getframe())
+
+
+def parse_product(sampler):
+    extract(sampler)
+
+
+def test_samples_are_attributed_to_the_callback():
+    sampler = CpuSampler({parse_listing.__code__, parse_product.__code__}, 0.01)
+    parse_product(sampler)
+    parse_product(sampler)
+    parse_listing(sampler)
+    sampler.sample(signal.SIGPROF, sys._getframe())
+    assert sampler.samples == 4
+    assert sampler.by_callback() == {'parse_product': 2, 'parse_listing': 1, ENGINE: 1}
+
+    folded = sampler.folded()
+    assert len(folded) == 3
+    product = next(line for line in folded if line.startswith('parse_product;'))
+    assert product.endswith('test_profiling:parse_product;test_profiling:extract 2')
+
+    own, total = sampler.functions()
+    assert own['test_profiling:extract'] == 2
+    assert 'test_profiling:parse_product' not in own
+    assert total['test_profiling:parse_product'] == 2
+
+
+def busy(seconds):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+
+
+def test_timer_samples_the_running_code():
+    sampler = CpuSampler({busy.__code__}, 0.005)
+    sampler.start()
+    try:
+        busy(0.3)
+    finally:
+        sampler.stop()
+    assert sampler.samples > 0
+    assert sampler.by_callback()['busy'] > 0
+    assert signal.getsignal(signal.SIGPROF) == signal.SIG_DFL
+
+
+def test_is_opt_in():
+    with pytest.raises(NotConfigured):
+        CrawlProfiler.from_crawler(get_crawler(CleverSpider))
+
+
+def test_writes_profiles_and_summary(tmp_path):
+    crawler = get_crawler(CleverSpider, {
+        'PROFILING_ENABLED': True,
+        'PROFILING_DIR': str(tmp_path),
+        'PROFILING_HEAP_EVERY': 2,
+        'PROFILING_INTERVAL': 0.005,
+        'PROFILING_SIGNAL': 'SIGUSR1',
+    })
+    profiler = CrawlProfiler.from_crawler(crawler)
+    spider = crawler._create_spider()
+    previous = signal.getsignal(signal.SIGUSR1)
+    profiler.spider_opened(spider)
+    assert signal.getsignal(signal.SIGUSR1) == profiler.on_signal
+    try:
+        busy(0.1)
+        for _ in range(3):
+            profiler.item_scraped({}, None, spider)
+    finally:
+        profiler.spider_closed(spider, 'finished')
+    assert signal.getsignal(signal.SIGUSR1) == previous
+    assert not tracemalloc.is_tracing()
+    assert crawler.stats.get_value('profiling/dumps') == 2
+    assert sorted(os.listdir(tmp_path)) == [
+        'cpu-001-2-items.folded', 'cpu-002-final.folded',
+        'heap-001-2-items.tracemalloc', 'heap-001-2-items.txt',
+        'heap-002-final.tracemalloc', 'heap-002-final.txt',
+        'summary.txt',
+    ]
+    summary = (tmp_path / 'summary.txt').read_text(encoding='utf-8')
+    assert summary.startswith('Crawl finished (finished) after 3 items')
+    assert 'CPU samples by callback' in summary and 'Top allocators' in summary
+    assert (tmp_path / 'heap-001-2-items.txt').read_text(encoding='utf-8').startswith('Top allocators after 2 items')
@@ -0,0 +1,85 @@
+import json
+import os
+from time import time
+
+import pytest
+from scrapy import Request
+from scrapy.extensions.httpcache import FilesystemCacheStorage
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+
+from cleverleben_scraper.reextraction import reextract
+from cleverleben_scraper.spiders.clever_spider import CleverSpider
+from cleverleben_scraper.urls import SUBCATEGORY
+
+SITE = 'https://www.cleverleben.at'
+
+PAGES = {
+    f'{SITE}/produkt/clever-kaffee-27399': '<h1>Clever Kaffee gemahlen</h1><span itemprop="price">3,99</span>',
+    f'{SITE}/produkt/vollmilch-schokolade-10412': '<h1>Vollmilch Schokolade</h1><span itemprop="price">1,29</span>',
+    # The same product under an older URL
+    f'{SITE}/produkt/kaffee-gemahlen-27399': '<h1>Clever Kaffee (alt)</h1><span itemprop="price">4,19</span>',
+    f'{SITE}/produkt/sortiment-99': '<h1>Alle Produkte</h1>',
+    f'{SITE}/produkte/kaffee-10580': '<a href="/produkt/clever-kaffee-27399">Kaffee</a>',
+}
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    crawler = get_crawler(CleverSpider, {'HTTPCACHE_DIR': str(tmp_path)})
+    spider = crawler._create_spider()
+    storage = FilesystemCacheStorage(crawler.settings)
+    storage.open_spider(spider)
+    for url, body in PAGES.items():
+        request = Request(url)
+        html = f'<html><body>{body}</body></html>'.encode('utf-8')
+        storage.store_response(spider, request, HtmlResponse(url, body=html, request=request))
+    request = Request(f'{SITE}/produkt/entfernt-31004')
+    storage.store_response(spider, request, HtmlResponse(request.url, status=404, body=b'<html></html>', request=request))
+    storage.close_spider(spider)
+    return os.path.join(str(tmp_path), CleverSpider.name)
+
+
+def read_items(path):
+    with open(path, encoding='utf-8') as f:
+        return sorted((json.loads(line) for line in f), key=lambda item: item['product_url'])
+
+
+def test_reextracts_the_cached_products(cache_dir, tmp_path):
+    output = str(tmp_path / 'items.jsonl')
+    stats = reextract(cache_dir, {output: 'jsonlines'}, CleverSpider(), workers=1)
+    assert stats['responses'] == 6
+    assert stats['skipped/url_class'] == 1
+    assert stats['skipped/not_html'] == 1
+    assert stats['pages'] == 4
+    assert stats['rejected'] == 1
+    assert stats['dedup/dropped_items'] == 1
+    assert stats['items'] == 2
+
+    items = read_items(output)
+    assert {item['unique_id']: item['price'] for item in items} in (
+        {'27399': '3.99', '10412': '1.29'},
+        {'27399': '4.19', '10412': '1.29'},
+    )
+    assert all(item['product_id'] == item['unique_id'] for item in items)
+
+
+def test_worker_processes_give_the_same_items(cache_dir, tmp_path):
+    one, two = str(tmp_path / 'one.jsonl'), str(tmp_path / 'two.jsonl')
+    reextract(cache_dir, {one: 'jsonlines'}, CleverSpider(), workers=1)
+    reextract(cache_dir, {two: 'jsonlines'}, CleverSpider(), workers=2)
+    assert read_items(one) == read_items(two)
+
+
+def test_selects_pages_by_timestamp(cache_dir, tmp_path):
+    output = str(tmp_path / 'items.jsonl')
+    stats = reextract(cache_dir, {output: 'jsonlines'}, CleverSpider(), workers=1, since=time() + 3600)
+    assert stats['skipped/timestamp'] == 6
+    assert stats['items'] == 0
+    stats = reextract(cache_dir, {output: 'jsonlines'}, CleverSpider(), workers=1, until=time() + 3600)
+    assert stats['items'] == 2
+
+
+def test_only_product_pages_have_an_extractor(cache_dir, tmp_path):
+    with pytest.raises(ValueError):
+        reextract(cache_dir, {str(tmp_path / 'items.jsonl'): 'jsonlines'}, CleverSpider(), url_classes=[SUBCATEGORY])
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+from scrapy import Request
+from scrapy.extensions.httpcache import FilesystemCacheStorage
+from scrapy.http import HtmlResponse, TextResponse
+from scrapy.utils.test import get_crawler
+
+from cleverleben_scraper.replay import build_spider, iter_cached_responses, route_callback
+from cleverleben_scraper.spiders.clever_spider import CleverSpider
+from run_benchmark import run_benchmark
+
+SITE = 'https://www.cleverleben.at'
+
+PAGES = {
+    f'{SITE}/produktauswahl': f'<a href="/produkte/kaffee-10580">Kaffee</a><a href="/lebensmittel">Lebensmittel</a>',
+    f'{SITE}/produkte/kaffee-10580': ''.join(
+        f'<a href="/produkt/clever-kaffee-{i}">Kaffee {i}</a>' for i in range(27390, 27400)
+    ),
+    f'{SITE}/produkt/clever-kaffee-27399': '<h1>Clever Kaffee gemahlen</h1><span itemprop="price">3,99</span>',
+}
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    crawler = get_crawler(CleverSpider, {'HTTPCACHE_DIR': str(tmp_path)})
+    spider = crawler._create_spider()
+    storage = FilesystemCacheStorage(crawler.settings)
+    storage.open_spider(spider)
+    for url, body in PAGES.items():
+        request = Request(url)
+        html = f'<html><body>{body}</body></html>'.encode('utf-8')
+        storage.store_response(spider, request, HtmlResponse(url, body=html, request=request))
+    storage.close_spider(spider)
+    return os.path.join(str(tmp_path), CleverSpider.name)
+
+
+def test_route_callback():
+    spider = build_spider(CleverSpider)
+    assert spider.crawler.stats is not None
+    assert route_callback(spider, HtmlResponse(f'{SITE}/produktauswahl/')) == 'parse'
+    assert route_callback(spider, HtmlResponse(f'{SITE}/produkt/clever-kaffee-27399')) == 'parse_product'
+    assert route_callback(spider, HtmlResponse(f'{SITE}/produkte/kaffee-10580?page=2')) == 'parse_subcategory'
+    assert route_callback(spider, HtmlResponse(f'{SITE}/stiftehalter')) == 'parse_main_category'
+    assert route_callback(spider, HtmlResponse(f'{SITE}/produkte/kaffee-10580', status=404)) is None
+    assert route_callback(spider, TextResponse(f'{SITE}/robots.txt', body=b'User-agent: *')) is None
+
+
+def test_cached_responses(cache_dir):
+    urls = sorted(response.url for _, response in iter_cached_responses(cache_dir))
+    assert urls == sorted(PAGES)
+
+
+def test_every_round_replays_a_whole_crawl(cache_dir):
+    one = run_benchmark(cache_dir, rounds=1)
+    assert (one['pages'], one['items'], one['errors']) == (3, 1, 0)
+    # 2 links on the start page, 10 products on the listing
+    assert one['requests'] == 12
+    two = run_benchmark(cache_dir, rounds=2)
+    assert (two['pages'], two['items'], two['requests']) == (6, 2, 24)
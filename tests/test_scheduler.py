@@ -0,0 +1,99 @@
+import os
+
+import pytest
+from scrapy import Request
+from scrapy.utils.project import get_project_settings
+from scrapy.utils.test import get_crawler
+
+from cleverleben_scraper.scheduler import BoundedScheduler
+from cleverleben_scraper.spiders.clever_spider import CleverSpider
+
+SETTINGS = {
+    name: get_project_settings()[name]
+    for name in ('SCHEDULER', 'SCHEDULER_DISK_QUEUE', 'SCHEDULER_START_DISK_QUEUE', 'SCHEDULER_PRIORITY_QUEUE')
+}
+
+
+def open_scheduler(**settings):
+    crawler = get_crawler(CleverSpider, {**SETTINGS, **settings})
+    crawler.spider = crawler._create_spider()
+    scheduler = BoundedScheduler.from_crawler(crawler)
+    scheduler.open(crawler.spider)
+    return scheduler
+
+
+def request(priority, start=False):
+    return Request(
+        f'https://www.cleverleben.at/produkt/clever-artikel-{priority}{"-start" if start else ""}',
+        priority=priority,
+        meta={'is_start_request': True} if start else {},
+    )
+
+
+def drain(scheduler):
+    requests = []
+    while (next_request := scheduler.next_request()) is not None:
+        requests.append(next_request)
+    return requests
+
+
+def test_pops_in_priority_order_across_memory_and_disk():
+    scheduler = open_scheduler(SCHEDULER_MEMORY_QUEUE_LIMIT=2)
+    for priority in (0, 5, 1, 10, 3, -2):
+        assert scheduler.enqueue_request(request(priority))
+    assert len(scheduler.mqs) == 2
+    assert len(scheduler.dqs) == 4
+    assert scheduler.stats.get_value('scheduler/spilled') == 4
+    assert [r.priority for r in drain(scheduler)] == [10, 5, 3, 1, 0, -2]
+    scheduler.close('finished')
+
+
+def test_memory_queue_is_bounded():
+    scheduler = open_scheduler(SCHEDULER_MEMORY_QUEUE_LIMIT=5)
+    spill_dir = scheduler.spill_dir
+    for priority in range(50):
+        scheduler.enqueue_request(request(priority))
+        assert len(scheduler.mqs) <= 5
+    assert len(scheduler) == 50
+    assert len(drain(scheduler)) == 50
+    scheduler.close('finished')
+    assert not os.path.exists(spill_dir)
+
+
+def test_without_a_limit_requests_stay_in_memory():
+    scheduler = open_scheduler(SCHEDULER_MEMORY_QUEUE_LIMIT=0)
+    assert scheduler.dqs is None
+    scheduler.enqueue_request(request(1))
+    assert len(scheduler.mqs) == 1
+    scheduler.close('finished')
+
+
+def test_requires_a_single_priority_queue():
+    crawler = get_crawler(CleverSpider, {**SETTINGS, 'SCHEDULER_PRIORITY_QUEUE': 'scrapy.pqueues.DownloaderAwarePriorityQueue'})
+    with pytest.raises(ValueError):
+        BoundedScheduler.from_crawler(crawler)
+
+
+def test_read_dqs_state_adds_the_queue_files(tmp_path):
+    for name in ('-5', '0s', '3', '3s', 'active.json', 'notes'):
+        (tmp_path / name).mkdir() if name != 'active.json' else (tmp_path / name).write_text('[7]')
+    scheduler = BoundedScheduler.__new__(BoundedScheduler)
+    # Start request queues ('<priority>s') share the priority of the other queues
+    assert scheduler._read_dqs_state(str(tmp_path)) == [-5, 0, 3, 7]
+
+
+def test_resumes_after_a_crash(tmp_path):
+    scheduler = open_scheduler(JOBDIR=str(tmp_path))
+    assert scheduler.spill_dir is None
+    for priority in (1, 4, 2):
+        scheduler.enqueue_request(request(priority))
+    scheduler.enqueue_request(request(3, start=True))
+    assert scheduler.next_request().priority == 4
+    # No close(): active.json is never written
+    assert not (tmp_path / 'requests.queue' / 'active.json').exists()
+
+    resumed = open_scheduler(JOBDIR=str(tmp_path))
+    requests = drain(resumed)
+    assert [r.priority for r in requests] == [3, 2, 1]
+    assert requests[0].meta.get('is_start_request')
+    resumed.close('finished')
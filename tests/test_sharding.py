@@ -0,0 +1,126 @@
+import json
+import os
+
+from scrapy import Request
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+
+from cleverleben_scraper.frontier import FrontierSeenSet, SharedFrontier, shard_of
+from cleverleben_scraper.sharding import merge_shards, shard_path, shard_settings
+from cleverleben_scraper.spiders.clever_spider import CleverSpider
+
+SITE = 'https://www.cleverleben.at'
+CATEGORIES = [f'{SITE}/{name}' for name in (
+    'lebensmittel', 'getraenke', 'drogerie', 'haushalt', 'tiernahrung', 'baby', 'stiftehalter', 'aktionen',
+)]
+PRODUCTS = [f'{SITE}/produkt/clever-artikel-{i}' for i in range(40)]
+
+
+def page(url, links):
+    body = ''.join(f'<a href="{link}">{link}</a>' for link in links)
+    return HtmlResponse(url, body=f'<html><body>{body}</body></html>'.encode('utf-8'), request=Request(url))
+
+
+def shard_spiders(tmp_path, count):
+    spiders = []
+    for index in range(count):
+        crawler = get_crawler(CleverSpider, {
+            'SHARD_FRONTIER': str(tmp_path / 'frontier.sqlite'),
+            'SHARD_INDEX': index,
+            'SHARD_COUNT': count,
+        })
+        spiders.append(crawler._create_spider())
+    return spiders
+
+
+def urls(requests):
+    return [request.url for request in requests]
+
+
+def test_shard_of_is_stable_and_spreads_urls():
+    assert [shard_of(url, 3) for url in CATEGORIES] == [shard_of(url, 3) for url in CATEGORIES]
+    assert shard_of(CATEGORIES[0], 1) == 0
+    assert {shard_of(url, 3) for url in PRODUCTS} == {0, 1, 2}
+
+
+def test_first_claim_wins(tmp_path):
+    path = str(tmp_path / 'frontier.sqlite')
+    first, second = SharedFrontier(path, shard=0), SharedFrontier(path, shard=1)
+    assert first.claim(PRODUCTS[0])
+    assert not second.claim(PRODUCTS[0])
+    assert not first.claim(PRODUCTS[0])
+    assert second.claim(PRODUCTS[1])
+
+    seen = FrontierSeenSet(second)
+    assert not seen.add(PRODUCTS[0])
+    assert PRODUCTS[0] in seen and PRODUCTS[2] not in seen
+    assert seen.add(PRODUCTS[2])
+    assert not seen.add(PRODUCTS[2])
+    first.close()
+    second.close()
+
+
+def test_request_slots_are_shared(tmp_path):
+    path = str(tmp_path / 'frontier.sqlite')
+    first, second = SharedFrontier(path, shard=0), SharedFrontier(path, shard=1)
+    assert first.reserve('www.cleverleben.at', 2.0) == 0
+    assert 1.5 < second.reserve('www.cleverleben.at', 2.0) <= 2.0
+    assert 3.5 < first.reserve('www.cleverleben.at', 2.0) <= 4.0
+    assert second.reserve('images.cleverleben.at', 2.0) == 0
+    first.close()
+    second.close()
+
+
+def test_shards_split_the_categories(tmp_path):
+    spiders = shard_spiders(tmp_path, 3)
+    start = page(f'{SITE}/produktauswahl', CATEGORIES)
+    owned = [urls(spider.parse(start)) for spider in spiders]
+    assert sorted(sum(owned, [])) == sorted(CATEGORIES)
+    for index, categories in enumerate(owned):
+        assert all(shard_of(url, 3) == index for url in categories)
+
+
+def test_shards_never_request_the_same_link(tmp_path):
+    spiders = shard_spiders(tmp_path, 3)
+    # Listings of several shards overlap, as parent and child listings do
+    listings = [
+        page(f'{SITE}/produkte/kaffee-10580', PRODUCTS[:24]),
+        page(f'{SITE}/produkte/fruehstueck-10500', PRODUCTS[12:36]),
+        page(f'{SITE}/produkte/angebote-10900', PRODUCTS[30:] + PRODUCTS[:6]),
+    ]
+    requested = []
+    for spider, listing in zip(spiders, listings):
+        requested += urls(spider.parse_subcategory(listing))
+    assert sorted(requested) == sorted(PRODUCTS)
+
+
+def test_shard_settings(tmp_path):
+    settings = shard_settings(1, 4, str(tmp_path), {'CONCURRENT_REQUESTS': 16, 'DOWNLOAD_DELAY': 2})
+    assert settings.getint('SHARD_INDEX') == 1
+    assert settings['SHARD_FRONTIER'] == os.path.join(str(tmp_path), 'frontier.sqlite')
+    assert settings.getint('CONCURRENT_REQUESTS') == 4
+    assert settings.getfloat('SHARD_DOWNLOAD_DELAY') == 2
+    assert settings.getfloat('DOWNLOAD_DELAY') == 0
+    assert not settings.getbool('DELTA_ENABLED')
+    assert list(settings.getdict('FEEDS')) == [shard_path(str(tmp_path), 1)]
+
+
+def test_merge_keeps_the_first_shard_of_a_product(tmp_path):
+    shards = {
+        0: [{'unique_id': '300', 'price': '1.00'}, {'unique_id': '100', 'price': '1.00'}],
+        1: [{'unique_id': '200', 'price': '2.00'}, {'unique_id': '300', 'price': '2.00'}],
+    }
+    for index, items in shards.items():
+        with open(shard_path(str(tmp_path), index), 'w', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(item) + '\n' for item in items))
+    output = str(tmp_path / 'merged.jsonl')
+    files = [shard_path(str(tmp_path), index) for index in range(3)]
+    count = merge_shards(files, {output: 'jsonlines'}, str(tmp_path), fields=['unique_id', 'price'])
+    assert count == 3
+    with open(output, encoding='utf-8') as f:
+        merged = [json.loads(line) for line in f]
+    assert merged == [
+        {'unique_id': '100', 'price': '1.00'},
+        {'unique_id': '200', 'price': '2.00'},
+        {'unique_id': '300', 'price': '1.00'},
+    ]
@@ -0,0 +1,81 @@
+import os
+from collections import Counter
+from itertools import islice
+
+import pytest
+
+from cleverleben_scraper.links import LinkHarvester
+from cleverleben_scraper.replay import iter_cached_responses
+from cleverleben_scraper.slimming import can_slim, slim_body
+from cleverleben_scraper.spiders.clever_spider import CleverSpider
+from cleverleben_scraper.urls import CATEGORY, PAGINATION, PRODUCT, SUBCATEGORY, UrlClassifier
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.scrapy', 'httpcache', 'clever_spider')
+# Enough of the cached crawl for every page type, at a few seconds
+SAMPLE_SIZE = 200
+
+
+def test_slim_body():
+    body = (
+        b'<html><head><SCRIPT src="/app.js"></SCRIPT><style>h1 {color: red}</style>'
+        b'<script type="application/ld+json">{"@type": "Product"}</script></head>'
+        b'<body><!-- <h1>Alt</h1> --><svg viewBox="0 0 1 1"><path d="M0"/></svg><svg class="icon" />'
+        b'<h1>Clever Kaffee</h1><scripted>kept</scripted></body></html>'
+    )
+    assert slim_body(body) == (
+        b'<html><head><script type="application/ld+json">{"@type": "Product"}</script></head>'
+        b'<body><h1>Clever Kaffee</h1><scripted>kept</scripted></body></html>'
+    )
+
+
+def test_unterminated_tags_are_kept():
+    assert slim_body(b'<p>Preis</p><script>var x') == b'<p>Preis</p><script>var x'
+    assert slim_body(b'<style>p {}</style><p>1</p><!-- offen') == b'<p>1</p><!-- offen'
+    assert slim_body(b'<p>nichts</p>') == b'<p>nichts</p>'
+
+
+def test_can_slim():
+    assert can_slim('utf-8') and can_slim('cp1252') and can_slim(None)
+    assert not can_slim('UTF-16LE') and not can_slim('utf_32')
+
+
+def cached_pages():
+    if not os.path.isdir(CACHE_DIR):
+        pytest.skip('No HTTP cache in this checkout')
+    for _, response in iter_cached_responses(CACHE_DIR):
+        if response.status == 200 and hasattr(response, 'selector') and can_slim(response.encoding):
+            yield response, response.replace(body=slim_body(response.body))
+
+
+def extract(spider, response):
+    stats = Counter()
+
+    def inc_stat(key, count=1):
+        stats[key] += count
+
+    return dict(spider.extract_product(response, inc_stat)), stats
+
+
+def links(response):
+    harvester = LinkHarvester(UrlClassifier())
+    return sorted(harvester.harvest(response, follow={CATEGORY, SUBCATEGORY, PRODUCT}, also={PAGINATION}))
+
+
+def test_slimmed_cached_pages_give_the_same_items_and_links():
+    spiders = []
+    for mode in ('dom', 'jsonld'):
+        spider = CleverSpider()
+        spider.extraction_mode = mode
+        spider.instrument_selectors = True
+        spiders.append(spider)
+    classifier = UrlClassifier()
+    products = 0
+    for full, slimmed in islice(cached_pages(), SAMPLE_SIZE):
+        assert len(slimmed.body) <= len(full.body)
+        if classifier.classify(full.url) == PRODUCT:
+            products += 1
+            for spider in spiders:
+                assert extract(spider, slimmed) == extract(spider, full), full.url
+        else:
+            assert links(slimmed) == links(full), full.url
+    assert products > 0 and products < SAMPLE_SIZE
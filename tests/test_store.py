@@ -0,0 +1,108 @@
+import pytest
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.project import get_project_settings
+from scrapy.utils.test import get_crawler
+
+from cleverleben_scraper.pipelines import ProductStorePipeline
+from cleverleben_scraper.spiders.clever_spider import CleverSpider
+from cleverleben_scraper.store import ProductStore, fts_query, price_value
+
+PRODUCTS = [
+    {
+        'unique_id': '27399', 'product_id': '27399', 'price': '3.99', 'currency': '€',
+        'product_url': 'https://www.cleverleben.at/produkt/clever-kaffee-27399',
+        'product_name': 'Clever Kaffee gemahlen',
+        'product_description': 'Kräftiger Röstkaffee aus Arabica-Bohnen',
+        'ingredients': 'Röstkaffee',
+        'image': ['https://images.example.com/kaffee.png'],
+    },
+    {
+        'unique_id': '10412', 'product_id': '10412', 'price': '1,29', 'currency': '€',
+        'product_url': 'https://www.cleverleben.at/produkt/vollmilch-schokolade-10412',
+        'product_name': 'Vollmilch Schokolade',
+        'product_description': 'Zartschmelzende Schokolade mit Haselnüssen',
+        'ingredients': 'Zucker, Kakaobutter, Haselnüsse, Vollmilchpulver',
+    },
+    {
+        'unique_id': '31004', 'product_url': 'https://www.cleverleben.at/produkt/spuelmittel-31004',
+        'product_name': 'Spülmittel Zitrone', 'price': 'auf Anfrage',
+    },
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ProductStore(str(tmp_path / 'products.sqlite'), commit_every=2)
+    for product in PRODUCTS:
+        store.upsert(product)
+    yield store
+    store.close()
+
+
+def test_get(store):
+    assert store.count() == 3
+    assert store.get('27399') == PRODUCTS[0]
+    assert store.get('99999') is None
+
+
+def test_upsert_replaces_the_product(store):
+    store.upsert({**PRODUCTS[0], 'price': '4.29', 'product_name': 'Clever Kaffee Espresso'})
+    assert store.count() == 3
+    assert store.get('27399')['price'] == '4.29'
+    # The full-text index follows the update
+    assert [p['unique_id'] for p in store.search('Espresso')] == ['27399']
+    assert store.search('gemahlen') == []
+
+
+def test_items_without_a_key_are_skipped(store):
+    store.upsert({'product_name': 'Ohne Id'})
+    assert store.count() == 3
+
+
+def test_price_range(store):
+    assert [p['unique_id'] for p in store.price_range()] == ['10412', '27399']
+    assert [p['unique_id'] for p in store.price_range(1, 2.5)] == ['10412']
+    assert store.price_range(low=5) == []
+
+
+def test_search(store):
+    assert [p['unique_id'] for p in store.search('Haselnüsse')] == ['10412']
+    # Without diacritics, as a prefix and in one field only
+    assert [p['unique_id'] for p in store.search('spulmittel')] == ['31004']
+    assert [p['unique_id'] for p in store.search('Röst*')] == ['27399']
+    assert store.search('Haselnüsse', field='product_name') == []
+    assert [p['unique_id'] for p in store.search('Haselnüsse', field='ingredients')] == ['10412']
+    with pytest.raises(ValueError):
+        store.search('Kaffee', field='details')
+
+
+def test_store_survives_reopening(tmp_path):
+    path = str(tmp_path / 'products.sqlite')
+    store = ProductStore(path)
+    store.upsert(PRODUCTS[1])
+    store.close()
+    store = ProductStore(path)
+    assert store.get('10412')['product_name'] == 'Vollmilch Schokolade'
+    store.close()
+
+
+def test_helpers():
+    assert price_value('1,29') == 1.29
+    assert price_value(None) is None
+    assert price_value('auf Anfrage') is None
+    assert fts_query('Schoko*') == '"Schoko"*'
+    assert fts_query('say "hi"', field='product_name') == 'product_name : "say ""hi"""'
+
+
+def test_pipeline_is_opt_in(tmp_path):
+    assert not get_project_settings().getbool('PRODUCT_STORE_ENABLED')
+    with pytest.raises(NotConfigured):
+        ProductStorePipeline.from_crawler(get_crawler(CleverSpider))
+    crawler = get_crawler(CleverSpider, {'PRODUCT_STORE_ENABLED': True, 'PRODUCT_STORE_PATH': str(tmp_path / 'p.sqlite')})
+    pipeline = ProductStorePipeline.from_crawler(crawler)
+    pipeline.open_spider(None)
+    pipeline.process_item(dict(PRODUCTS[0]), None)
+    pipeline.close_spider(None)
+    store = ProductStore(str(tmp_path / 'p.sqlite'))
+    assert store.get('27399')['price'] == '3.99'
+    store.close()
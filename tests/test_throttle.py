@@ -0,0 +1,256 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+from scrapy import Request
+from scrapy.http import HtmlResponse
+
+from cleverleben_scraper.middlewares import AdaptiveThrottleMiddleware
+from cleverleben_scraper.throttle import EndpointThrottle, endpoint_of, retry_after
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LIMITS = {'concurrency': 2, 'max_concurrency': 4, 'delay': 0.5, 'min_delay': 0.25, 'max_delay': 10}
+
+
+def healthy_window(throttle, window):
+    changes = [throttle.record(0.1, 200) for _ in range(window)]
+    return changes[-1]
+
+
+def test_endpoints():
+    assert endpoint_of('product') == 'product'
+    assert endpoint_of('asset') == 'asset'
+    assert endpoint_of('subcategory') == 'listing'
+    assert endpoint_of('pagination') == 'listing'
+
+
+@pytest.mark.parametrize('value, seconds', [
+    (b'120', 120.0),
+    ('  3.5 ', 3.5),
+    (b'-1', 0.0),
+    (b'Wed, 21 Oct 2026 07:28:00 GMT', None),
+    (None, None),
+])
+def test_retry_after(value, seconds):
+    assert retry_after(value) == seconds
+
+
+def test_429_backs_off_at_once():
+    throttle = EndpointThrottle(LIMITS, window=5)
+    assert throttle.record(0.1, 429) == 'backoff'
+    assert (throttle.concurrency, throttle.delay) == (1, 1.0)
+    # Retry-After sets the delay when it is longer, even past max_delay
+    assert throttle.record(0.1, 429, wait=7) == 'backoff'
+    assert throttle.delay == 7
+    assert throttle.record(0.1, 429, wait=30) == 'backoff'
+    assert throttle.delay == 30
+    # Only the server's wait goes past it, the next backoffs and speedups do not
+    assert throttle.record(0.1, 429) is None
+    assert throttle.delay == 30
+    assert healthy_window(throttle, 5) == 'speedup'
+    assert throttle.delay == 10
+
+
+def test_error_window_backs_off_and_healthy_windows_recover():
+    throttle = EndpointThrottle(LIMITS, window=5)
+    for status in [200, 200, 503, 200]:
+        assert throttle.record(0.1, status) is None
+    assert throttle.record(0.1, 200) == 'backoff'
+    assert (throttle.concurrency, throttle.delay) == (1, 1.0)
+
+    assert healthy_window(throttle, 5) == 'speedup'
+    assert (throttle.concurrency, throttle.delay) == (2, 0.75)
+    for _ in range(10):
+        healthy_window(throttle, 5)
+    # Never past the ceilings
+    assert (throttle.concurrency, throttle.delay) == (4, 0.25)
+    assert healthy_window(throttle, 5) is None
+
+
+def test_slow_window_backs_off():
+    throttle = EndpointThrottle(LIMITS, target_latency=1.0, window=5)
+    changes = [throttle.record(2.5, 200) for _ in range(5)]
+    assert changes[-1] == 'backoff'
+
+
+def test_download_errors_back_off():
+    throttle = EndpointThrottle(LIMITS, window=5)
+    changes = [throttle.record(error=True) for _ in range(5)]
+    assert changes[-1] == 'backoff'
+
+
+class Stats:
+    def __init__(self):
+        self.values = {}
+
+    def inc_value(self, key, count=1):
+        self.values[key] = self.values.get(key, 0) + count
+
+    def set_value(self, key, value):
+        self.values[key] = value
+
+
+def throttle_middleware(slots, max_concurrency=8):
+    crawler = SimpleNamespace(stats=Stats(), engine=SimpleNamespace(downloader=SimpleNamespace(slots=slots)))
+    endpoints = {
+        'listing': {'concurrency': 2, 'max_concurrency': 8, 'delay': 1.0, 'min_delay': 0.25},
+        'product': {'concurrency': 12, 'max_concurrency': 12, 'delay': 0.5, 'min_delay': 0.25},
+    }
+    return AdaptiveThrottleMiddleware(crawler, endpoints, 1.0, 5, 0.1, max_concurrency)
+
+
+def send(middleware, request, spider):
+    middleware.process_request(request, spider)
+    middleware.request_reached_downloader(request, spider)
+
+
+def test_endpoints_of_a_host_share_its_slot():
+    slot = SimpleNamespace(concurrency=8, delay=1.0)
+    middleware = throttle_middleware({'www.cleverleben.at': slot})
+    spider = SimpleNamespace(logger=SimpleNamespace(debug=lambda message: None))
+
+    product = Request('https://www.cleverleben.at/produkt/artikel-27399')
+    send(middleware, product, spider)
+    assert product.meta['download_slot'] == 'www.cleverleben.at'
+    assert product.meta['throttle_slot'] == 'www.cleverleben.at|product'
+    # Capped at CONCURRENT_REQUESTS_PER_DOMAIN
+    assert (slot.concurrency, slot.delay) == (8, 0.5)
+
+    listing = Request('https://www.cleverleben.at/produkte/kaffee-10580')
+    send(middleware, listing, spider)
+    assert listing.meta['download_slot'] == 'www.cleverleben.at'
+    # The most constrained endpoint sets the pace of the host
+    assert (slot.concurrency, slot.delay) == (2, 1.0)
+
+    # A 429 on products slows down the whole host, as long as the server asks
+    response = HtmlResponse(product.url, status=429, headers={'Retry-After': '30'}, request=product)
+    middleware.process_response(product, response, spider)
+    assert (slot.concurrency, slot.delay) == (2, 30.0)
+    assert middleware.crawler.stats.values['throttle/www.cleverleben.at|product/backoff'] == 1
+
+
+def test_limits_apply_to_the_first_request_of_a_slot():
+    slots = {}
+    middleware = throttle_middleware(slots)
+    spider = SimpleNamespace(logger=SimpleNamespace(debug=lambda message: None))
+    request = Request('https://www.cleverleben.at/produkt/artikel-27399')
+    # The downloader creates the slot after the middlewares, with the global defaults
+    middleware.process_request(request, spider)
+    assert slots == {}
+    slots['www.cleverleben.at'] = slot = SimpleNamespace(concurrency=8, delay=1.0)
+    middleware.request_reached_downloader(request, spider)
+    assert (slot.concurrency, slot.delay) == (8, 0.5)
+
+
+def test_cached_responses_are_not_counted():
+    slot = SimpleNamespace(concurrency=8, delay=1.0)
+    middleware = throttle_middleware({'www.cleverleben.at': slot})
+    spider = SimpleNamespace(logger=SimpleNamespace(debug=lambda message: None))
+    request = Request('https://www.cleverleben.at/produkt/artikel-27399')
+    send(middleware, request, spider)
+    response = HtmlResponse(request.url, status=429, flags=['cached'], request=request)
+    middleware.process_response(request, response, spider)
+    assert slot.delay == 0.5
+
+
+# A crawl through the mock site server: products fail with 503 at first,
+# then answer normally. The slot delay has to go up, then come down again.
+CRAWL = textwrap.dedent('''
+    import json, sys
+    import scrapy
+    from scrapy.crawler import CrawlerProcess
+
+    proxy, output = sys.argv[1], sys.argv[2]
+
+    class ProductSpider(scrapy.Spider):
+        name = 'throttle_test'
+        custom_settings = {'CONCURRENT_REQUESTS': 1}
+
+        start_urls = [f'http://www.cleverleben.at/produkt/artikel-{i}-{100000 + i}' for i in range(80)]
+
+        def parse(self, response):
+            self.record()
+
+        def record(self):
+            slot = self.crawler.engine.downloader.slots.get('www.cleverleben.at')
+            if slot is not None:
+                self.delays.append(slot.delay)
+
+        def closed(self, reason):
+            stats = {k: v for k, v in self.crawler.stats.get_stats().items() if k.startswith('throttle/')}
+            with open(output, 'w') as f:
+                json.dump({'delays': self.delays, 'stats': stats}, f)
+
+    ProductSpider.delays = []
+    process = CrawlerProcess({
+        'MOCKSITE_URL': proxy,
+        'RETRY_ENABLED': False,
+        'ROBOTSTXT_OBEY': False,
+        'TELNETCONSOLE_ENABLED': False,
+        'LOG_LEVEL': 'WARNING',
+        'RANDOMIZE_DOWNLOAD_DELAY': False,
+        'DOWNLOADER_MIDDLEWARES': {
+            'cleverleben_scraper.middlewares.MockSiteMiddleware': 100,
+            'cleverleben_scraper.middlewares.AdaptiveThrottleMiddleware': 940,
+        },
+        'ADAPTIVE_THROTTLE_ENABLED': True,
+        'ADAPTIVE_THROTTLE_WINDOW': 5,
+        'ADAPTIVE_THROTTLE_ENDPOINTS': {
+            'product': {'concurrency': 1, 'max_concurrency': 2, 'delay': 0.02, 'min_delay': 0.01, 'max_delay': 1},
+        },
+    })
+    process.crawl(ProductSpider)
+    process.start()
+''')
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    failures = 10
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            failing = server.requests <= self.failures
+        body = b'busy' if failing else b'<html><h1>Clever Artikel</h1></html>'
+        self.send_response(503 if failing else 200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def flaky_site():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+    server.lock = threading.Lock()
+    server.requests = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+
+
+def test_crawl_backs_off_on_errors_and_recovers(flaky_site, tmp_path):
+    output = tmp_path / 'throttle.json'
+    subprocess.run([sys.executable, '-c', CRAWL, flaky_site, str(output)], cwd=ROOT, check=True, timeout=120)
+    result = json.loads(output.read_text())
+    delays, stats = result['delays'], result['stats']
+
+    assert stats['throttle/www.cleverleben.at|product/backoff'] >= 1
+    assert stats['throttle/www.cleverleben.at|product/speedup'] >= 1
+    peak = delays.index(max(delays))
+    assert max(delays) >= 0.04
+    assert delays[-1] < max(delays)
+    assert min(delays[peak:]) == pytest.approx(0.01)
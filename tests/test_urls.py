@@ -0,0 +1,54 @@
+import pytest
+
+from cleverleben_scraper.urls import (
+    ASSET, CATEGORY, IGNORE, PAGINATION, PRODUCT, SUBCATEGORY, UrlClassifier, UrlRule, product_id,
+)
+
+
+@pytest.mark.parametrize('url, url_class', [
+    ('https://www.cleverleben.at/produkt/clever-kaffee-27399', PRODUCT),
+    ('https://cleverleben.at/produkt/clever-kaffee-27399/', PRODUCT),
+    ('https://www.cleverleben.at/produkte/kaffee-10580', SUBCATEGORY),
+    ('https://www.cleverleben.at/produkte/kaffee-10580?sort=price', SUBCATEGORY),
+    ('https://www.cleverleben.at/produkte/kaffee-10580?page=2', PAGINATION),
+    ('https://www.cleverleben.at/produkte/kaffee-10580?sort=price&page=3', PAGINATION),
+    ('https://www.cleverleben.at/produkte/kaffee-10580?pagesize=48', SUBCATEGORY),
+    ('https://www.cleverleben.at/lebensmittel', CATEGORY),
+    ('https://www.cleverleben.at/getraenke-und-saefte/', CATEGORY),
+    ('https://www.cleverleben.at/produkt/clever-kaffee-27399.jpg', ASSET),
+    ('https://www.cleverleben.at/static/app.js', ASSET),
+    ('https://files.cleverleben.at/datenblatt-27399', ASSET),
+    ('https://www.cleverleben.at/stiftehalter', CATEGORY),
+    ('https://www.cleverleben.at/restlos-gluecklich/', CATEGORY),
+    ('https://www.cleverleben.at/produkt/kaffee/bewertungen', IGNORE),
+    ('https://www.cleverleben.at/blog/smoothie-rezepte', IGNORE),
+    ('https://www.cleverleben.at/rezepte?page=2', IGNORE),
+    ('https://www.cleverleben.at/', IGNORE),
+    ('https://www.cleverleben.at/impressum', IGNORE),
+    ('https://www.cleverleben.at/datenschutz/datenschutz-newsletter', IGNORE),
+    ('https://www.cleverleben.at/robots.txt', IGNORE),
+    ('https://www.billa.at/produkt/clever-kaffee-27399', IGNORE),
+    ('mailto:service@cleverleben.at', IGNORE),
+    ('javascript:void(0)', IGNORE),
+])
+def test_classify(url, url_class):
+    assert UrlClassifier().classify(url) == url_class
+
+
+def test_first_matching_rule_wins():
+    classifier = UrlClassifier([
+        UrlRule(ASSET, path=r'\.pdf$'),
+        UrlRule(PRODUCT, hosts=['shop.example.com']),
+    ])
+    assert classifier.classify('https://shop.example.com/a/b') == PRODUCT
+    assert classifier.classify('https://shop.example.com/a/b.pdf') == ASSET
+    assert classifier.classify('https://other.example.com/a/b') == IGNORE
+
+
+@pytest.mark.parametrize('url, unique_id', [
+    ('https://www.cleverleben.at/produkt/clever-kaffee-27399', '27399'),
+    ('https://www.cleverleben.at/produkt/27399', '27399'),
+    ('https://www.cleverleben.at/produkt/clever-kaffee', 'clever-kaffee'),
+])
+def test_product_id(url, unique_id):
+    assert product_id(url) == unique_id